@@ -136,6 +136,9 @@ Write-Host ""
 
 # Function to restore console state on exit
 function Restore-ConsoleState {
+    # Shut down the long-lived Python worker, if one was started
+    Stop-PythonWorker
+
     # Restore original encoding settings
     [Console]::OutputEncoding = $script:OriginalOutputEncoding
     [Console]::InputEncoding = $script:OriginalInputEncoding
@@ -4221,6 +4224,127 @@ function Invoke-TimedPause {
     Write-Host "`r$(' ' * 100)`r$Message..." -ForegroundColor Cyan
 }
 
+# ==========================================
+# PYTHON WORKER
+# ==========================================
+
+# One long-lived modules\console-worker\console-worker.py process answers
+# count/scan/delete requests (line-delimited JSON-RPC over stdin/stdout), so
+# repeated actions skip Python startup and reuse its warm config and caches
+$script:PythonWorker = $null
+$script:PythonWorkerNextId = 0
+
+function Get-PythonWorker {
+    if ($script:PythonWorker -and -not $script:PythonWorker.HasExited) {
+        return $script:PythonWorker
+    }
+
+    $workerScript = Join-Path $PSScriptRoot "modules\console-worker\console-worker.py"
+    $pythonCmd = Get-Command python -ErrorAction SilentlyContinue
+    if (-not $pythonCmd -or -not (Test-Path $workerScript)) {
+        return $null
+    }
+
+    $psi = New-Object System.Diagnostics.ProcessStartInfo
+    $psi.FileName = $pythonCmd.Source
+    $psi.Arguments = "`"$workerScript`""
+    $psi.UseShellExecute = $false
+    $psi.RedirectStandardInput = $true
+    $psi.RedirectStandardOutput = $true
+    # stderr is left on the console - tables and progress bars are printed there
+    $psi.RedirectStandardError = $false
+    $psi.StandardOutputEncoding = New-Object System.Text.UTF8Encoding($false)
+    if ($psi.PSObject.Properties.Name -contains "StandardInputEncoding") {
+        $psi.StandardInputEncoding = New-Object System.Text.UTF8Encoding($false)
+    }
+
+    try {
+        $script:PythonWorker = [System.Diagnostics.Process]::Start($psi)
+    } catch {
+        $script:PythonWorker = $null
+    }
+    return $script:PythonWorker
+}
+
+function Invoke-PythonWorker {
+    <#
+    .SYNOPSIS
+        Sends one request to the Python worker and returns its result.
+
+    .DESCRIPTION
+        Starts the worker on first use. Throws InvalidOperationException if it
+        can't be started or the request can't be sent - nothing ran, so callers
+        can fall back to running the script directly. Any other exception means
+        the request was delivered and may have been partly carried out.
+
+        A worker that doesn't answer within TimeoutSeconds is killed; the next
+        request starts a fresh one.
+
+    .EXAMPLE
+        Invoke-PythonWorker -Method "count" -Params @{ path = $itemPath; subtree = $true }
+    #>
+    param(
+        [Parameter(Mandatory = $true)]
+        [string]$Method,
+        [hashtable]$Params = @{},
+        [int]$TimeoutSeconds = 600
+    )
+
+    $worker = Get-PythonWorker
+    if (-not $worker) {
+        throw [System.InvalidOperationException]::new("Python worker unavailable")
+    }
+
+    $script:PythonWorkerNextId++
+    $request = @{ jsonrpc = "2.0"; id = $script:PythonWorkerNextId; method = $Method; params = $Params } |
+        ConvertTo-Json -Compress -Depth 10
+    try {
+        $worker.StandardInput.WriteLine($request)
+        $worker.StandardInput.Flush()
+    } catch {
+        # The worker exited between requests - the request never reached it
+        $script:PythonWorker = $null
+        throw [System.InvalidOperationException]::new("Python worker unreachable: $($_.Exception.Message)")
+    }
+
+    $readTask = $worker.StandardOutput.ReadLineAsync()
+    if (-not $readTask.Wait($TimeoutSeconds * 1000)) {
+        try {
+            $worker.Kill()
+        } catch {
+            # Exited on its own meanwhile
+        }
+        $script:PythonWorker = $null
+        throw [System.TimeoutException]::new("Python worker did not answer '$Method' within $TimeoutSeconds seconds and was stopped")
+    }
+    $line = $readTask.Result
+    if ($null -eq $line) {
+        $script:PythonWorker = $null
+        throw "Python worker exited unexpectedly"
+    }
+
+    $response = $line | ConvertFrom-Json
+    if ($response.error) {
+        throw $response.error.message
+    }
+    return $response.result
+}
+
+function Stop-PythonWorker {
+    if ($script:PythonWorker -and -not $script:PythonWorker.HasExited) {
+        try {
+            $script:PythonWorker.StandardInput.WriteLine('{"jsonrpc":"2.0","id":0,"method":"shutdown"}')
+            $script:PythonWorker.StandardInput.Close()
+            if (-not $script:PythonWorker.WaitForExit(2000)) {
+                $script:PythonWorker.Kill()
+            }
+        } catch {
+            # Worker already gone
+        }
+    }
+    $script:PythonWorker = $null
+}
+
 # ==========================================
 # MENU POSITION MEMORY FUNCTIONS
 # ==========================================
@@ -4564,6 +4688,39 @@ function Start-ExcelTools {
     Invoke-StandardPause
 }
 
+function Invoke-CountLines {
+    # Count through the Python worker; run count-lines.py directly if it is unavailable
+    param(
+        [string]$CountScriptPath,
+        [string]$ConfigPath,
+        [string]$Path,
+        [switch]$SaveTree,
+        [switch]$Subtree
+    )
+
+    try {
+        $null = Invoke-PythonWorker -Method "count" -Params @{
+            config = $ConfigPath; path = $Path; save_tree = [bool]$SaveTree; subtree = [bool]$Subtree
+        }
+        return
+    } catch {
+        Write-Host "Python worker: $_ - running count-lines.py directly" -ForegroundColor DarkGray
+    }
+
+    $arguments = @("--config", $ConfigPath)
+    if ($Subtree) {
+        $arguments += @("--subtree", $Path)
+    } else {
+        $arguments += $Path
+    }
+    if ($SaveTree) {
+        $arguments += "--save-tree"
+    }
+    Write-Host "Executing: python $CountScriptPath $($arguments -join ' ')" -ForegroundColor Gray
+    Write-Host ""
+    python $CountScriptPath @arguments
+}
+
 function Start-CodeCount {
     # Use $PSScriptRoot to get the actual script directory
     $countScriptPath = Join-Path $PSScriptRoot "modules\line-counter\count-lines.py"
@@ -4799,11 +4956,12 @@ function Start-CodeCount {
     Write-Host "╚════════════════════════════════════════════╝`n" -ForegroundColor Cyan
 
     # Count all projects if selected
+    # --save-tree caches the per-directory count tree so the individual
+    # selections below are answered from this single scan (--subtree)
     if ($countAll) {
         Write-Host "Counting: All Projects" -ForegroundColor Yellow
-        Write-Host "Executing: python $countScriptPath --config `"$configPath`" `"$devRoot`"" -ForegroundColor Gray
         Write-Host ""
-        python $countScriptPath --config "$configPath" "$devRoot"
+        Invoke-CountLines -CountScriptPath $countScriptPath -ConfigPath $configPath -Path $devRoot -SaveTree
         Write-Host ""
 
         # If there are also individual items selected, pause before showing them
@@ -4825,9 +4983,9 @@ function Start-CodeCount {
         Write-Host ""
 
         Write-Host "Counting: $relativePath" -ForegroundColor Yellow
-        Write-Host "Executing: python $countScriptPath --config `"$configPath`" `"$itemPath`"" -ForegroundColor Gray
         Write-Host ""
-        python $countScriptPath --config "$configPath" "$itemPath"
+        # With All Projects counted, answer from its cached tree instead of rescanning the disk
+        Invoke-CountLines -CountScriptPath $countScriptPath -ConfigPath $configPath -Path $itemPath -Subtree:$countAll
         Write-Host ""
 
         # Pause between items (but not after the last one)
@@ -5183,23 +5341,12 @@ function Show-DeprecatedBackupFiles {
     Write-Host "  Backup: $destination" -ForegroundColor Gray
     Write-Host ""
 
-    # Run robocopy in list-only mode with /MIR to see what would be deleted
-    $tempLog = Join-Path $env:TEMP "backup-deprecated-scan.txt"
-    $null = robocopy "$source" "$destination" /L /MIR /R:0 /W:0 /LOG:"$tempLog" /NP /NDL /XJ 2>&1
-
-    # Parse log for EXTRA files (files that exist in destination but not source)
+    # --- Mirror-diff source and backup in one Python pass (extras + exclusion matches) ---
+    # Replaces a robocopy /L /MIR listing plus a second walk of the backup
     $extraFiles = @()
     $extraDirs = @()
-    if (Test-Path $tempLog) {
-        $logContent = Get-Content $tempLog
-        $extraFiles = @($logContent | Where-Object { $_ -match '\*EXTRA File' })
-        $extraDirs = @($logContent | Where-Object { $_ -match '\*EXTRA Dir' })
-    }
-
-    $extraFileCount = $extraFiles.Count
-    $extraDirCount = $extraDirs.Count
-
-    # --- Scan for files matching exclusion patterns using Python (faster) ---
+    $changedFileCount = 0
+    $reclaimable = $null
     $excludedInBackup = @()
     $excludedDirsInBackup = @()
 
@@ -5212,20 +5359,32 @@ function Show-DeprecatedBackupFiles {
     }
 
     if (Test-Path $scanScript) {
-        Write-Host "Scanning backup for items matching exclusion patterns..." -ForegroundColor Cyan
+        Write-Host "Comparing backup with source and exclusion patterns..." -ForegroundColor Cyan
 
         try {
             # Scan and save result to file (for delete script to use later)
-            # Don't suppress stderr so we can see Python errors
-            $pythonOutput = python "$scanScript" "$destination" "$configPath" --output "$scanResultFile" 2>&1
+            $scannedByWorker = $false
+            try {
+                $null = Invoke-PythonWorker -Method "scan" -Params @{
+                    backup_path = $destination; config = $configPath; mirror_source = $source; output = $scanResultFile
+                }
+                $scannedByWorker = $true
+            } catch {
+                Write-Host "  Python worker: $_ - running scan-excluded.py directly" -ForegroundColor DarkGray
+            }
 
-            # Check if command succeeded
-            if ($LASTEXITCODE -ne 0) {
-                Write-Host "  Warning: Python scan failed with exit code $LASTEXITCODE" -ForegroundColor Yellow
-                if ($pythonOutput) {
-                    Write-Host "  Error output: $pythonOutput" -ForegroundColor Yellow
+            if (-not $scannedByWorker) {
+                # Don't suppress stderr so we can see Python errors
+                $pythonOutput = python "$scanScript" "$destination" "$configPath" --mirror-source "$source" --output "$scanResultFile" 2>&1
+
+                # Check if command succeeded
+                if ($LASTEXITCODE -ne 0) {
+                    Write-Host "  Warning: Python scan failed with exit code $LASTEXITCODE" -ForegroundColor Yellow
+                    if ($pythonOutput) {
+                        Write-Host "  Error output: $pythonOutput" -ForegroundColor Yellow
+                    }
+                    throw "Python scan-excluded.py failed"
                 }
-                throw "Python scan-excluded.py failed"
             }
 
             # Verify the JSON file was created and is readable
@@ -5241,8 +5400,30 @@ function Show-DeprecatedBackupFiles {
             if ($scanData.files) {
                 $excludedInBackup = @($scanData.files)
             }
+            if ($scanData.extra_directories) {
+                $extraDirs = @($scanData.extra_directories)
+            }
+            if ($scanData.extra_files) {
+                $extraFiles = @($scanData.extra_files)
+            }
+            if ($scanData.changed_file_count) {
+                $changedFileCount = $scanData.changed_file_count
+            }
 
+            Write-Host "  Found $($extraDirs.Count) deleted directories, $($extraFiles.Count) deleted files" -ForegroundColor Gray
             Write-Host "  Found $($excludedDirsInBackup.Count) excluded directories, $($excludedInBackup.Count) excluded files" -ForegroundColor Gray
+            if ($changedFileCount -gt 0) {
+                Write-Host "  $changedFileCount files changed since the last backup (not touched by this cleanup; the next backup run refreshes them)" -ForegroundColor DarkGray
+            }
+
+            # Space held by each exclusion pattern, largest first
+            if ($scanData.reclaimable -and $scanData.reclaimable.total_bytes -gt 0) {
+                $reclaimable = $scanData.reclaimable
+                Write-Host ("  Reclaimable by exclusion patterns: {0:N1} MB" -f ($reclaimable.total_bytes / 1MB)) -ForegroundColor Gray
+                foreach ($pattern in (@($reclaimable.by_pattern.PSObject.Properties) | Select-Object -First 5)) {
+                    Write-Host ("    {0,-24} {1,10:N1} MB  ({2:N0} files)" -f $pattern.Name, ($pattern.Value.bytes / 1MB), $pattern.Value.files) -ForegroundColor DarkGray
+                }
+            }
         }
         catch {
             Write-Host "  Warning: Could not scan for excluded files: $($_.Exception.Message)" -ForegroundColor Yellow
@@ -5253,6 +5434,8 @@ function Show-DeprecatedBackupFiles {
         Write-Host "  Warning: scan-excluded.py not found at: $scanScript" -ForegroundColor Yellow
     }
 
+    $extraFileCount = $extraFiles.Count
+    $extraDirCount = $extraDirs.Count
     $excludedFileCount = $excludedInBackup.Count
     $excludedDirCount = $excludedDirsInBackup.Count
 
@@ -5262,7 +5445,7 @@ function Show-DeprecatedBackupFiles {
 
     if ($totalFiles -eq 0 -and $totalDirs -eq 0) {
         Write-Host "✅ No deprecated files found! Backup is clean." -ForegroundColor Green
-        Remove-Item $tempLog -Force -ErrorAction SilentlyContinue
+        Remove-Item $scanResultFile -Force -ErrorAction SilentlyContinue
         Invoke-StandardPause
         return
     }
@@ -5286,18 +5469,15 @@ function Show-DeprecatedBackupFiles {
     $previewCount = 0
 
     # Show deleted files/dirs first
-    foreach ($item in ($extraFiles + $extraDirs)) {
+    foreach ($file in $extraFiles) {
         if ($previewCount -ge 20) { break }
-        if ($item -match '\*EXTRA (File|Dir)\s+(.+)$') {
-            $type = $matches[1]
-            $path = $matches[2].Trim()
-            if ($type -eq "File") {
-                Write-Host "  [F] $path" -ForegroundColor Gray
-            } else {
-                Write-Host "  [D] $path" -ForegroundColor DarkGray
-            }
-            $previewCount++
-        }
+        Write-Host "  [F] $file" -ForegroundColor Gray
+        $previewCount++
+    }
+    foreach ($dir in $extraDirs) {
+        if ($previewCount -ge 20) { break }
+        Write-Host "  [D] $dir" -ForegroundColor DarkGray
+        $previewCount++
     }
 
     # Show excluded items
@@ -5343,16 +5523,29 @@ function Show-DeprecatedBackupFiles {
             $report += "    Files: $excludedFileCount"
             $report += "    Directories: $excludedDirCount"
             $report += ""
+
+            if ($reclaimable) {
+                $report += "RECLAIMABLE SPACE BY PATTERN ({0:N1} MB total):" -f ($reclaimable.total_bytes / 1MB)
+                $report += "-" * 80
+                foreach ($pattern in $reclaimable.by_pattern.PSObject.Properties) {
+                    $report += "  {0,-30} {1,12:N1} MB {2,12:N0} files {3,8:N0} matches" -f $pattern.Name, ($pattern.Value.bytes / 1MB), $pattern.Value.files, $pattern.Value.matches
+                }
+                $report += ""
+                $report += "RECLAIMABLE SPACE BY TOP-LEVEL FOLDER:"
+                $report += "-" * 80
+                foreach ($folder in $reclaimable.by_top_level.PSObject.Properties) {
+                    $report += "  {0,-30} {1,12:N1} MB {2,12:N0} files" -f $folder.Name, ($folder.Value.bytes / 1MB), $folder.Value.files
+                }
+                $report += ""
+            }
             $report += "=" * 80
             $report += ""
 
             if ($extraDirs.Count -gt 0) {
                 $report += "DELETED DIRECTORIES ($extraDirCount):"
                 $report += "-" * 80
-                foreach ($item in $extraDirs) {
-                    if ($item -match '\*EXTRA Dir\s+(.+)$') {
-                        $report += "  $($matches[1].Trim())"
-                    }
+                foreach ($dir in $extraDirs) {
+                    $report += "  $dir"
                 }
                 $report += ""
             }
@@ -5360,10 +5553,8 @@ function Show-DeprecatedBackupFiles {
             if ($extraFiles.Count -gt 0) {
                 $report += "DELETED FILES ($extraFileCount):"
                 $report += "-" * 80
-                foreach ($item in $extraFiles) {
-                    if ($item -match '\*EXTRA File\s+(.+)$') {
-                        $report += "  $($matches[1].Trim())"
-                    }
+                foreach ($file in $extraFiles) {
+                    $report += "  $file"
                 }
                 $report += ""
             }
@@ -5410,96 +5601,85 @@ function Show-DeprecatedBackupFiles {
                 $script:deletedDirs = 0
                 $script:deletedFiles = 0
 
-                # First, use robocopy to clean up files deleted from source
+                # First, remove the items deleted from source that the scan listed. This
+                # no longer mirrors with robocopy /MIR: that also rewrote changed files in
+                # place, which corrupts the objects a content store hardlinks into the backup
                 if ($extraFileCount -gt 0 -or $extraDirCount -gt 0) {
                     Write-Host "Removing items deleted from source..." -ForegroundColor Cyan
 
-                    # Create a temporary log for the cleanup operation
-                    $cleanupLog = Join-Path $env:TEMP "backup-cleanup.txt"
-
-                    # Start robocopy in background with verbose logging
-                    $cleanupJob = Start-Job -ScriptBlock {
-                        param($src, $dst, $log)
-                        # Use /TEE to write to both log and stdout for progress monitoring
-                        $cmd = "robocopy `"$src`" `"$dst`" /MIR /R:3 /W:5 /LOG:`"$log`" /NP /XJ /X 2>&1"
-                        Invoke-Expression $cmd
-                    } -ArgumentList $source, $destination, $cleanupLog
-
-                    $robocopyDeletedDirs = 0
-                    $robocopyDeletedFiles = 0
-                    $startTime = Get-Date
-                    $totalExpected = $extraDirCount + $extraFileCount
-                    $spinnerChars = @('|', '/', '-', '\')
-                    $spinnerIndex = 0
-                    $lastLogSize = 0
-
-                    # Monitor job progress with activity indicator
-                    while ($cleanupJob.State -eq 'Running') {
-                        Start-Sleep -Milliseconds 250
-
-                        $elapsed = (Get-Date) - $startTime
-                        $elapsedStr = "{0:mm\:ss}" -f $elapsed
-                        $spinner = $spinnerChars[$spinnerIndex % 4]
-                        $spinnerIndex++
-
-                        # Try to read current progress from log file
-                        $currentProcessed = 0
-                        if (Test-Path $cleanupLog) {
-                            try {
-                                # Check file size as activity indicator
-                                $logFile = Get-Item $cleanupLog -ErrorAction SilentlyContinue
-                                if ($logFile) {
-                                    $currentLogSize = $logFile.Length
-                                    if ($currentLogSize -ne $lastLogSize) {
-                                        $lastLogSize = $currentLogSize
-
-                                        # Try to count EXTRA entries
-                                        $logStream = [System.IO.FileStream]::new($cleanupLog, 'Open', 'Read', 'ReadWrite')
-                                        $reader = New-Object System.IO.StreamReader($logStream)
-                                        $logContent = $reader.ReadToEnd()
-                                        $reader.Close()
-                                        $logStream.Close()
-
-                                        $currentProcessed = ([regex]::Matches($logContent, '\*EXTRA')).Count
-                                    }
-                                }
-                            } catch {
-                                # Log locked, continue with spinner
+                    $extraDeletedDirs = 0
+                    $extraDeletedFiles = 0
+                    $deleteScript = Join-Path $scriptDir "delete-excluded.py"
+                    $extraScanFile = Join-Path $scriptDir "backup-extra-scan.json"
+                    $extraResultFile = Join-Path $scriptDir "backup-extra-delete-result.json"
+
+                    if (Test-Path $deleteScript) {
+                        # Same layout as a scan result, so delete-excluded.py takes it unchanged
+                        $extraScan = ConvertTo-Json -Depth 3 -InputObject @{ directories = @($extraDirs); files = @($extraFiles) }
+                        [System.IO.File]::WriteAllText($extraScanFile, $extraScan)
+
+                        $deletedByWorker = $false
+                        try {
+                            $null = Invoke-PythonWorker -Method "delete" -TimeoutSeconds 3600 -Params @{
+                                backup_path = $destination; scan_result = $extraScanFile; output = $extraResultFile
+                                trash = $false
                             }
+                            $deletedByWorker = $true
+                        } catch [System.InvalidOperationException] {
+                            Write-Host "  Python worker: $_ - running delete-excluded.py directly" -ForegroundColor DarkGray
+                        } catch {
+                            Write-Host "  Warning: Python worker delete failed ($_) - rescan before deleting again" -ForegroundColor Yellow
+                            $deletedByWorker = $true
                         }
 
-                        # Show progress with spinner
-                        if ($totalExpected -gt 0 -and $currentProcessed -gt 0) {
-                            $pct = [math]::Min([math]::Floor(($currentProcessed / $totalExpected) * 100), 100)
-                            Write-Host "`r  $spinner Progress: $pct% | Processed: $currentProcessed / $totalExpected | Elapsed: $elapsedStr" -NoNewline -ForegroundColor Yellow
-                        } else {
-                            Write-Host "`r  $spinner Working... | Expected: $totalExpected items | Elapsed: $elapsedStr" -NoNewline -ForegroundColor Yellow
+                        if (-not $deletedByWorker) {
+                            $null = Start-Process -FilePath "python" `
+                                -ArgumentList "`"$deleteScript`" `"$destination`" `"$extraScanFile`" --output `"$extraResultFile`"" `
+                                -NoNewWindow -Wait -PassThru
                         }
-                    }
-
-                    # Wait for job to complete
-                    $null = Receive-Job $cleanupJob -Wait -AutoRemoveJob
 
-                    # Final count from robocopy log
-                    if (Test-Path $cleanupLog) {
-                        try {
-                            $logContent = Get-Content $cleanupLog -Raw -ErrorAction SilentlyContinue
-                            # Count EXTRA Dir and EXTRA File separately
-                            $robocopyDeletedDirs = ([regex]::Matches($logContent, '\*EXTRA Dir')).Count
-                            $robocopyDeletedFiles = ([regex]::Matches($logContent, '\*EXTRA File')).Count
-                        } catch {
-                            # Use expected counts as fallback
-                            $robocopyDeletedDirs = $extraDirCount
-                            $robocopyDeletedFiles = $extraFileCount
+                        if (Test-Path $extraResultFile) {
+                            $extraData = Get-Content $extraResultFile -Raw | ConvertFrom-Json
+                            $extraDeletedDirs = $extraData.deleted_dirs
+                            $extraDeletedFiles = $extraData.deleted_files
+                            if ($extraData.errors -and $extraData.errors.Count -gt 0) {
+                                Write-Host "  ⚠️  Warning: $($extraData.errors.Count) items failed to delete" -ForegroundColor Yellow
+                                foreach ($err in (@($extraData.errors) | Select-Object -First 5)) {
+                                    Write-Host "    $err" -ForegroundColor Gray
+                                }
+                            }
+                            Remove-Item $extraResultFile -Force -ErrorAction SilentlyContinue
+                        }
+                        Remove-Item $extraScanFile -Force -ErrorAction SilentlyContinue
+                    } else {
+                        foreach ($dir in $extraDirs) {
+                            $fullPath = Join-Path $destination $dir
+                            if (Test-Path -LiteralPath $fullPath) {
+                                try {
+                                    Remove-Item -LiteralPath $fullPath -Recurse -Force -ErrorAction Stop
+                                    $extraDeletedDirs++
+                                } catch {
+                                    Write-Host "  Failed to delete: $dir" -ForegroundColor Red
+                                }
+                            }
+                        }
+                        foreach ($file in $extraFiles) {
+                            $fullPath = Join-Path $destination $file
+                            if (Test-Path -LiteralPath $fullPath) {
+                                try {
+                                    Remove-Item -LiteralPath $fullPath -Force -ErrorAction Stop
+                                    $extraDeletedFiles++
+                                } catch {
+                                    Write-Host "  Failed to delete: $file" -ForegroundColor Red
+                                }
+                            }
                         }
-                        Remove-Item $cleanupLog -Force -ErrorAction SilentlyContinue
                     }
 
-                    Write-Host "`r                                                                                        " -NoNewline
-                    Write-Host "`r  Removed $robocopyDeletedDirs deleted dirs, $robocopyDeletedFiles deleted files" -ForegroundColor Gray
+                    Write-Host "  Removed $extraDeletedDirs deleted dirs, $extraDeletedFiles deleted files" -ForegroundColor Gray
 
-                    $script:deletedDirs += $robocopyDeletedDirs
-                    $script:deletedFiles += $robocopyDeletedFiles
+                    $script:deletedDirs += $extraDeletedDirs
+                    $script:deletedFiles += $extraDeletedFiles
                 }
 
                 # Then, delete excluded items (files that exist in source but are now excluded)
@@ -5511,19 +5691,47 @@ function Show-DeprecatedBackupFiles {
                     $scanResultFile = Join-Path $scriptDir "backup-scan-result.json"
                     $deleteResultFile = Join-Path $scriptDir "backup-delete-result.json"
 
+                    # Deferred delete: rename matched dirs aside and purge them in the background
+                    $trashArg = ""
+                    if ($config.backupDev.PSObject.Properties.Name -contains "deferredDelete" -and $config.backupDev.deferredDelete) {
+                        $trashArg = " --trash"
+                    }
+
                     if ((Test-Path $deleteScript) -and (Test-Path $scanResultFile)) {
                         try {
-                            # Run delete script directly - output streams to console in real-time
-                            # Use Start-Process with -Wait and -NoNewWindow for live progress display
-                            $null = Start-Process -FilePath "python" `
-                                -ArgumentList "`"$deleteScript`" `"$destination`" `"$scanResultFile`" --output `"$deleteResultFile`"" `
-                                -NoNewWindow -Wait -PassThru
+                            # The worker prints progress to the console's stderr as it deletes
+                            $deletedByWorker = $false
+                            try {
+                                $null = Invoke-PythonWorker -Method "delete" -TimeoutSeconds 3600 -Params @{
+                                    backup_path = $destination; scan_result = $scanResultFile; output = $deleteResultFile
+                                    trash = [bool]$trashArg
+                                }
+                                $deletedByWorker = $true
+                            } catch [System.InvalidOperationException] {
+                                Write-Host "  Python worker: $_ - running delete-excluded.py directly" -ForegroundColor DarkGray
+                            } catch {
+                                # The worker may have deleted part of the list already; running the
+                                # delete again would work from a stale scan, so stop here instead
+                                Write-Host "  Warning: Python worker delete failed ($_) - rescan before deleting again" -ForegroundColor Yellow
+                                $deletedByWorker = $true
+                            }
+
+                            if (-not $deletedByWorker) {
+                                # Run delete script directly - output streams to console in real-time
+                                # Use Start-Process with -Wait and -NoNewWindow for live progress display
+                                $null = Start-Process -FilePath "python" `
+                                    -ArgumentList "`"$deleteScript`" `"$destination`" `"$scanResultFile`" --output `"$deleteResultFile`"$trashArg" `
+                                    -NoNewWindow -Wait -PassThru
+                            }
 
                             # Read result from output file
                             if (Test-Path $deleteResultFile) {
                                 $deleteData = Get-Content $deleteResultFile -Raw | ConvertFrom-Json
                                 $excludedDeletedDirs = $deleteData.deleted_dirs
                                 $excludedDeletedFiles = $deleteData.deleted_files
+                                if ($deleteData.staged_dirs -gt 0) {
+                                    Write-Host "  $($deleteData.staged_dirs) directories moved to .pending-delete - purging in the background" -ForegroundColor Gray
+                                }
 
                                 # Check for errors
                                 if ($deleteData.errors -and $deleteData.errors.Count -gt 0) {
@@ -5635,7 +5843,7 @@ function Show-DeprecatedBackupFiles {
     }
     }
 
-    Remove-Item $tempLog -Force -ErrorAction SilentlyContinue
+    Remove-Item $scanResultFile -Force -ErrorAction SilentlyContinue
     Invoke-StandardPause
 }
 
@@ -138,10 +138,21 @@ function Get-ExclusionFlags {
         $allExcludeFiles += $exclusions.files
     }
 
+    # Directories staged for background deletion (delete-excluded.py --trash) are never copied or purged
+    $allExcludeDirs += ".pending-delete"
+
     # Remove duplicates
     $allExcludeDirs = $allExcludeDirs | Select-Object -Unique
     $allExcludeFiles = $allExcludeFiles | Select-Object -Unique
 
+    # Path globs (build/**/obj) have no robocopy equivalent - only the Python engine applies them
+    $pathRules = @(@($allExcludeDirs) + @($allExcludeFiles) | Where-Object { $_ -match '[/\\]' })
+    if ($pathRules.Count -gt 0) {
+        Write-Host "Note: robocopy ignores $($pathRules.Count) path-glob exclusion(s); the Python engine (backupDev.engine = 'python') applies them" -ForegroundColor Yellow
+        $allExcludeDirs = @($allExcludeDirs | Where-Object { $_ -notmatch '[/\\]' })
+        $allExcludeFiles = @($allExcludeFiles | Where-Object { $_ -notmatch '[/\\]' })
+    }
+
     # Build directory exclusion flags
     if ($allExcludeDirs.Count -gt 0) {
         $excludeFlags += " /XD"
@@ -181,6 +192,29 @@ if ($config.PSObject.Properties.Name -contains "backupDev" -and
     $useMirrorMode = $config.backupDev.mirrorMode
 }
 
+# Determine backup engine ("robocopy" by default, "python" uses copy-backup.py)
+$usePythonEngine = $false
+if ($config.PSObject.Properties.Name -contains "backupDev" -and
+    $config.backupDev.PSObject.Properties.Name -contains "engine") {
+    $usePythonEngine = $config.backupDev.engine -eq "python"
+}
+
+# Content-addressed store (Python engine only): identical files are stored once
+$useContentStore = $false
+if ($config.PSObject.Properties.Name -contains "backupDev" -and
+    $config.backupDev.PSObject.Properties.Name -contains "contentStore") {
+    $useContentStore = [bool]$config.backupDev.contentStore
+}
+
+# Store objects are hardlinked into the backup, and robocopy rewrites files in
+# place - through every link to the same object. Once a store exists next to
+# the destination, only the Python engine (which replaces links) may write it.
+$storePath = "$($destination.TrimEnd('\', '/')).store"
+if (($useContentStore -or (Test-Path $storePath)) -and -not $usePythonEngine) {
+    Write-Host "Note: $storePath holds content-store objects linked into the backup; using the Python engine instead of robocopy" -ForegroundColor Yellow
+    $usePythonEngine = $true
+}
+
 # Display exclusion info
 if ($exclusionFlags) {
     Write-Host "Exclusions configured from config.json" -ForegroundColor Cyan
@@ -289,117 +323,8 @@ function Show-Progress {
     }
 }
 
-# PASS 1: Count total files and directories
-if ($testMode) {
-    Write-Host "Pass 1: Quick scan (limited to $testModeLimit items for test mode)..." -ForegroundColor Cyan
-} elseif ($dryRun) {
-    Write-Host "Pass 1: Scanning source directory to count files (dry-run)..." -ForegroundColor Cyan
-} else {
-    Write-Host "Pass 1: Scanning source directory to count files..." -ForegroundColor Cyan
-}
-
-$countLog = Join-Path $scriptDir "temp_count_log.txt"
-
-# Run robocopy in list-only mode to count files
-# For count-only mode, use /E instead of /MIR to only count source files (not deletes)
-# For backup operations, use config setting (default /E for safety)
-$robocopyMode = if ($countOnly) { "/E" } elseif ($useMirrorMode) { "/MIR" } else { "/E" }
-
-$countJob = Start-Job -ScriptBlock {
-    param($src, $dst, $log, $mode, $exclusions)
-    $cmd = "robocopy `"$src`" `"$dst`" /L $mode /R:0 /W:0 /LOG:`"$log`" /NP /NDL /XJ $exclusions 2>&1"
-    Invoke-Expression $cmd
-} -ArgumentList $source, $destination, $countLog, $robocopyMode, $exclusionFlags
-
-$countStartTime = Get-Date
-$countLimitReached = $false
-
-# Monitor counting progress
-while ($countJob.State -eq 'Running') {
-    Start-Sleep -Milliseconds 200
-
-    if (Test-Path $countLog) {
-        try {
-            # Count lines in the log file as a proxy for progress
-            $lineCount = (Get-Content $countLog -ErrorAction SilentlyContinue).Count
-
-            # In test mode, stop counting after we have enough lines
-            # Robocopy outputs multiple lines per file/dir, so use 1.5x the limit
-            if ($testMode -and $lineCount -ge ($testModeLimit * 1.5)) {
-                Stop-Job $countJob
-                $countLimitReached = $true
-                # Don't clear the line - leave the scanning progress visible
-                break
-            }
-
-            $elapsed = (Get-Date) - $countStartTime
-            Write-Host "`rScanning... Time: $($elapsed.ToString('mm\:ss')) | Lines: $lineCount" -NoNewline -ForegroundColor Yellow
-        }
-        catch {
-            # File might be locked, skip this iteration
-        }
-    }
-}
-
-# Get final counts
-$null = Receive-Job $countJob -Wait -AutoRemoveJob
-
-if (Test-Path $countLog) {
-    $logContent = Get-Content $countLog -Raw
-
-    # In test mode with limit reached, use half the limit as estimate
-    if ($testMode -and $countLimitReached) {
-        # The scanning progress used -NoNewline, so output a newline to preserve it
-        Write-Host ""
-        # Set approximate values for test mode (split evenly between dirs and files)
-        $script:totalDirs = [int]($testModeLimit / 2)
-        $script:totalFiles = [int]($testModeLimit / 2)
-    } else {
-        # The scanning progress used -NoNewline, so output a newline
-        Write-Host ""
-        # Parse the summary section for accurate counts
-        # Robocopy summary format: Total Copied Skipped Mismatch FAIL EXTRAS
-        # We want Copied + EXTRAS as these are the operations that will occur in Pass 2
-        if ($logContent -match '(?m)^\s+Dirs\s*:\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)') {
-            # Dirs: Total=1, Copied=2, Skipped=3, Mismatch=4, FAIL=5, EXTRAS=6
-            $dirsTotal = [int]$matches[1]
-            $dirsCopied = [int]$matches[2]
-            $dirsSkipped = [int]$matches[3]
-            $dirsExtras = [int]$matches[6]
-
-            # For inventory: use robocopy's "Total" column which is the source count
-            # This matches what Windows Explorer shows
-            $script:totalDirsInSource = $dirsTotal
-            # For "Need to Copy": operations that would occur (new/modified + deletes)
-            $script:totalDirs = $dirsCopied + $dirsExtras
-        }
-
-        if ($logContent -match '(?m)^\s+Files\s*:\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)') {
-            # Files: Total=1, Copied=2, Skipped=3, Mismatch=4, FAIL=5, EXTRAS=6
-            $filesTotal = [int]$matches[1]
-            $filesCopied = [int]$matches[2]
-            $filesSkipped = [int]$matches[3]
-            $filesExtras = [int]$matches[6]
-
-            # For inventory: use robocopy's "Total" column which is the source count
-            # This matches what Windows Explorer shows
-            $script:totalFilesInSource = $filesTotal
-            # For "Need to Copy": operations that would occur (new/modified + deletes)
-            $script:totalFiles = $filesCopied + $filesExtras
-        }
-    }
-
-    Remove-Item $countLog -Force -ErrorAction SilentlyContinue
-}
-
-if ($testMode -and $countLimitReached) {
-    Write-Host "Quick scan complete! Found ~$script:totalDirs directories and ~$script:totalFiles files (test mode limit)" -ForegroundColor Green
-} else {
-    Write-Host "Scan complete! Found $script:totalDirs directories and $script:totalFiles files" -ForegroundColor Green
-}
-
-# If count-only mode, display summary and exit
-if ($countOnly) {
+# Function to display the count-mode summary table
+function Show-CountSummary {
     $changedItems = $script:totalDirs + $script:totalFiles
     $inventoryItems = $script:totalDirsInSource + $script:totalFilesInSource
     $scriptEndTime = Get-Date
@@ -437,39 +362,280 @@ if ($countOnly) {
     Write-Host ""
     Write-Host "  Runtime: $runtimeFormatted" -ForegroundColor Gray
     Write-Separator
-    exit 0
 }
 
-Write-Host ""
-if ($dryRun) {
-    Write-Host "Pass 2: Simulating backup with progress tracking (no files will be copied)..." -ForegroundColor Cyan
+if ($usePythonEngine) {
+    # Python engine: one scan plans the copy, then a thread pool copies only
+    # what changed. copy-backup.py reports PLAN:/PROGRESS: lines on stderr.
+    $engineScript = Join-Path $scriptDir "copy-backup.py"
+    $engineResultFile = Join-Path $scriptDir "backup-copy-result.json"
+
+    if (-not (Test-Path $engineScript)) {
+        Write-Host "Error: copy-backup.py not found at: $engineScript" -ForegroundColor Red
+        exit 1
+    }
+
+    $engineArgs = @($engineScript, $source, $destination, $configPath, "--output", $engineResultFile)
+    if ($countOnly) {
+        $engineArgs += "--count"
+    } else {
+        if ($dryRun) { $engineArgs += "--dry-run" }
+        if ($testMode) { $engineArgs += @("--limit", "$testModeLimit") }
+        if ($useMirrorMode) { $engineArgs += "--mirror" }
+        if ($useContentStore) { $engineArgs += "--store" }
+    }
+
+    if ($countOnly) {
+        Write-Host "Scanning source directory to count files (Python engine)..." -ForegroundColor Cyan
+    } elseif ($dryRun) {
+        Write-Host "Scanning source and backup (Python engine, dry-run)..." -ForegroundColor Cyan
+    } else {
+        Write-Host "Scanning source and backup (Python engine)..." -ForegroundColor Cyan
+    }
+
+    & python @engineArgs 2>&1 | ForEach-Object {
+        $line = "$_"
+        if ($line -match '^PLAN:(\d+):(\d+):(\d+):(\d+):(\d+)$') {
+            $script:totalDirs = [int]$matches[1]
+            $script:totalFiles = [int]$matches[2]
+            $script:totalDirsInSource = [int]$matches[4]
+            $script:totalFilesInSource = [int]$matches[5]
+            Write-Host "Scan complete! Found $script:totalDirs directories and $script:totalFiles files to process" -ForegroundColor Green
+            if (-not $countOnly -and -not $dryRun) {
+                Write-Host ""
+                Write-Host "Copying with progress tracking..." -ForegroundColor Cyan
+            }
+        } elseif ($line -match '^PROGRESS:(\d+):(\d+):(\d+):(\d+):(\d+)$') {
+            $script:dirCount = [int]$matches[2]
+            $script:copiedCount = [int]$matches[3]
+            $script:fileCount = $script:copiedCount
+            Show-Progress -Dirs $script:dirCount -Files $script:fileCount -Copied $script:copiedCount -Extra $script:extraCount -TotalFiles $script:totalFiles -TotalDirs $script:totalDirs
+        } elseif ($line) {
+            Add-Content -Path $detailedLog -Value $line
+        }
+    }
+
+    if ($LASTEXITCODE -ne 0 -or -not (Test-Path $engineResultFile)) {
+        Write-Host ""
+        Write-Host "Error: Python backup engine failed (exit code $LASTEXITCODE). See $detailedLog" -ForegroundColor Red
+        exit 1
+    }
+
+    $engineResult = Get-Content $engineResultFile -Raw | ConvertFrom-Json
+    Remove-Item $engineResultFile -Force -ErrorAction SilentlyContinue
+
+    if ($countOnly) {
+        Show-CountSummary
+        exit 0
+    }
+
+    if (-not $dryRun) {
+        $script:dirCount = $engineResult.created_dirs + $engineResult.deleted_dirs
+        $script:copiedCount = $engineResult.copied_files
+        $script:extraCount = $engineResult.deleted_files
+        $script:fileCount = $script:copiedCount + $script:extraCount
+    }
+
+    foreach ($err in $engineResult.errors) {
+        Add-Content -Path $detailedLog -Value "ERROR: $err"
+    }
+
+    # Robocopy-style summary table so the history log below picks it up
+    $failedCount = @($engineResult.errors).Count
+    $summaryTable = @(
+        ("-" * 78),
+        "               Total    Copied   Skipped  Mismatch    FAILED    Extras",
+        ("    Dirs : {0,9}{1,10}{2,10}{3,10}{4,10}{5,10}" -f $engineResult.source_dirs, $engineResult.dirs_to_create, ($engineResult.source_dirs - $engineResult.dirs_to_create), 0, 0, $engineResult.extra_dirs),
+        ("   Files : {0,9}{1,10}{2,10}{3,10}{4,10}{5,10}" -f $engineResult.source_files, $engineResult.files_to_copy, $engineResult.skipped_files, 0, $failedCount, $engineResult.extra_files),
+        ("   Bytes : {0,9}{1,10}" -f $engineResult.bytes_to_copy, $(if ($dryRun) { 0 } else { $engineResult.copied_bytes })),
+        "   Ended : $(Get-Date -Format 'yyyy-MM-dd HH:mm:ss')"
+    )
+    Add-Content -Path $detailedLog -Value $summaryTable
 } else {
-    Write-Host "Pass 2: Starting backup with progress tracking..." -ForegroundColor Cyan
-}
+    # PASS 1: Count total files and directories
+    if ($testMode) {
+        Write-Host "Pass 1: Quick scan (limited to $testModeLimit items for test mode)..." -ForegroundColor Cyan
+    } elseif ($dryRun) {
+        Write-Host "Pass 1: Scanning source directory to count files (dry-run)..." -ForegroundColor Cyan
+    } else {
+        Write-Host "Pass 1: Scanning source directory to count files..." -ForegroundColor Cyan
+    }
 
-# Start robocopy process in background
-$robocopyJob = Start-Job -ScriptBlock {
-    param($src, $dst, $log, $testMode, $mode, $exclusions, $dryRun)
+    $countLog = Join-Path $scriptDir "temp_count_log.txt"
+
+    # Run robocopy in list-only mode to count files
+    # For count-only mode, use /E instead of /MIR to only count source files (not deletes)
+    # For backup operations, use config setting (default /E for safety)
+    $robocopyMode = if ($countOnly) { "/E" } elseif ($useMirrorMode) { "/MIR" } else { "/E" }
+
+    $countJob = Start-Job -ScriptBlock {
+        param($src, $dst, $log, $mode, $exclusions)
+        $cmd = "robocopy `"$src`" `"$dst`" /L $mode /R:0 /W:0 /LOG:`"$log`" /NP /NDL /XJ $exclusions 2>&1"
+        Invoke-Expression $cmd
+    } -ArgumentList $source, $destination, $countLog, $robocopyMode, $exclusionFlags
+
+    $countStartTime = Get-Date
+    $countLimitReached = $false
+
+    # Monitor counting progress
+    while ($countJob.State -eq 'Running') {
+        Start-Sleep -Milliseconds 200
+
+        if (Test-Path $countLog) {
+            try {
+                # Count lines in the log file as a proxy for progress
+                $lineCount = (Get-Content $countLog -ErrorAction SilentlyContinue).Count
+
+                # In test mode, stop counting after we have enough lines
+                # Robocopy outputs multiple lines per file/dir, so use 1.5x the limit
+                if ($testMode -and $lineCount -ge ($testModeLimit * 1.5)) {
+                    Stop-Job $countJob
+                    $countLimitReached = $true
+                    # Don't clear the line - leave the scanning progress visible
+                    break
+                }
 
-    # Build robocopy command with appropriate flags
-    # /XJ excludes junction points (important for Scoop directories)
-    # Mode is either /MIR (mirror with deletions) or /E (copy without deletions)
-    # /L flag for dry-run (list-only mode - no actual copying)
-    $listOnlyFlag = if ($dryRun) { "/L" } else { "" }
-    $robocopyFlags = "$listOnlyFlag $mode /R:3 /W:5 /LOG+:`"$log`" /NP /NDL /ETA /XJ $exclusions"
+                $elapsed = (Get-Date) - $countStartTime
+                Write-Host "`rScanning... Time: $($elapsed.ToString('mm\:ss')) | Lines: $lineCount" -NoNewline -ForegroundColor Yellow
+            }
+            catch {
+                # File might be locked, skip this iteration
+            }
+        }
+    }
 
-    # Execute robocopy with the constructed flags
-    $cmd = "robocopy `"$src`" `"$dst`" $robocopyFlags 2>&1"
-    Invoke-Expression $cmd
-} -ArgumentList $source, $destination, $detailedLog, $testMode, $robocopyMode, $exclusionFlags, $dryRun
+    # Get final counts
+    $null = Receive-Job $countJob -Wait -AutoRemoveJob
 
-$lastProgress = Get-Date
+    if (Test-Path $countLog) {
+        $logContent = Get-Content $countLog -Raw
 
-# Monitor job progress by checking log file
-while ($robocopyJob.State -eq 'Running') {
-    Start-Sleep -Milliseconds 200
+        # In test mode with limit reached, use half the limit as estimate
+        if ($testMode -and $countLimitReached) {
+            # The scanning progress used -NoNewline, so output a newline to preserve it
+            Write-Host ""
+            # Set approximate values for test mode (split evenly between dirs and files)
+            $script:totalDirs = [int]($testModeLimit / 2)
+            $script:totalFiles = [int]($testModeLimit / 2)
+        } else {
+            # The scanning progress used -NoNewline, so output a newline
+            Write-Host ""
+            # Parse the summary section for accurate counts
+            # Robocopy summary format: Total Copied Skipped Mismatch FAIL EXTRAS
+            # We want Copied + EXTRAS as these are the operations that will occur in Pass 2
+            if ($logContent -match '(?m)^\s+Dirs\s*:\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)') {
+                # Dirs: Total=1, Copied=2, Skipped=3, Mismatch=4, FAIL=5, EXTRAS=6
+                $dirsTotal = [int]$matches[1]
+                $dirsCopied = [int]$matches[2]
+                $dirsSkipped = [int]$matches[3]
+                $dirsExtras = [int]$matches[6]
+
+                # For inventory: use robocopy's "Total" column which is the source count
+                # This matches what Windows Explorer shows
+                $script:totalDirsInSource = $dirsTotal
+                # For "Need to Copy": operations that would occur (new/modified + deletes)
+                $script:totalDirs = $dirsCopied + $dirsExtras
+            }
+
+            if ($logContent -match '(?m)^\s+Files\s*:\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)') {
+                # Files: Total=1, Copied=2, Skipped=3, Mismatch=4, FAIL=5, EXTRAS=6
+                $filesTotal = [int]$matches[1]
+                $filesCopied = [int]$matches[2]
+                $filesSkipped = [int]$matches[3]
+                $filesExtras = [int]$matches[6]
+
+                # For inventory: use robocopy's "Total" column which is the source count
+                # This matches what Windows Explorer shows
+                $script:totalFilesInSource = $filesTotal
+                # For "Need to Copy": operations that would occur (new/modified + deletes)
+                $script:totalFiles = $filesCopied + $filesExtras
+            }
+        }
 
-    # Read current log file content
+        Remove-Item $countLog -Force -ErrorAction SilentlyContinue
+    }
+
+    if ($testMode -and $countLimitReached) {
+        Write-Host "Quick scan complete! Found ~$script:totalDirs directories and ~$script:totalFiles files (test mode limit)" -ForegroundColor Green
+    } else {
+        Write-Host "Scan complete! Found $script:totalDirs directories and $script:totalFiles files" -ForegroundColor Green
+    }
+
+    # If count-only mode, display summary and exit
+    if ($countOnly) {
+        Show-CountSummary
+        exit 0
+    }
+
+    Write-Host ""
+    if ($dryRun) {
+        Write-Host "Pass 2: Simulating backup with progress tracking (no files will be copied)..." -ForegroundColor Cyan
+    } else {
+        Write-Host "Pass 2: Starting backup with progress tracking..." -ForegroundColor Cyan
+    }
+
+    # Start robocopy process in background
+    $robocopyJob = Start-Job -ScriptBlock {
+        param($src, $dst, $log, $testMode, $mode, $exclusions, $dryRun)
+
+        # Build robocopy command with appropriate flags
+        # /XJ excludes junction points (important for Scoop directories)
+        # Mode is either /MIR (mirror with deletions) or /E (copy without deletions)
+        # /L flag for dry-run (list-only mode - no actual copying)
+        $listOnlyFlag = if ($dryRun) { "/L" } else { "" }
+        $robocopyFlags = "$listOnlyFlag $mode /R:3 /W:5 /LOG+:`"$log`" /NP /NDL /ETA /XJ $exclusions"
+
+        # Execute robocopy with the constructed flags
+        $cmd = "robocopy `"$src`" `"$dst`" $robocopyFlags 2>&1"
+        Invoke-Expression $cmd
+    } -ArgumentList $source, $destination, $detailedLog, $testMode, $robocopyMode, $exclusionFlags, $dryRun
+
+    $lastProgress = Get-Date
+
+    # Monitor job progress by checking log file
+    while ($robocopyJob.State -eq 'Running') {
+        Start-Sleep -Milliseconds 200
+
+        # Read current log file content
+        if (Test-Path $detailedLog) {
+            try {
+                $logContent = Get-Content $detailedLog -ErrorAction SilentlyContinue
+
+                # Count different types of operations
+                $newDirs = ($logContent | Where-Object { $_ -match 'New Dir' }).Count
+                $extraDirs = ($logContent | Where-Object { $_ -match '\*EXTRA Dir' }).Count
+                $script:dirCount = $newDirs + $extraDirs
+
+                $newFiles = ($logContent | Where-Object { $_ -match 'New File' }).Count
+                $newerFiles = ($logContent | Where-Object { $_ -match 'Newer' }).Count
+                $extraFiles = ($logContent | Where-Object { $_ -match '\*EXTRA File' }).Count
+                $script:copiedCount = $newFiles + $newerFiles
+                $script:extraCount = $extraFiles
+                $script:fileCount = $script:copiedCount + $script:extraCount
+
+                # In test mode, stop after reaching the limit (dirs + files)
+                if ($testMode -and (($script:dirCount + $script:fileCount) -ge $testModeLimit)) {
+                    Stop-Job $robocopyJob
+                    break
+                }
+
+                # Update progress every 500ms
+                $now = Get-Date
+                if (($now - $lastProgress).TotalMilliseconds -ge 500) {
+                    Show-Progress -Dirs $script:dirCount -Files $script:fileCount -Copied $script:copiedCount -Extra $script:extraCount -TotalFiles $script:totalFiles -TotalDirs $script:totalDirs
+                    $lastProgress = $now
+                }
+            }
+            catch {
+                # File might be locked, skip this iteration
+            }
+        }
+    }
+
+    # Wait for job to complete
+    $null = Receive-Job $robocopyJob -Wait -AutoRemoveJob
+
+    # Parse log one final time to get complete counts
     if (Test-Path $detailedLog) {
         try {
             $logContent = Get-Content $detailedLog -ErrorAction SilentlyContinue
@@ -485,49 +651,11 @@ while ($robocopyJob.State -eq 'Running') {
             $script:copiedCount = $newFiles + $newerFiles
             $script:extraCount = $extraFiles
             $script:fileCount = $script:copiedCount + $script:extraCount
-
-            # In test mode, stop after reaching the limit (dirs + files)
-            if ($testMode -and (($script:dirCount + $script:fileCount) -ge $testModeLimit)) {
-                Stop-Job $robocopyJob
-                break
-            }
-
-            # Update progress every 500ms
-            $now = Get-Date
-            if (($now - $lastProgress).TotalMilliseconds -ge 500) {
-                Show-Progress -Dirs $script:dirCount -Files $script:fileCount -Copied $script:copiedCount -Extra $script:extraCount -TotalFiles $script:totalFiles -TotalDirs $script:totalDirs
-                $lastProgress = $now
-            }
-        }
-        catch {
-            # File might be locked, skip this iteration
         }
+        catch { }
     }
 }
 
-# Wait for job to complete
-$null = Receive-Job $robocopyJob -Wait -AutoRemoveJob
-
-# Parse log one final time to get complete counts
-if (Test-Path $detailedLog) {
-    try {
-        $logContent = Get-Content $detailedLog -ErrorAction SilentlyContinue
-
-        # Count different types of operations
-        $newDirs = ($logContent | Where-Object { $_ -match 'New Dir' }).Count
-        $extraDirs = ($logContent | Where-Object { $_ -match '\*EXTRA Dir' }).Count
-        $script:dirCount = $newDirs + $extraDirs
-
-        $newFiles = ($logContent | Where-Object { $_ -match 'New File' }).Count
-        $newerFiles = ($logContent | Where-Object { $_ -match 'Newer' }).Count
-        $extraFiles = ($logContent | Where-Object { $_ -match '\*EXTRA File' }).Count
-        $script:copiedCount = $newFiles + $newerFiles
-        $script:extraCount = $extraFiles
-        $script:fileCount = $script:copiedCount + $script:extraCount
-    }
-    catch { }
-}
-
 # Final progress update - clear line and show final state
 if ($script:fileCount -gt 0 -or $script:dirCount -gt 0) {
     # Only show progress if there were operations
@@ -171,6 +171,9 @@ function Add-NewExclusion {
     Write-Host "  1. Directory (e.g., 'my-folder', 'temp_*')" -ForegroundColor Gray
     Write-Host "  2. File pattern (e.g., '*.bak', 'debug_*')" -ForegroundColor Gray
     Write-Host ""
+    Write-Host "Path globs (e.g., 'build/**/obj', '*/cache/*.tmp', '/archive/old') are applied by" -ForegroundColor DarkGray
+    Write-Host "the Python engine and cleanup scans; robocopy only understands plain names." -ForegroundColor DarkGray
+    Write-Host ""
     $choice = Read-Host "Enter choice (1-2, or Q to cancel)"
 
     if ($choice -eq "Q" -or $choice -eq "q") {
@@ -0,0 +1,702 @@
+#!/usr/bin/env python3
+"""
+Copy the dev folder to its backup in a single scan (Python backup engine).
+
+backup-dev.ps1 normally runs robocopy twice: a /L pass to count what needs
+copying and then the real copy, with progress scraped from the log. This
+script plans the copy from one os.scandir walk of source and backup, skips
+files whose size and mtime already match (robocopy's 2-second tolerance),
+and copies the rest on a thread pool. On Linux the file data is moved with
+os.copy_file_range / os.sendfile so it never passes through Python buffers.
+
+Exclusions come from backupDev.exclusions in config.json. Plain names mean
+what robocopy /XD and /XF mean (directory names anywhere in the tree,
+file name wildcards); path globs such as build/**/obj are also supported
+(see exclusion_rules.py). Excluded directories are pruned, never
+descended. Symlinks and junctions are skipped like robocopy /XJ.
+
+With --store the backup becomes content-addressed: every file is hashed
+(BLAKE2b) on the copy thread pool and its data is stored once under
+<backup_path>.store/objects, no matter how many projects contain it. The
+backup tree still looks like a plain mirror because each file is a hardlink
+to its object (or a copy where the filesystem has no hardlinks), and every
+run writes a manifest of path -> hash to <backup_path>.store/manifests. A
+hash cache keyed by size/mtime means unchanged files are never rehashed.
+Hardlinked duplicates share one mtime, so with a store a file counts as
+unchanged when the hash cache knows its source size/mtime and the backup
+copy has that size, not by comparing the backup copy's mtime.
+
+Usage:
+    python copy-backup.py <source_path> <backup_path> <config_path>
+    python copy-backup.py <source_path> <backup_path> <config_path> --count
+    python copy-backup.py <source_path> <backup_path> <config_path> --dry-run
+    python copy-backup.py <source_path> <backup_path> <config_path> --limit 250
+    python copy-backup.py <source_path> <backup_path> <config_path> --mirror
+    python copy-backup.py <source_path> <backup_path> <config_path> --store [--store-path PATH]
+    python copy-backup.py --help
+
+Progress (stderr):
+    PLAN:<dirs>:<files>:<bytes>:<source_dirs>:<source_files>
+        once the scan is done - dirs/files/bytes that need copying
+    PROGRESS:<pct>:<dirs>:<files>:<processed>:<total>
+        every 500ms while copying - pct is by bytes, processed/total by items
+
+Output:
+    JSON object with inventory, plan and copy results (counts, bytes, errors)
+"""
+
+import argparse
+import errno
+import hashlib
+import json
+import os
+import shutil
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from exclusion_rules import get_matcher, read_exclusions
+from pending_delete import PENDING_DIR
+from tree_remover import is_link_entry, remove_tree
+
+# Robocopy (and FAT/exFAT timestamps) only resolve mtimes to 2 seconds
+MTIME_TOLERANCE = 2.0
+
+# Copies are I/O bound, so a few threads per core keep shares and SSDs busy
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Largest single copy_file_range/sendfile request (1 GiB)
+_ZERO_COPY_CHUNK = 1 << 30
+
+# Store object names: 160-bit BLAKE2b, read in 1 MiB blocks
+_DIGEST_SIZE = 20
+_HASH_BLOCK = 1024 * 1024
+
+# Windows file names are case-insensitive, so pair entries the same way
+_name_key = str.casefold if os.name == 'nt' else str
+
+
+def load_exclusions(config_path: str) -> tuple[list[str], list[str]]:
+    """Load exclusion patterns from config.json."""
+    try:
+        return read_exclusions(config_path)
+    except Exception as e:
+        print(f"Error loading config: {e}", file=sys.stderr)
+        return [], []
+
+
+# ── Planning ──
+
+def _list_dir(path: str) -> dict:
+    """List a directory as {name key: DirEntry}, skipping symlinks/junctions (robocopy /XJ)."""
+    entries = {}
+    with os.scandir(path) as it:
+        for entry in it:
+            if is_link_entry(entry):
+                continue
+            entries[_name_key(entry.name)] = entry
+    return entries
+
+
+def plan_backup(source_path: str, backup_path: str, exclude_dirs: list[str], exclude_files: list[str],
+                mirror: bool = False, keep_unchanged: bool = False, hash_cache: dict | None = None) -> dict:
+    """
+    Walk source and backup once and work out what the copy has to do.
+
+    hash_cache: the content store's hash cache ({rel path: [size, mtime_ns,
+    digest]}). A backup file is then up to date when the cache holds the
+    source's size and mtime and the backup copy has that size. Files the
+    cache doesn't know yet (first --store run) are compared by size/mtime.
+
+    Returns dict with:
+        - dirs: relative directories to create (parents before children)
+        - files: (relative path, size, mtime_ns) tuples to copy
+        - unchanged: the same tuples for files already up to date (only with keep_unchanged)
+        - extra_dirs / extra_files: backup items missing from the source (only with
+          mirror); they also hold backup items of the other type in the way of a
+          source file or directory
+        - source_dirs / source_files: inventory of the source after exclusions
+        - skipped_files: files already up to date in the backup
+        - bytes: total size of the files to copy
+        - errors: directories that could not be listed
+    """
+    matcher = get_matcher(exclude_dirs, exclude_files)
+    plan = {
+        'dirs': [],
+        'files': [],
+        'unchanged': [],
+        'extra_dirs': [],
+        'extra_files': [],
+        'source_dirs': 0,
+        'source_files': 0,
+        'skipped_files': 0,
+        'bytes': 0,
+        'errors': [],
+    }
+
+    stack = [('', source_path, backup_path, os.path.isdir(backup_path), matcher.root)]
+    while stack:
+        rel_root, src_dir, dst_dir, dst_exists, state = stack.pop()
+        try:
+            src_entries = _list_dir(src_dir)
+            dst_entries = _list_dir(dst_dir) if dst_exists else {}
+        except OSError as e:
+            plan['errors'].append(f"{rel_root or '.'} - {e}")
+            continue
+        if not rel_root:
+            # Directories staged for background deletion are neither copied over nor extras
+            dst_entries.pop(_name_key(PENDING_DIR), None)
+
+        subdirs = []
+        for key, src in sorted(src_entries.items()):
+            rel_path = os.path.join(rel_root, src.name) if rel_root else src.name
+            dst = dst_entries.pop(key, None)
+
+            src_is_dir = src.is_dir(follow_symlinks=False)
+            pattern, child_state = matcher.match(state, src.name, src_is_dir)
+            if pattern is not None:
+                continue
+
+            if src_is_dir:
+                plan['source_dirs'] += 1
+                dst_is_dir = dst is not None and dst.is_dir(follow_symlinks=False)
+                if dst is not None and not dst_is_dir:
+                    # A file where the source now has a directory: it has to go (even
+                    # without mirror) before the directory can be created
+                    plan['extra_files'].append(rel_path)
+                if not dst_is_dir:
+                    plan['dirs'].append(rel_path)
+                subdirs.append((rel_path, src.path, os.path.join(dst_dir, src.name), dst_is_dir, child_state))
+                continue
+
+            plan['source_files'] += 1
+            try:
+                src_stat = src.stat(follow_symlinks=False)
+                if dst is not None and not dst.is_dir(follow_symlinks=False):
+                    dst_stat = dst.stat(follow_symlinks=False)
+                    cached = hash_cache.get(rel_path) if hash_cache is not None else None
+                    if cached is not None:
+                        unchanged = (cached[0] == src_stat.st_size and cached[1] == src_stat.st_mtime_ns
+                                     and dst_stat.st_size == src_stat.st_size)
+                    else:
+                        unchanged = (src_stat.st_size == dst_stat.st_size
+                                     and abs(src_stat.st_mtime - dst_stat.st_mtime) <= MTIME_TOLERANCE)
+                    if unchanged:
+                        plan['skipped_files'] += 1
+                        if keep_unchanged:
+                            plan['unchanged'].append((rel_path, src_stat.st_size, src_stat.st_mtime_ns))
+                        continue
+                elif dst is not None:
+                    # A directory where the source now has a file: it has to go (even
+                    # without mirror) before the file can be copied
+                    plan['extra_dirs'].append(rel_path)
+            except OSError as e:
+                plan['errors'].append(f"{rel_path} - {e}")
+                continue
+            plan['files'].append((rel_path, src_stat.st_size, src_stat.st_mtime_ns))
+            plan['bytes'] += src_stat.st_size
+
+        # Whatever is left only exists in the backup; like robocopy /MIR with
+        # /XD and /XF, excluded names are never purged
+        if mirror:
+            for key, dst in sorted(dst_entries.items()):
+                rel_path = os.path.join(rel_root, dst.name) if rel_root else dst.name
+                dst_is_dir = dst.is_dir(follow_symlinks=False)
+                if matcher.match(state, dst.name, dst_is_dir)[0] is not None:
+                    continue
+                if dst_is_dir:
+                    plan['extra_dirs'].append(rel_path)
+                else:
+                    plan['extra_files'].append(rel_path)
+
+        # Reversed so the stack pops subdirectories in name order
+        stack.extend(reversed(subdirs))
+
+    return plan
+
+
+def apply_limit(plan: dict, limit: int) -> None:
+    """Trim the plan to the first `limit` operations (dirs first, then files), like --test-mode."""
+    plan['dirs'] = plan['dirs'][:limit]
+    remaining = max(0, limit - len(plan['dirs']))
+    plan['files'] = plan['files'][:remaining]
+    remaining = max(0, remaining - len(plan['files']))
+    plan['extra_dirs'] = plan['extra_dirs'][:remaining]
+    remaining = max(0, remaining - len(plan['extra_dirs']))
+    plan['extra_files'] = plan['extra_files'][:remaining]
+    plan['unchanged'] = []
+    plan['bytes'] = sum(size for _, size, _ in plan['files'])
+
+
+# ── Copying ──
+
+def _zero_copy(src_fd: int, dst_fd: int, size: int) -> bool:
+    """
+    Copy `size` bytes between file descriptors inside the kernel.
+
+    Tries copy_file_range (reflinks / server-side copy on NFS and SMB3
+    mounts) and then sendfile. Returns True only once all `size` bytes are
+    copied; otherwise False with both offsets just past what was copied,
+    so the caller can finish with a buffered copy.
+    """
+    copied = 0
+    for name in ('copy_file_range', 'sendfile'):
+        func = getattr(os, name, None)
+        if func is None:
+            continue
+        try:
+            while copied < size:
+                if name == 'copy_file_range':
+                    sent = func(src_fd, dst_fd, min(size - copied, _ZERO_COPY_CHUNK))
+                else:
+                    sent = func(dst_fd, src_fd, copied, min(size - copied, _ZERO_COPY_CHUNK))
+                if sent == 0:
+                    # Nothing more from the kernel (file shrank, or the call gives up
+                    # on this file system): not a complete copy
+                    break
+                copied += sent
+        except OSError:
+            pass
+        if copied >= size:
+            return True
+        if copied:
+            # Partially copied: finish from where the kernel stopped
+            os.lseek(src_fd, copied, os.SEEK_SET)
+            os.lseek(dst_fd, copied, os.SEEK_SET)
+            return False
+    return False
+
+
+def copy_file(src: str, dst: str) -> None:
+    """Copy one file's data, permissions and timestamps (robocopy /COPY:DAT)."""
+    try:
+        # A hardlink into the content store shares its data with other files:
+        # replace it rather than writing through it
+        if os.lstat(dst).st_nlink > 1:
+            os.chmod(dst, stat.S_IWRITE | stat.S_IREAD)
+            os.unlink(dst)
+        # Overwriting a read-only backup copy (e.g. .git objects) needs the bit cleared first
+        elif not os.access(dst, os.W_OK):
+            os.chmod(dst, stat.S_IWRITE | stat.S_IREAD)
+    except FileNotFoundError:
+        pass
+
+    if sys.platform.startswith('linux'):
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            if not _zero_copy(fsrc.fileno(), fdst.fileno(), size):
+                shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+    else:
+        # shutil.copyfile already uses the platform fast path (CopyFile/fcopyfile)
+        shutil.copyfile(src, dst)
+
+    shutil.copystat(src, dst)
+
+
+# ── Content-addressed store ──
+
+def default_store_path(backup_path: str) -> str:
+    """The store sits next to the backup (same volume, so hardlinks work) rather than inside it."""
+    return os.path.normpath(backup_path) + '.store'
+
+
+def load_hash_cache(store_path: str) -> dict:
+    """A store's hash cache ({rel path: [size, mtime_ns, digest]}); empty if there is none yet."""
+    try:
+        with open(os.path.join(store_path, 'hash-cache.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def open_store(store_path: str, cache: dict | None = None) -> dict:
+    """Create/open a store with its hash cache (loaded unless the caller already has it)."""
+    os.makedirs(os.path.join(store_path, 'objects'), exist_ok=True)
+    os.makedirs(os.path.join(store_path, 'manifests'), exist_ok=True)
+
+    return {
+        'path': store_path,
+        'cache': load_hash_cache(store_path) if cache is None else cache,
+        'manifest': {},
+        'lock': threading.Lock(),
+        'hardlinks': True,
+        'hashed_files': 0,
+        'cache_hits': 0,
+        'stored_objects': 0,
+        'stored_bytes': 0,
+        'deduplicated_files': 0,
+    }
+
+
+def hash_file(path: str) -> str:
+    """BLAKE2b of a file's contents (hashlib releases the GIL, so threads hash in parallel)."""
+    digest = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    with open(path, 'rb') as f:
+        while block := f.read(_HASH_BLOCK):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cached_digest(store: dict, rel_path: str, size: int, mtime_ns: int) -> str | None:
+    cached = store['cache'].get(rel_path)
+    if cached and cached[0] == size and cached[1] == mtime_ns:
+        with store['lock']:
+            store['cache_hits'] += 1
+        return cached[2]
+    return None
+
+
+def _record_digest(store: dict, rel_path: str, size: int, mtime_ns: int, digest: str, hashed: bool) -> None:
+    with store['lock']:
+        if hashed:
+            store['hashed_files'] += 1
+            store['cache'][rel_path] = [size, mtime_ns, digest]
+        store['manifest'][rel_path] = [digest, size, mtime_ns]
+
+
+def _copy_hashed(src: str, dst: str) -> str:
+    """
+    Copy a file while hashing the bytes written, so the digest always names
+    exactly the data that was stored even if the source changes meanwhile.
+    """
+    digest = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        while block := fsrc.read(_HASH_BLOCK):
+            digest.update(block)
+            fdst.write(block)
+    shutil.copystat(src, dst)
+    return digest.hexdigest()
+
+
+def _object_path(store: dict, digest: str) -> str:
+    return os.path.join(store['path'], 'objects', digest[:2], digest[2:])
+
+
+def _link_into_backup(store: dict, obj: str, dst: str) -> bool:
+    """Point dst at a store object with a hardlink; False if this filesystem can't."""
+    if not store['hardlinks']:
+        return False
+    tmp = f"{dst}.{threading.get_ident()}.link"
+    try:
+        os.link(obj, tmp)
+    except OSError as e:
+        # Too many links on one object only affects this file; anything else
+        # (FAT/exFAT, cross-volume, cloud folders) means no hardlinks at all
+        if e.errno != errno.EMLINK:
+            store['hardlinks'] = False
+        return False
+    try:
+        # Renaming a link over another link to the same inode is a no-op on
+        # POSIX and would leave tmp behind
+        if os.path.lexists(dst) and os.path.samefile(tmp, dst):
+            os.unlink(tmp)
+            return True
+        if os.name == 'nt' and os.path.exists(dst):
+            os.chmod(dst, stat.S_IWRITE | stat.S_IREAD)
+        os.replace(tmp, dst)
+    except OSError:
+        os.unlink(tmp)
+        raise
+    return True
+
+
+def store_file(store: dict, src: str, dst: str, rel_path: str, size: int, mtime_ns: int) -> None:
+    """Store a changed file's data once (named by the hash of what was copied) and materialize it in the backup."""
+    digest = _cached_digest(store, rel_path, size, mtime_ns)
+    obj = _object_path(store, digest) if digest else None
+
+    if obj is not None and os.path.exists(obj):
+        _record_digest(store, rel_path, size, mtime_ns, digest, hashed=False)
+        with store['lock']:
+            store['deduplicated_files'] += 1
+    else:
+        tmp = os.path.join(store['path'], 'objects', f"incoming.{threading.get_ident()}.tmp")
+        try:
+            digest = _copy_hashed(src, tmp)
+            obj = _object_path(store, digest)
+            if os.path.exists(obj):
+                os.unlink(tmp)
+                with store['lock']:
+                    store['deduplicated_files'] += 1
+            else:
+                os.makedirs(os.path.dirname(obj), exist_ok=True)
+                os.replace(tmp, obj)
+                with store['lock']:
+                    store['stored_objects'] += 1
+                    store['stored_bytes'] += os.stat(obj).st_size
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        _record_digest(store, rel_path, size, mtime_ns, digest, hashed=True)
+
+    if not _link_into_backup(store, obj, dst):
+        copy_file(obj, dst)
+        shutil.copystat(src, dst)
+
+
+def adopt_file(store: dict, src: str, dst: str, rel_path: str, size: int, mtime_ns: int) -> None:
+    """
+    Record an unchanged backup file in the manifest. Its data joins the
+    store by hardlink (no copy), and duplicates of an existing object are
+    relinked to it so earlier plain-mirror backups shrink too. The backup
+    copy is what gets linked, so that is what is hashed.
+    """
+    digest = _cached_digest(store, rel_path, size, mtime_ns)
+    _record_digest(store, rel_path, size, mtime_ns, digest or hash_file(dst), hashed=digest is None)
+    digest = store['manifest'][rel_path][0]
+    if not store['hardlinks']:
+        return
+    obj = _object_path(store, digest)
+    try:
+        if not os.path.exists(obj):
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            os.link(dst, obj)
+            with store['lock']:
+                store['stored_objects'] += 1
+        elif not os.path.samefile(obj, dst):
+            if _link_into_backup(store, obj, dst):
+                with store['lock']:
+                    store['deduplicated_files'] += 1
+    except OSError:
+        # Adoption is only an optimization; the backup copy is already correct
+        pass
+
+
+def close_store(store: dict, source_path: str, prune_cache: bool = True) -> str:
+    """Write this run's manifest and the hash cache; returns the manifest path."""
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    manifest_path = os.path.join(store['path'], 'manifests', stamp + '.json')
+    run = 1
+    while os.path.exists(manifest_path):
+        run += 1
+        manifest_path = os.path.join(store['path'], 'manifests', f"{stamp}-{run}.json")
+    manifest = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'source': source_path,
+        'files': store['manifest'],
+    }
+
+    # A full run has seen every file, so forget paths that no longer exist
+    cache = store['cache']
+    if prune_cache:
+        cache = {rel_path: cache[rel_path] for rel_path in store['manifest'] if rel_path in cache}
+
+    for path, data in ((manifest_path, manifest), (os.path.join(store['path'], 'hash-cache.json'), cache)):
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    return manifest_path
+
+
+def run_backup(source_path: str, backup_path: str, plan: dict, workers: int = DEFAULT_WORKERS,
+               show_progress: bool = True, store: dict | None = None) -> dict:
+    """
+    Execute a plan: remove extras (only present in mirror plans), create
+    directories, then copy files on a thread pool. With a store, copies go
+    through store_file and unchanged files are hashed/adopted on the same pool.
+
+    Returns dict with created_dirs, copied_files, copied_bytes,
+    deleted_dirs, deleted_files and errors.
+    """
+    created_dirs = 0
+    copied_files = 0
+    copied_bytes = 0
+    deleted_dirs = 0
+    deleted_files = 0
+    errors = []
+
+    total_items = (len(plan['dirs']) + len(plan['files']) + len(plan['extra_dirs'])
+                   + len(plan['extra_files']) + (len(plan['unchanged']) if store else 0))
+    total_bytes = plan['bytes']
+    processed = 0
+    last_progress_time = time.time()
+    lock = threading.Lock()
+
+    def report(force: bool = False):
+        nonlocal last_progress_time
+        if not show_progress:
+            return
+        current_time = time.time()
+        if force or current_time - last_progress_time >= 0.5:
+            if total_bytes > 0:
+                pct = int(copied_bytes * 100 / total_bytes)
+            else:
+                pct = int(processed * 100 / total_items) if total_items > 0 else 100
+            print(f"PROGRESS:{pct}:{created_dirs}:{copied_files}:{processed}:{total_items}", file=sys.stderr, flush=True)
+            last_progress_time = current_time
+
+    # Extras first: a file replaced by a directory (or vice versa) has to go
+    # before its replacement can be created
+    for rel_path in plan['extra_dirs']:
+        try:
+            removed = remove_tree(os.path.join(backup_path, rel_path), workers=workers)
+        except OSError as e:
+            removed = {'errors': [f"{os.path.join(backup_path, rel_path)} - {e}"]}
+        if removed['errors']:
+            errors.extend(f"Dir: {err}" for err in removed['errors'])
+        else:
+            deleted_dirs += 1
+        processed += 1
+        report()
+
+    for rel_path in plan['extra_files']:
+        full_path = os.path.join(backup_path, rel_path)
+        try:
+            if not os.access(full_path, os.W_OK):
+                os.chmod(full_path, stat.S_IWRITE)
+            os.unlink(full_path)
+            deleted_files += 1
+        except OSError as e:
+            errors.append(f"File: {rel_path} - {e}")
+        processed += 1
+        report()
+
+    # Directories next, in walk order so parents exist before children
+    for rel_path in plan['dirs']:
+        try:
+            os.makedirs(os.path.join(backup_path, rel_path), exist_ok=True)
+            created_dirs += 1
+        except OSError as e:
+            errors.append(f"Dir: {rel_path} - {e}")
+        processed += 1
+        report()
+
+    def copy_one(item):
+        rel_path, size, mtime_ns = item
+        src = os.path.join(source_path, rel_path)
+        dst = os.path.join(backup_path, rel_path)
+        if store is None:
+            copy_file(src, dst)
+        else:
+            store_file(store, src, dst, rel_path, size, mtime_ns)
+        return size
+
+    def adopt_one(item):
+        rel_path, size, mtime_ns = item
+        adopt_file(store, os.path.join(source_path, rel_path), os.path.join(backup_path, rel_path),
+                   rel_path, size, mtime_ns)
+        return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(copy_one, item): item[0] for item in plan['files']}
+        if store is not None:
+            futures.update((pool.submit(adopt_one, item), item[0]) for item in plan['unchanged'])
+        for future in as_completed(futures):
+            try:
+                size = future.result()
+                if size is not None:
+                    with lock:
+                        copied_files += 1
+                        copied_bytes += size
+            except OSError as e:
+                errors.append(f"File: {futures[future]} - {e}")
+            processed += 1
+            report()
+
+    report(force=True)
+
+    return {
+        'created_dirs': created_dirs,
+        'copied_files': copied_files,
+        'copied_bytes': copied_bytes,
+        'deleted_dirs': deleted_dirs,
+        'deleted_files': deleted_files,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Back up a source tree with a single scan and a parallel copy'
+    )
+    parser.add_argument('source_path', help='Path to source directory')
+    parser.add_argument('backup_path', help='Path to backup directory')
+    parser.add_argument('config_path', help='Path to config.json')
+    parser.add_argument('--count', action='store_true', help='Only scan and report what would be copied')
+    parser.add_argument('--dry-run', action='store_true', help='Scan and report without copying (same plan as a real run)')
+    parser.add_argument('--limit', type=int, metavar='N', help='Stop after N operations (test mode)')
+    parser.add_argument('--mirror', action='store_true', help='Also delete backup items missing from the source (robocopy /MIR)')
+    parser.add_argument('--store', action='store_true', help='Store file data once by content hash and hardlink it into the backup')
+    parser.add_argument('--store-path', help='Content store location (default: <backup_path>.store)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f'Copy threads (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--pretty', action='store_true', help='Pretty-print JSON output')
+    parser.add_argument('--output', '-o', help='Save result JSON to file (for PowerShell integration)')
+
+    args = parser.parse_args()
+
+    # Validate paths
+    if not os.path.isdir(args.source_path):
+        print(json.dumps({'error': f'Source path not found: {args.source_path}'}))
+        sys.exit(1)
+
+    if not os.path.isfile(args.config_path):
+        print(json.dumps({'error': f'Config file not found: {args.config_path}'}))
+        sys.exit(1)
+
+    exclude_dirs, exclude_files = load_exclusions(args.config_path)
+
+    store_path = args.store_path or default_store_path(args.backup_path)
+    hash_cache = load_hash_cache(store_path) if args.store else None
+
+    start_time = time.time()
+    plan = plan_backup(args.source_path, args.backup_path, exclude_dirs, exclude_files,
+                       mirror=args.mirror, keep_unchanged=args.store, hash_cache=hash_cache)
+    if args.limit is not None:
+        apply_limit(plan, args.limit)
+
+    print(f"PLAN:{len(plan['dirs']) + len(plan['extra_dirs'])}:{len(plan['files']) + len(plan['extra_files'])}:"
+          f"{plan['bytes']}:{plan['source_dirs']}:{plan['source_files']}", file=sys.stderr, flush=True)
+
+    result = {
+        'source_dirs': plan['source_dirs'],
+        'source_files': plan['source_files'],
+        'dirs_to_create': len(plan['dirs']),
+        'files_to_copy': len(plan['files']),
+        'bytes_to_copy': plan['bytes'],
+        'extra_dirs': len(plan['extra_dirs']),
+        'extra_files': len(plan['extra_files']),
+        'skipped_files': plan['skipped_files'],
+        'errors': plan['errors'],
+    }
+
+    if not (args.count or args.dry_run):
+        os.makedirs(args.backup_path, exist_ok=True)
+        store = None
+        if args.store:
+            store = open_store(store_path, hash_cache)
+        copy_result = run_backup(args.source_path, args.backup_path, plan, workers=args.workers, store=store)
+        copy_result['errors'] = plan['errors'] + copy_result['errors']
+        result.update(copy_result)
+        if store is not None:
+            manifest_path = close_store(store, args.source_path, prune_cache=args.limit is None)
+            result['store'] = {
+                'path': store['path'],
+                'manifest': manifest_path,
+                'hardlinks': store['hardlinks'],
+                'hashed_files': store['hashed_files'],
+                'cache_hits': store['cache_hits'],
+                'stored_objects': store['stored_objects'],
+                'stored_bytes': store['stored_bytes'],
+                'deduplicated_files': store['deduplicated_files'],
+            }
+
+    result['elapsed'] = round(time.time() - start_time, 3)
+
+    # Output JSON
+    output_json = json.dumps(result, indent=2) if args.pretty else json.dumps(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output_json)
+        print(f"Backup result saved to: {args.output}", file=sys.stderr)
+    else:
+        print(output_json)
+
+
+if __name__ == '__main__':
+    main()
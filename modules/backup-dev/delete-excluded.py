@@ -8,28 +8,44 @@ then deletes them with real-time console progress.
 Usage:
     python delete-excluded.py <backup_path> <scan_result.json>
     python delete-excluded.py <backup_path> <scan_result.json> --dry-run
+    python delete-excluded.py <backup_path> <scan_result.json> --trash
 
 The scan result JSON should have:
     {
         "directories": ["path/to/dir1", "path/to/dir2"],
         "files": ["path/to/file1.txt", "path/to/file2.log"]
     }
+or be a path table written by scan-excluded.py --compact (see path_table.py).
+Either way the items are handled as a path table: files are grouped by
+directory and unlinked relative to an open directory handle (dir_fd) where
+the OS supports it, so no path is resolved from the backup root per file.
+Matched directories are removed with tree_remover.remove_tree, which counts
+what it deletes as it goes - progress needs no separate counting pass.
+
+With --trash, matched directories are instead renamed into the backup's
+.pending-delete folder (see pending_delete.py) and purged by a detached
+background process, so the command returns as soon as the renames are done.
+Any run also restarts the purger for entries left pending by an earlier one.
 """
 
 import argparse
 import json
 import os
-import shutil
 import stat
 import sys
 import time
+from collections import OrderedDict
 from pathlib import Path
 
+from path_table import dir_path, load_table
+from pending_delete import pending_path, stage, start_purger
+from tree_remover import remove_tree
 
-def remove_readonly(func, path, excinfo):
-    """Error handler for shutil.rmtree to handle read-only files."""
-    os.chmod(path, stat.S_IWRITE)
-    func(path)
+# unlink/lstat relative to an open directory (POSIX; Windows falls back to full paths)
+_HAVE_DIR_FD = os.open in os.supports_dir_fd and os.unlink in os.supports_dir_fd and hasattr(os, 'O_DIRECTORY')
+
+# Directory handles kept open at once while walking the table
+_MAX_OPEN_DIRS = 64
 
 
 def print_progress(current: int, total: int, deleted_dirs: int, deleted_files: int,
@@ -55,175 +71,235 @@ def print_progress(current: int, total: int, deleted_dirs: int, deleted_files: i
     print(status, end='', flush=True)
 
 
-def count_directory_contents(dir_path: Path) -> tuple:
-    """
-    Count files and subdirectories in a directory.
-    Returns (file_count, dir_count).
+class _DirHandles:
     """
-    if not dir_path.exists() or not dir_path.is_dir():
-        return (0, 0)
+    Open path-table directories relative to their parent's handle.
 
-    file_count = 0
-    dir_count = 0
+    A small LRU of open descriptors is kept; files are processed grouped by
+    directory, so each directory is normally opened once.
+    """
 
+    def __init__(self, backup_path: Path, table: dict):
+        self._parents = table['dir_parents']
+        self._names = table['dir_names']
+        self._root = os.open(backup_path, os.O_RDONLY | os.O_DIRECTORY)
+        self._open = OrderedDict()
+
+    def get(self, dir_id: int) -> int:
+        """Descriptor for a directory (raises OSError, e.g. FileNotFoundError)."""
+        if dir_id == 0:
+            return self._root
+        fd = self._open.get(dir_id)
+        if fd is not None:
+            self._open.move_to_end(dir_id)
+            return fd
+        parent_fd = self.get(self._parents[dir_id])
+        fd = os.open(self._names[dir_id], os.O_RDONLY | os.O_DIRECTORY | getattr(os, 'O_NOFOLLOW', 0),
+                     dir_fd=parent_fd)
+        self._open[dir_id] = fd
+        while len(self._open) > _MAX_OPEN_DIRS:
+            _, old_fd = self._open.popitem(last=False)
+            os.close(old_fd)
+        return fd
+
+    def close(self) -> None:
+        for fd in self._open.values():
+            os.close(fd)
+        self._open.clear()
+        os.close(self._root)
+
+
+def _print_attributes(full_path: Path) -> None:
     try:
-        for item in dir_path.rglob('*'):
-            if item.is_file():
-                file_count += 1
-            elif item.is_dir():
-                dir_count += 1
-    except Exception:
-        # If we can't count, return 0 (better than crashing)
-        return (0, 0)
+        # Check file attributes (Windows-specific)
+        import subprocess
+        attrib_result = subprocess.run(['attrib', str(full_path)],
+                                     capture_output=True, text=True, timeout=2)
+        print(f"  Attributes: {attrib_result.stdout.strip()}")
+    except Exception as e:
+        print(f"  Attributes: Unable to check ({e})")
 
-    return (file_count, dir_count)
 
+def _unlink_file(handles, backup_path: Path, dir_id: int, parent_path: str, name: str, dry_run: bool) -> bool:
+    """
+    Delete one file; False if it does not exist (or is not a file).
 
-def delete_items(backup_path: Path, directories: list, files: list, dry_run: bool = False, debug: bool = False) -> dict:
+    With dir_fd support the file is removed relative to its directory's
+    handle; otherwise by full path, clearing read-only first (Windows).
     """
-    Delete directories and files with progress indication.
+    if handles is not None:
+        try:
+            dir_fd = handles.get(dir_id)
+            if not stat.S_ISREG(os.lstat(name, dir_fd=dir_fd).st_mode):
+                return False
+        except FileNotFoundError:
+            return False
+        if not dry_run:
+            os.unlink(name, dir_fd=dir_fd)
+        return True
+
+    full_path = os.path.join(backup_path, parent_path, name)
+    if not os.path.isfile(full_path):
+        return False
+    if not dry_run:
+        # Handle read-only files
+        if not os.access(full_path, os.W_OK):
+            os.chmod(full_path, stat.S_IWRITE)
+        os.unlink(full_path)
+    return True
+
+
+def delete_items(backup_path: Path, table: dict, dry_run: bool = False, debug: bool = False,
+                 trash: bool = False) -> dict:
+    """
+    Delete the directories and files of a path table with progress indication.
+
+    With trash=True matched directories are staged for background deletion
+    (renamed into the pending folder) rather than deleted in place; their
+    contents are then not part of the removed totals.
 
     Returns dict with deletion counts and errors.
     """
     deleted_dirs = 0
+    staged_dirs = 0
     deleted_files = 0
     errors = []
     skipped_items = []
 
-    # Count total items including files within directories
-    print("Analyzing items to delete...")
-    total_files_in_dirs = 0
-    total_subdirs_in_dirs = 0
-
-    for dir_path_str in directories:
-        full_path = backup_path / dir_path_str
-        if full_path.exists() and full_path.is_dir():
-            file_count, dir_count = count_directory_contents(full_path)
-            total_files_in_dirs += file_count
-            total_subdirs_in_dirs += dir_count
+    matched_dirs = table['matched_dirs']
+    file_count = len(table['file_names'])
 
-    total_items = len(directories) + total_subdirs_in_dirs + len(files) + total_files_in_dirs
+    # Progress counts scan result items; the Dirs/Files figures are exact
+    # totals removed so far, contents of matched directories included
+    total_items = len(matched_dirs) + file_count
     current = 0
+    removed_dirs = 0
+    removed_files = 0
     start_time = time.time()
 
     if total_items == 0:
         print("Nothing to delete.")
-        return {'deleted_dirs': 0, 'deleted_files': 0, 'errors': [], 'skipped': []}
+        return {'deleted_dirs': 0, 'deleted_files': 0, 'removed_dirs': 0, 'removed_files': 0,
+                'staged_dirs': 0, 'errors': [], 'skipped': []}
 
-    print(f"Deleting {len(directories)} directories ({total_subdirs_in_dirs} subdirs, {total_files_in_dirs} files) + {len(files)} standalone files...")
+    print(f"Deleting {len(matched_dirs)} directories + {file_count} standalone files...")
     print(f"Total items: {total_items:,}")
     if debug:
         print("DEBUG MODE: Detailed output enabled")
     print()
 
     # Delete directories first
-    for dir_path in directories:
-        full_path = backup_path / dir_path
+    for dir_id in matched_dirs:
+        # Paths are resolved per entry, so a large table is never expanded up front
+        rel_path = dir_path(table, dir_id)
+        full_path = backup_path / rel_path
 
         if debug:
-            print(f"\n[DIR] {dir_path}")
+            print(f"\n[DIR] {rel_path}")
             print(f"  Full path: {full_path}")
             print(f"  Exists: {full_path.exists()}")
             if full_path.exists():
                 print(f"  Is dir: {full_path.is_dir()}")
-                try:
-                    # Check file attributes (Windows-specific)
-                    import subprocess
-                    attrib_result = subprocess.run(['attrib', str(full_path)],
-                                                 capture_output=True, text=True, timeout=2)
-                    print(f"  Attributes: {attrib_result.stdout.strip()}")
-                except Exception as e:
-                    print(f"  Attributes: Unable to check ({e})")
-
-        if full_path.exists() and full_path.is_dir():
-            # Count items in this directory for progress
-            file_count, dir_count = count_directory_contents(full_path)
-            items_in_dir = 1 + dir_count + file_count  # +1 for the directory itself
-
-            if dry_run:
+                _print_attributes(full_path)
+
+        if trash and not dry_run and full_path.is_dir() and not full_path.is_symlink():
+            try:
+                staged_name = stage(backup_path, full_path)
+                staged_dirs += 1
                 deleted_dirs += 1
-                current += items_in_dir
                 if debug:
-                    print(f"  [DRY-RUN] Would delete ({file_count} files, {dir_count} subdirs)")
+                    print(f"  ✓ Staged for background deletion as {staged_name}")
+                current += 1
+                if not debug:
+                    print_progress(current, total_items, removed_dirs + staged_dirs, removed_files, start_time)
+                continue
+            except OSError as e:
+                # Rename refused (e.g. a file in use on Windows) - delete in place
+                if debug:
+                    print(f"  Staging failed ({e}), deleting in place...")
+
+        if full_path.is_dir() and not full_path.is_symlink():
+            if debug:
+                print(f"  [DRY-RUN] Counting..." if dry_run else f"  Attempting deletion...")
+                progress = None
             else:
-                try:
-                    if debug:
-                        print(f"  Attempting deletion ({file_count} files, {dir_count} subdirs)...")
-                    shutil.rmtree(full_path, onerror=remove_readonly)
-                    deleted_dirs += 1
-                    current += items_in_dir
-                    if debug:
-                        print(f"  ✓ Deleted successfully")
+                progress = lambda files, dirs: print_progress(
+                    current, total_items, removed_dirs + dirs, removed_files + files, start_time)
+            try:
+                removed = remove_tree(full_path, progress=progress, dry_run=dry_run)
+            except OSError as e:
+                removed = {'files': 0, 'dirs': 0, 'errors': [f"{full_path} - {e}"]}
+            removed_dirs += removed['dirs']
+            removed_files += removed['files']
+            if removed['errors']:
+                errors.extend(f"Dir: {err}" for err in removed['errors'])
+                if debug:
+                    for err in removed['errors']:
+                        print(f"  ✗ ERROR: {err}")
+            else:
+                deleted_dirs += 1
+                if debug:
+                    summary = f"{removed['files']} files, {removed['dirs'] - 1} subdirs"
+                    if dry_run:
+                        print(f"  [DRY-RUN] Would delete ({summary})")
+                    else:
+                        print(f"  ✓ Deleted successfully ({summary})")
                         # Verify deletion
                         if full_path.exists():
                             print(f"  ⚠ WARNING: Path still exists after deletion!")
-                except Exception as e:
-                    error_msg = f"Dir: {dir_path} - {str(e)}"
-                    errors.append(error_msg)
-                    current += items_in_dir  # Still count as processed even if failed
-                    if debug:
-                        print(f"  ✗ ERROR: {str(e)}")
         else:
-            current += 1  # Still increment for non-existent dirs
             if debug:
                 print(f"  [SKIP] Does not exist or not a directory")
-            skipped_items.append(f"Dir: {dir_path} - Does not exist")
+            skipped_items.append(f"Dir: {rel_path} - Does not exist")
 
+        current += 1
         if not debug:
-            print_progress(current, total_items, deleted_dirs, deleted_files, start_time)
+            print_progress(current, total_items, removed_dirs, removed_files, start_time)
 
-    # Delete files
-    for file_path in files:
-        current += 1
-        full_path = backup_path / file_path
+    # Delete files, grouped by directory so each directory handle is opened once
+    handles = _DirHandles(backup_path, table) if _HAVE_DIR_FD else None
+    order = sorted(range(file_count), key=table['file_dirs'].__getitem__)
+    parent_id, parent_path = 0, ''
+    try:
+        for index in order:
+            current += 1
+            dir_id = table['file_dirs'][index]
+            name = table['file_names'][index]
+            if dir_id != parent_id:
+                # Files are grouped by directory: resolve each directory's path once
+                parent_id, parent_path = dir_id, dir_path(table, dir_id)
+            file_path = os.path.join(parent_path, name) if dir_id else name
 
-        if debug:
-            print(f"\n[FILE] {file_path}")
-            print(f"  Full path: {full_path}")
-            print(f"  Exists: {full_path.exists()}")
-            if full_path.exists():
-                print(f"  Is file: {full_path.is_file()}")
-                try:
-                    import subprocess
-                    attrib_result = subprocess.run(['attrib', str(full_path)],
-                                                 capture_output=True, text=True, timeout=2)
-                    print(f"  Attributes: {attrib_result.stdout.strip()}")
-                except Exception as e:
-                    print(f"  Attributes: Unable to check ({e})")
-
-        if full_path.exists() and full_path.is_file():
-            if dry_run:
-                deleted_files += 1
-                if debug:
-                    print(f"  [DRY-RUN] Would delete")
-            else:
-                try:
-                    if debug:
-                        print(f"  Attempting deletion...")
-                    # Handle read-only files
-                    if not os.access(full_path, os.W_OK):
-                        os.chmod(full_path, stat.S_IWRITE)
-                        if debug:
-                            print(f"  Removed read-only attribute")
-                    full_path.unlink()
+            if debug:
+                full_path = backup_path / file_path
+                print(f"\n[FILE] {file_path}")
+                print(f"  Full path: {full_path}")
+                print(f"  Exists: {full_path.exists()}")
+                if full_path.exists():
+                    print(f"  Is file: {full_path.is_file()}")
+                    _print_attributes(full_path)
+
+            try:
+                if _unlink_file(handles, backup_path, dir_id, parent_path, name, dry_run):
                     deleted_files += 1
+                    removed_files += 1
                     if debug:
-                        print(f"  ✓ Deleted successfully")
-                        # Verify deletion
-                        if full_path.exists():
-                            print(f"  ⚠ WARNING: File still exists after deletion!")
-                except Exception as e:
-                    error_msg = f"File: {file_path} - {str(e)}"
-                    errors.append(error_msg)
+                        print(f"  [DRY-RUN] Would delete" if dry_run else f"  ✓ Deleted successfully")
+                else:
                     if debug:
-                        print(f"  ✗ ERROR: {str(e)}")
-        else:
-            if debug:
-                print(f"  [SKIP] Does not exist or not a file")
-            skipped_items.append(f"File: {file_path} - Does not exist")
+                        print(f"  [SKIP] Does not exist or not a file")
+                    skipped_items.append(f"File: {file_path} - Does not exist")
+            except Exception as e:
+                error_msg = f"File: {file_path} - {str(e)}"
+                errors.append(error_msg)
+                if debug:
+                    print(f"  ✗ ERROR: {str(e)}")
 
-        if not debug:
-            print_progress(current, total_items, deleted_dirs, deleted_files, start_time)
+            if not debug:
+                print_progress(current, total_items, removed_dirs, removed_files, start_time)
+    finally:
+        if handles is not None:
+            handles.close()
 
     # Final newline after progress
     if not debug:
@@ -238,6 +314,9 @@ def delete_items(backup_path: Path, directories: list, files: list, dry_run: boo
     return {
         'deleted_dirs': deleted_dirs,
         'deleted_files': deleted_files,
+        'removed_dirs': removed_dirs,
+        'removed_files': removed_files,
+        'staged_dirs': staged_dirs,
         'errors': errors,
         'skipped': skipped_items
     }
@@ -251,6 +330,8 @@ def main():
     parser.add_argument('scan_result', help='Path to scan result JSON file')
     parser.add_argument('--dry-run', action='store_true', help='Show what would be deleted without deleting')
     parser.add_argument('--debug', action='store_true', help='Enable detailed debug output for troubleshooting')
+    parser.add_argument('--trash', action='store_true',
+                        help='Rename matched directories into .pending-delete and purge them in the background')
     parser.add_argument('--output', '-o', help='Save result JSON to file (for PowerShell integration)')
 
     args = parser.parse_args()
@@ -274,8 +355,8 @@ def main():
         print(f"Error reading scan result: {e}", file=sys.stderr)
         sys.exit(1)
 
-    directories = scan_data.get('directories', [])
-    files = scan_data.get('files', [])
+    # Both layouts become a path table (directories interned once)
+    table = load_table(scan_data)
 
     if args.dry_run:
         print("=== DRY RUN MODE - No files will be deleted ===\n")
@@ -284,16 +365,24 @@ def main():
         print(f"=== DEBUG MODE ENABLED ===")
         print(f"Backup path: {backup_path}")
         print(f"Scan result: {args.scan_result}")
-        print(f"Items to process: {len(directories)} dirs, {len(files)} files")
+        print(f"Items to process: {len(table['matched_dirs'])} dirs, {len(table['file_names'])} files")
         print()
 
     # Delete items
-    result = delete_items(backup_path, directories, files, dry_run=args.dry_run, debug=args.debug)
+    result = delete_items(backup_path, table, dry_run=args.dry_run, debug=args.debug, trash=args.trash)
+
+    # Purge staged directories (this run's and any left over) after we exit
+    result['purge_started'] = False if args.dry_run else start_purger(backup_path)
 
     # Print summary
     print(f"\nSummary:")
     print(f"  Directories deleted: {result['deleted_dirs']}")
     print(f"  Files deleted: {result['deleted_files']}")
+    print(f"  Total removed: {result['removed_dirs']} directories, {result['removed_files']} files")
+    if result['staged_dirs']:
+        print(f"  Staged for background deletion: {result['staged_dirs']} directories")
+    if result['purge_started']:
+        print(f"  Background purge started for {pending_path(backup_path)}")
 
     if result['errors']:
         print(f"\nErrors ({len(result['errors'])}):")
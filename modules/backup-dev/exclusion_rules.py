@@ -0,0 +1,238 @@
+"""
+Exclusion rule matcher shared by the backup-dev Python scripts.
+
+backupDev.exclusions entries come in two forms:
+
+    name or name glob    node_modules, *.egg-info, *.log
+        Matches a directory (directories list) or file (files list) with
+        that name anywhere in the tree - the robocopy /XD and /XF meaning.
+
+    path glob            build/**/obj, */cache/*.tmp, /archive/old
+        Contains a '/' (or '\\'). Segments are matched one path component
+        at a time; '**' matches any number of components (including none).
+        A leading '/' anchors the rule at the backup root, otherwise it may
+        start at any depth (as if prefixed with '**/').
+
+All rules are compiled into one trie of path segments. A walker keeps the
+set of trie nodes reached by the path so far and advances it by one
+component per directory entry, so a rule is never rematched against a full
+path. A directory that completes a directory rule is pruned on the spot, and
+a directory whose state set is empty cannot contain any match at all.
+
+Usage:
+    matcher = ExclusionMatcher(exclude_dirs, exclude_files)
+    state = matcher.root
+    pattern, child_state = matcher.match(state, name, is_dir)
+
+    matcher = get_matcher(exclude_dirs, exclude_files)   # reused while the rules are unchanged
+
+    exclude_dirs, exclude_files = read_exclusions(config_path)
+
+read_exclusions() keeps the backupDev.exclusions lists in a small marshal
+snapshot (.cache/ next to this module) keyed by config.json's path, mtime and
+size, so a launch only parses config.json after it changed.
+"""
+
+import fnmatch
+import functools
+import json
+import marshal
+import os
+import re
+import sys
+
+# Windows file names are case-insensitive, so literal segments are folded the same way
+_name_key = str.casefold if os.name == 'nt' else str
+_GLOB_FLAGS = re.IGNORECASE if os.name == 'nt' else 0
+_GLOB_CHARS = frozenset('*?[')
+
+
+def is_path_rule(pattern: str) -> bool:
+    """True for rules that need path matching (robocopy /XD and /XF can't express them)."""
+    return '/' in pattern or '\\' in pattern
+
+
+def _split_rule(pattern: str) -> list[str]:
+    """Segments of a rule; unanchored rules start with '**'."""
+    pattern = pattern.replace('\\', '/')
+    anchored = pattern.startswith('/')
+    segments = [segment for segment in pattern.split('/') if segment]
+    # Collapse runs of '**' - they match the same paths as one
+    collapsed = []
+    for segment in segments:
+        if segment == '**' and collapsed and collapsed[-1] == '**':
+            continue
+        collapsed.append(segment)
+    if not anchored and (not collapsed or collapsed[0] != '**'):
+        collapsed.insert(0, '**')
+    return collapsed
+
+
+class _Node:
+    __slots__ = ('literals', 'globs', 'any_depth', 'is_any_depth', 'dir_rule', 'file_rule')
+
+    def __init__(self):
+        self.literals = {}      # folded name -> _Node
+        self.globs = []         # [(compiled regex, glob text, _Node)]
+        self.any_depth = None   # _Node reached through '**'
+        self.is_any_depth = False
+        self.dir_rule = None    # (config order, pattern) of a rule ending here
+        self.file_rule = None
+
+
+class ExclusionMatcher:
+    """Compiled backupDev.exclusions rules (see module docstring)."""
+
+    def __init__(self, exclude_dirs: list[str], exclude_files: list[str]):
+        self._root_node = _Node()
+        for order, pattern in enumerate(exclude_dirs):
+            self._insert(order, pattern, is_dir=True)
+        for order, pattern in enumerate(exclude_files):
+            self._insert(order, pattern, is_dir=False)
+        self._closures = {}
+        self.root = self._closure(frozenset([self._root_node]))
+
+    def _insert(self, order: int, pattern: str, is_dir: bool) -> None:
+        segments = _split_rule(pattern)
+        if not segments or segments == ['**']:
+            return
+        node = self._root_node
+        for segment in segments:
+            if segment == '**':
+                if node.any_depth is None:
+                    node.any_depth = _Node()
+                    node.any_depth.is_any_depth = True
+                node = node.any_depth
+            elif not _GLOB_CHARS.intersection(segment):
+                node = node.literals.setdefault(_name_key(segment), _Node())
+            else:
+                for regex, glob, child in node.globs:
+                    if glob == segment:
+                        node = child
+                        break
+                else:
+                    child = _Node()
+                    node.globs.append((re.compile(fnmatch.translate(segment), _GLOB_FLAGS), segment, child))
+                    node = child
+        # First rule to claim a node wins, so reports name the rule as written in config
+        if is_dir and node.dir_rule is None:
+            node.dir_rule = (order, pattern)
+        elif not is_dir and node.file_rule is None:
+            node.file_rule = (order, pattern)
+
+    def _closure(self, nodes: frozenset) -> frozenset:
+        """Add the nodes reachable through '**' matching zero components."""
+        cached = self._closures.get(nodes)
+        if cached is not None:
+            return cached
+        result = set(nodes)
+        pending = list(nodes)
+        while pending:
+            node = pending.pop()
+            if node.any_depth is not None and node.any_depth not in result:
+                result.add(node.any_depth)
+                pending.append(node.any_depth)
+        result = frozenset(result)
+        self._closures[nodes] = result
+        return result
+
+    def step(self, state: frozenset, name: str) -> frozenset:
+        """State after descending into the path component `name`."""
+        key = _name_key(name)
+        reached = set()
+        for node in state:
+            if node.is_any_depth:
+                reached.add(node)  # '**' stays active across any number of components
+            child = node.literals.get(key)
+            if child is not None:
+                reached.add(child)
+            for regex, _, child in node.globs:
+                if regex.match(name):
+                    reached.add(child)
+        if not reached:
+            return frozenset()
+        return self._closure(frozenset(reached))
+
+    def match(self, state: frozenset, name: str, is_dir: bool) -> tuple[str | None, frozenset]:
+        """
+        Check one directory entry against the rules.
+
+        Returns (pattern that excludes it or None, state for its children).
+        When several rules match, the one listed first in config wins.
+        """
+        reached = self.step(state, name)
+        best = None
+        for node in reached:
+            rule = node.dir_rule if is_dir else node.file_rule
+            if rule is not None and (best is None or rule < best):
+                best = rule
+        return (best[1] if best else None), reached
+
+    @staticmethod
+    def is_dead(state: frozenset) -> bool:
+        """No rule can match anything below a directory in this state."""
+        return not state
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_matcher(exclude_dirs: tuple, exclude_files: tuple) -> ExclusionMatcher:
+    return ExclusionMatcher(list(exclude_dirs), list(exclude_files))
+
+
+def get_matcher(exclude_dirs: list[str], exclude_files: list[str]) -> ExclusionMatcher:
+    """
+    Compiled matcher for a rule set, shared while the rules stay the same.
+
+    A long-lived process (console-worker.py) then keeps the compiled trie
+    and its cached '**' closures warm across scans.
+    """
+    return _cached_matcher(tuple(exclude_dirs), tuple(exclude_files))
+
+
+# ── Config snapshot ──
+
+SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'exclusions.bin')
+SNAPSHOT_VERSION = 1
+
+
+def exclusions_from_config(config: dict) -> tuple[list[str], list[str]]:
+    """Exclusion patterns from a parsed config.json."""
+    exclude_dirs = []
+    exclude_files = []
+
+    if 'backupDev' in config and 'exclusions' in config['backupDev']:
+        exclusions = config['backupDev']['exclusions']
+        exclude_dirs = exclusions.get('directories', [])
+        exclude_files = exclusions.get('files', [])
+
+    return exclude_dirs, exclude_files
+
+
+def read_exclusions(config_path: str, snapshot_file: str = SNAPSHOT_FILE) -> tuple[list[str], list[str]]:
+    """
+    Exclusion patterns from config.json, via the snapshot while it is current.
+
+    Raises OSError/ValueError like reading config.json directly; failing to
+    write the snapshot is not an error.
+    """
+    st = os.stat(config_path)
+    key = (os.path.abspath(config_path), st.st_mtime_ns, st.st_size, SNAPSHOT_VERSION, sys.version_info[:2])
+    try:
+        with open(snapshot_file, 'rb') as f:
+            stored = marshal.load(f)
+        if stored['key'] == key:
+            return stored['directories'], stored['files']
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        pass
+
+    with open(config_path, 'r', encoding='utf-8') as f:
+        exclude_dirs, exclude_files = exclusions_from_config(json.load(f))
+    try:
+        os.makedirs(os.path.dirname(snapshot_file), exist_ok=True)
+        tmp_file = snapshot_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            marshal.dump({'key': key, 'directories': exclude_dirs, 'files': exclude_files}, f)
+        os.replace(tmp_file, snapshot_file)
+    except (OSError, ValueError):
+        pass
+    return exclude_dirs, exclude_files
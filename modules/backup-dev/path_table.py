@@ -0,0 +1,124 @@
+"""
+Compact path-table layout for backup-dev scan results.
+
+A scan result normally lists every match as a full relative path, so its
+size (in memory and as JSON) grows with total path length. The path table
+stores each directory once as (parent id, name) and each file as
+(directory id, name), in columns:
+
+    {
+        "format": "path-table",
+        "dir_parents": [-1, 0, 1, ...],     row 0 is the backup root
+        "dir_names": ["", "proj", "node_modules", ...],
+        "matched_dirs": [2, ...],           directory ids to delete
+        "file_dirs": [1, ...],              file i lives in dir_names[file_dirs[i]]
+        "file_names": ["debug.log", ...]
+    }
+
+Parents always have smaller ids than their children, so a single forward
+pass can rebuild paths or open directories top-down.
+
+Usage:
+    table = new_table()
+    dir_id = intern_dir(table, ids, parent_id, name)
+    add_match(table, ids, rel_path, is_dir)
+    table = table_from_paths(directories, files)
+    directories, files = table_paths(table)
+    path = dir_path(table, dir_id)
+"""
+
+import os
+import re
+
+FORMAT = 'path-table'
+
+_SEPARATORS = re.compile(r'[\\/]+')
+
+
+def new_table() -> dict:
+    return {
+        'format': FORMAT,
+        'dir_parents': [-1],
+        'dir_names': [''],
+        'matched_dirs': [],
+        'file_dirs': [],
+        'file_names': [],
+    }
+
+
+def intern_dir(table: dict, ids: dict, parent_id: int, name: str) -> int:
+    """Id for directory `name` under `parent_id`, adding it on first use (`ids` is the lookup cache)."""
+    key = (parent_id, name)
+    dir_id = ids.get(key)
+    if dir_id is None:
+        dir_id = len(table['dir_names'])
+        table['dir_parents'].append(parent_id)
+        table['dir_names'].append(name)
+        ids[key] = dir_id
+    return dir_id
+
+
+def _intern_parts(table: dict, ids: dict, parts: list[str]) -> int:
+    dir_id = 0
+    for name in parts:
+        dir_id = intern_dir(table, ids, dir_id, name)
+    return dir_id
+
+
+def add_match(table: dict, ids: dict, rel_path: str, is_dir: bool) -> None:
+    """Add one matched directory or file, given as a relative path."""
+    parts = [part for part in _SEPARATORS.split(rel_path) if part]
+    if is_dir:
+        table['matched_dirs'].append(_intern_parts(table, ids, parts))
+    else:
+        table['file_dirs'].append(_intern_parts(table, ids, parts[:-1]))
+        table['file_names'].append(parts[-1])
+
+
+def table_from_paths(directories: list[str], files: list[str]) -> dict:
+    """Build a table from relative path lists (the classic scan result layout)."""
+    table = new_table()
+    ids = {}
+    for path in directories:
+        add_match(table, ids, path, True)
+    for path in files:
+        add_match(table, ids, path, False)
+    return table
+
+
+def dir_path(table: dict, dir_id: int) -> str:
+    """Relative path of one directory row, walking its parents ('' for the root)."""
+    parents = table['dir_parents']
+    names = table['dir_names']
+    parts = []
+    while dir_id > 0:
+        parts.append(names[dir_id])
+        dir_id = parents[dir_id]
+    return os.path.join(*reversed(parts)) if parts else ''
+
+
+def dir_paths(table: dict) -> list[str]:
+    """Relative path of every directory row ('' for the root)."""
+    paths = ['']
+    parents = table['dir_parents']
+    names = table['dir_names']
+    for dir_id in range(1, len(names)):
+        parent_path = paths[parents[dir_id]]
+        paths.append(os.path.join(parent_path, names[dir_id]) if parent_path else names[dir_id])
+    return paths
+
+
+def table_paths(table: dict) -> tuple[list[str], list[str]]:
+    """Expand a table back into (matched directory paths, file paths)."""
+    paths = dir_paths(table)
+    directories = [paths[dir_id] for dir_id in table['matched_dirs']]
+    files = [os.path.join(paths[dir_id], name) if dir_id else name
+             for dir_id, name in zip(table['file_dirs'], table['file_names'])]
+    return directories, files
+
+
+def load_table(scan_data: dict) -> dict:
+    """Path table from a scan result in either layout."""
+    if scan_data.get('format') == FORMAT:
+        return scan_data
+    return table_from_paths(scan_data.get('directories', []), scan_data.get('files', []))
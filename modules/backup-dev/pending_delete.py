@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Deferred ("trash-rename") deletion for backup-dev.
+
+Deleting a large excluded tree means one unlink per file, which can take a
+long time on a big backup. Renaming a directory within a volume takes
+constant time, though. So a matched directory is renamed into a hidden
+.pending-delete folder at the backup root, which is always on the same
+volume. The cleanup reports it as done right away, and a detached purger
+process deletes the pending folder's contents in the background.
+
+The pending folder persists between runs. If a purge is interrupted
+(reboot, closed console), the next run of delete-excluded.py starts a new
+purger, and that purger picks up whatever is still pending. An OS lock
+(fcntl.flock / msvcrt.locking) on a lock file in the pending folder stops
+two purgers from working on the same folder. The OS drops it when the
+purger exits, however it exits, so an interrupted purge never leaves a lock
+behind that would need to be judged stale.
+
+The backup walks (scan-excluded.py, copy-backup.py) skip the pending
+folder, and backup-dev.ps1 excludes it from robocopy.
+
+Usage:
+    python pending_delete.py <backup_path>            # purge now (foreground)
+    python pending_delete.py <backup_path> --background
+    python pending_delete.py <backup_path> --status
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from tree_remover import remove_tree
+
+# Hidden folder at the backup root holding renamed-away directories
+PENDING_DIR = '.pending-delete'
+
+_LOCK_NAME = '.purge.lock'
+
+_FILE_ATTRIBUTE_HIDDEN = 0x2
+
+
+def pending_path(backup_path) -> str:
+    return os.path.join(os.fspath(backup_path), PENDING_DIR)
+
+
+def _hide(path: str) -> None:
+    """Set the hidden attribute on Windows (dot-names are already hidden elsewhere)."""
+    if os.name == 'nt':
+        import ctypes
+        ctypes.windll.kernel32.SetFileAttributesW(path, _FILE_ATTRIBUTE_HIDDEN)
+
+
+def stage(backup_path, full_path) -> str:
+    """
+    Move a directory into the pending folder with a single rename.
+
+    Returns the staged name; raises OSError if the rename fails (the caller
+    should then delete in place).
+    """
+    pending = pending_path(backup_path)
+    if not os.path.isdir(pending):
+        os.makedirs(pending, exist_ok=True)
+        _hide(pending)
+    base = f"{time.time_ns()}-{os.path.basename(os.fspath(full_path))}"
+    name = base
+    suffix = 1
+    while os.path.lexists(os.path.join(pending, name)):
+        name = f"{base}-{suffix}"
+        suffix += 1
+    os.rename(full_path, os.path.join(pending, name))
+    return name
+
+
+def pending_entries(backup_path) -> list[str]:
+    """Names waiting to be purged."""
+    try:
+        return sorted(name for name in os.listdir(pending_path(backup_path)) if name != _LOCK_NAME)
+    except FileNotFoundError:
+        return []
+
+
+def _try_lock(fd: int) -> bool:
+    """Take the OS lock on an open lock file without waiting."""
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int) -> None:
+    if os.name == 'nt':
+        import msvcrt
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def is_purging(backup_path) -> bool:
+    """True if a purger currently holds the lock."""
+    try:
+        fd = os.open(os.path.join(pending_path(backup_path), _LOCK_NAME), os.O_RDWR)
+    except OSError:
+        return False
+    try:
+        if _try_lock(fd):
+            _unlock(fd)
+            return False
+        return True
+    finally:
+        os.close(fd)
+
+
+def _acquire_lock(lock_path: str) -> int | None:
+    """
+    Open and lock the lock file; returns its descriptor, or None if another
+    purger holds it. Raises FileNotFoundError if the pending folder is gone.
+    """
+    while True:
+        fd = os.open(lock_path, os.O_CREAT | os.O_RDWR)
+        if not _try_lock(fd):
+            os.close(fd)
+            return None
+        try:
+            current = os.path.samestat(os.fstat(fd), os.stat(lock_path))
+        except FileNotFoundError:
+            current = False
+        if current:
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode('ascii'))
+            return fd
+        # A finishing purger removed the file between our open and lock;
+        # locking that orphan would exclude nobody, so lock the live file
+        _unlock(fd)
+        os.close(fd)
+
+
+def _release_lock(fd: int, lock_path: str) -> None:
+    # Only ever called by the holder, so the file removed is our own. On
+    # POSIX it goes while still locked (a purger that opened it meanwhile
+    # notices in _acquire_lock); Windows can't delete an open file.
+    if os.name != 'nt':
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+    _unlock(fd)
+    os.close(fd)
+    if os.name == 'nt':
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+def purge(backup_path) -> dict:
+    """
+    Delete everything in the pending folder.
+
+    Returns dict with purged (entries removed), files, dirs, errors, and
+    locked=True when another purger is already at work (nothing done).
+    """
+    pending = pending_path(backup_path)
+    lock_path = os.path.join(pending, _LOCK_NAME)
+    result = {'purged': 0, 'files': 0, 'dirs': 0, 'errors': [], 'locked': False}
+    try:
+        lock_fd = _acquire_lock(lock_path)
+    except FileNotFoundError:
+        return result
+    if lock_fd is None:
+        result['locked'] = True
+        return result
+
+    try:
+        for name in pending_entries(backup_path):
+            full_path = os.path.join(pending, name)
+            try:
+                if os.path.isdir(full_path) and not os.path.islink(full_path):
+                    removed = remove_tree(full_path)
+                else:
+                    os.unlink(full_path)
+                    removed = {'files': 1, 'dirs': 0, 'errors': []}
+            except OSError as e:
+                removed = {'files': 0, 'dirs': 0, 'errors': [f"{full_path} - {e}"]}
+            result['files'] += removed['files']
+            result['dirs'] += removed['dirs']
+            result['errors'].extend(removed['errors'])
+            if not removed['errors']:
+                result['purged'] += 1
+    finally:
+        _release_lock(lock_fd, lock_path)
+
+    # Leave no empty pending folder behind
+    try:
+        os.rmdir(pending)
+    except OSError:
+        pass
+    return result
+
+
+def start_purger(backup_path) -> bool:
+    """
+    Purge the pending folder in a detached process that outlives the caller.
+
+    Returns False if there is nothing pending or a purger is already running.
+    """
+    if not pending_entries(backup_path) or is_purging(backup_path):
+        return False
+    import subprocess
+    cmd = [sys.executable, os.path.abspath(__file__), os.path.abspath(os.fspath(backup_path))]
+    kwargs = {'stdin': subprocess.DEVNULL, 'stdout': subprocess.DEVNULL,
+              'stderr': subprocess.DEVNULL, 'close_fds': True}
+    if os.name == 'nt':
+        kwargs['creationflags'] = (subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+                                   | subprocess.CREATE_NO_WINDOW)
+    else:
+        kwargs['start_new_session'] = True
+    subprocess.Popen(cmd, **kwargs)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Purge directories staged for deletion in a backup'
+    )
+    parser.add_argument('backup_path', help='Path to backup directory')
+    parser.add_argument('--background', action='store_true', help='Start a detached purger and return')
+    parser.add_argument('--status', action='store_true', help='Report pending entries without purging')
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.backup_path):
+        print(json.dumps({'error': f'Backup path not found: {args.backup_path}'}))
+        sys.exit(1)
+
+    if args.status:
+        result = {'pending': len(pending_entries(args.backup_path)), 'purging': is_purging(args.backup_path)}
+    elif args.background:
+        result = {'started': start_purger(args.backup_path)}
+    else:
+        result = purge(args.backup_path)
+
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
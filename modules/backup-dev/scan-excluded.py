@@ -4,97 +4,412 @@ Scan backup directory for files/directories matching exclusion patterns.
 
 This script walks the backup directory once and checks each item against
 all exclusion patterns defined in config.json. Much faster than PowerShell's
-Get-ChildItem for large directory trees.
+Get-ChildItem for large directory trees. Matched directories are not
+descended into; their size is summed by a du-style walk on a thread pool
+while the scan continues, so the result can say how many bytes each
+exclusion pattern (and each top-level folder) is costing.
+
+With --mirror-source the backup is compared against its source in the same
+pass: both trees are listed side by side with os.scandir, so the items that
+robocopy /L /MIR would report as *EXTRA, files whose size or mtime differ,
+and exclusion matches all come out of one walk without a robocopy log to
+parse.
 
 Usage:
     python scan-excluded.py <backup_path> <config_path>
     python scan-excluded.py <backup_path> <config_path> --delete
+    python scan-excluded.py <backup_path> <config_path> --compact --output result.json
+    python scan-excluded.py <backup_path> <config_path> --mirror-source <source_path>
     python scan-excluded.py --help
 
 Output:
-    JSON object with matched directories and files (relative paths)
+    JSON object with matched directories and files (relative paths), plus
+    "reclaimable": {total_bytes, total_files, by_pattern, by_top_level}
+    where by_pattern/by_top_level map to {bytes, files, matches}, largest first
     With --delete: Also includes deletion results (deleted_dirs, deleted_files, errors)
+    With --compact: Matches as a path table (interned directories, files as
+        dir id + name; see path_table.py) instead of full path strings
+        (with --mirror-source only the exclusion matches, and only with --output)
+    With --mirror-source: One JSON record per line as the walk progresses
+        {"type": "extra"|"changed"|"new"|"excluded"|"error", "kind": "file"|"dir", "path": ...}
+    followed by a {"type": "summary", ...} record. With --output the records
+    are folded into the scan result file instead: directories/files (exclusion
+    matches, as before) plus extra_directories, extra_files and changed_files.
+    Excluded records carry the matching pattern and their size/files, and the
+    summary/result includes the same "reclaimable" totals.
 """
 
 import argparse
-import fnmatch
 import json
 import os
-import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from exclusion_rules import get_matcher, read_exclusions
+from path_table import FORMAT, add_match, intern_dir, new_table, table_paths
+from pending_delete import PENDING_DIR
+from tree_remover import is_link_entry, remove_tree
 
-def load_exclusions(config_path: str) -> tuple[list[str], list[str]]:
-    """Load exclusion patterns from config.json."""
-    try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+# Robocopy (and FAT/exFAT timestamps) only resolve mtimes to 2 seconds
+MTIME_TOLERANCE = 2.0
 
-        exclude_dirs = []
-        exclude_files = []
+# Windows file names are case-insensitive, so pair entries the same way
+_name_key = str.casefold if os.name == 'nt' else str
 
-        if 'backupDev' in config and 'exclusions' in config['backupDev']:
-            exclusions = config['backupDev']['exclusions']
-            exclude_dirs = exclusions.get('directories', [])
-            exclude_files = exclusions.get('files', [])
+# Threads sizing matched directories (I/O bound)
+DU_WORKERS = 8
 
-        return exclude_dirs, exclude_files
+
+def load_exclusions(config_path: str) -> tuple[list[str], list[str]]:
+    """Load exclusion patterns from config.json."""
+    try:
+        return read_exclusions(config_path)
     except Exception as e:
         print(f"Error loading config: {e}", file=sys.stderr)
         return [], []
 
 
-def scan_backup(backup_path: str, exclude_dirs: list[str], exclude_files: list[str]) -> dict:
+# ── Reclaimable space ──
+
+def du(path: str) -> tuple[int, int]:
+    """Total size and file count under a directory (symlinks/junctions are not followed)."""
+    total_bytes = 0
+    total_files = 0
+    stack = [path]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    # A junction is a directory to is_dir(follow_symlinks=False)
+                    if entry.is_dir(follow_symlinks=False) and not is_link_entry(entry):
+                        stack.append(entry.path)
+                    else:
+                        total_bytes += entry.stat(follow_symlinks=False).st_size
+                        total_files += 1
+                except OSError:
+                    continue
+    return total_bytes, total_files
+
+
+def _entry_size(entry: os.DirEntry) -> int:
+    # Free on Windows (scandir already has it); elsewhere the entry's only
+    # stat, as its type came from d_type without following links
+    try:
+        return entry.stat(follow_symlinks=False).st_size
+    except OSError:
+        return 0
+
+
+def _measure_dir(pool: ThreadPoolExecutor, entry: os.DirEntry):
+    """Start sizing a matched directory; symlinks/junctions count as empty."""
+    if is_link_entry(entry):
+        return None
+    return pool.submit(du, entry.path)
+
+
+def _new_reclaimable() -> dict:
+    return {'total_bytes': 0, 'total_files': 0, 'by_pattern': {}, 'by_top_level': {}}
+
+
+def _top_level(rel_path: str, is_dir: bool) -> str:
+    """by_top_level bucket: the first path component; a root-level file goes under '.'."""
+    if os.sep in rel_path:
+        return rel_path.split(os.sep, 1)[0]
+    return rel_path if is_dir else '.'
+
+
+def _add_reclaimable(reclaimable: dict, pattern: str, top_level: str, size: int, files: int) -> None:
+    reclaimable['total_bytes'] += size
+    reclaimable['total_files'] += files
+    for key, bucket in ((pattern, 'by_pattern'), (top_level, 'by_top_level')):
+        totals = reclaimable[bucket].setdefault(key, {'bytes': 0, 'files': 0, 'matches': 0})
+        totals['bytes'] += size
+        totals['files'] += files
+        totals['matches'] += 1
+
+
+def _sorted_reclaimable(reclaimable: dict) -> dict:
+    """Largest consumers first, which is the order cleanup should go in."""
+    for bucket in ('by_pattern', 'by_top_level'):
+        reclaimable[bucket] = dict(sorted(reclaimable[bucket].items(), key=lambda item: -item[1]['bytes']))
+    return reclaimable
+
+
+def _node_id(table: dict, ids: dict, node: list) -> int:
+    """Intern a walked directory ([parent node, name, id]) only once something inside it matches."""
+    if node[2] is None:
+        node[2] = intern_dir(table, ids, _node_id(table, ids, node[0]), node[1])
+    return node[2]
+
+
+def scan_backup(backup_path: str, exclude_dirs: list[str], exclude_files: list[str], compact: bool = False) -> dict:
     """
     Walk backup directory and find items matching exclusion patterns.
 
     Returns dict with:
         - directories: list of relative paths to matched directories
         - files: list of relative paths to matched files
-    """
-    matched_dirs = []
-    matched_files = []
-
-    backup_path = Path(backup_path)
+        - reclaimable: bytes/files per pattern and per top-level directory
 
-    # Convert exclude_dirs to a set for O(1) lookup
-    exclude_dirs_set = set(exclude_dirs)
-
-    for root, dirs, files in os.walk(backup_path):
-        rel_root = Path(root).relative_to(backup_path)
-
-        # Check directories
-        for d in dirs:
-            if d in exclude_dirs_set:
-                rel_path = str(rel_root / d) if str(rel_root) != '.' else d
-                matched_dirs.append(rel_path)
-
-        # Check files against patterns (supports wildcards like *.log)
-        for f in files:
-            for pattern in exclude_files:
-                if fnmatch.fnmatch(f, pattern):
-                    rel_path = str(rel_root / f) if str(rel_root) != '.' else f
-                    matched_files.append(rel_path)
-                    break  # Don't add same file multiple times
+    Matches are collected into a path table (see path_table.py); with
+    compact=True the table itself is returned instead of the path lists.
+    """
+    table = new_table()
+    ids = {}
+    reclaimable = _new_reclaimable()
+    pending = []
+
+    # Compile names and path globs into one trie, advanced per path component
+    matcher = get_matcher(exclude_dirs, exclude_files)
+
+    with ThreadPoolExecutor(max_workers=DU_WORKERS) as pool:
+        stack = [([None, '', 0], str(backup_path), matcher.root, '.')]
+        while stack:
+            node, dir_path, state, top_level = stack.pop()
+            try:
+                it = os.scandir(dir_path)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    try:
+                        # d_type answers this without a stat; symlinks are never followed
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+
+                    # Directories staged for background deletion are already gone
+                    if node[0] is None and entry.name == PENDING_DIR:
+                        continue
+
+                    pattern, child_state = matcher.match(state, entry.name, is_dir)
+
+                    # Check directories (a matched directory goes as a whole, so don't
+                    # descend - nor where no rule can match anything further down)
+                    if is_dir:
+                        child_top = entry.name if node[0] is None else top_level
+                        if pattern is not None:
+                            table['matched_dirs'].append(intern_dir(table, ids, _node_id(table, ids, node), entry.name))
+                            pending.append((pattern, child_top, _measure_dir(pool, entry)))
+                        elif not is_link_entry(entry) and not matcher.is_dead(child_state):
+                            stack.append(([node, entry.name, None], entry.path, child_state, child_top))
+                        continue
+
+                    # Check files against patterns (wildcards like *.log, or path globs)
+                    if pattern is not None:
+                        table['file_dirs'].append(_node_id(table, ids, node))
+                        table['file_names'].append(entry.name)
+                        _add_reclaimable(reclaimable, pattern, top_level, _entry_size(entry), 1)
+
+        for pattern, top_level, future in pending:
+            size, files = future.result() if future is not None else (0, 0)
+            _add_reclaimable(reclaimable, pattern, top_level, size, files)
+
+    counts = {
+        'directory_count': len(table['matched_dirs']),
+        'file_count': len(table['file_names']),
+        'reclaimable': _sorted_reclaimable(reclaimable)
+    }
+    if compact:
+        table.update(counts)
+        return table
 
+    matched_dirs, matched_files = table_paths(table)
     return {
         'directories': matched_dirs,
         'files': matched_files,
-        'directory_count': len(matched_dirs),
-        'file_count': len(matched_files)
+        **counts
     }
 
 
-def remove_readonly(func, path, excinfo):
+# ── Mirror diff ──
+
+def _list_dir(path: str) -> dict:
+    """List a directory as {name key: DirEntry}, skipping symlinks/junctions (robocopy /XJ)."""
+    entries = {}
+    with os.scandir(path) as it:
+        for entry in it:
+            if is_link_entry(entry):
+                continue
+            entries[_name_key(entry.name)] = entry
+    return entries
+
+
+def mirror_diff(source_path: str, backup_path: str, exclude_dirs: list[str], exclude_files: list[str]):
     """
-    Error handler for shutil.rmtree to handle read-only files.
-    Git pack files and index files are often read-only.
+    Walk source and backup side by side and yield one record per difference.
+
+    Record types:
+        - extra: in the backup but not the source (what robocopy /MIR purges).
+          Extra directories are reported once and not descended into.
+        - excluded: in both trees but matching an exclusion pattern; carries
+          the pattern and its size/files (directories are sized on a thread
+          pool during the walk and reported once it finishes)
+        - changed: file in both trees with a different size or mtime
+        - new: in the source but not the backup (not descended into)
+        - error: a directory that could not be listed
+
+    Each directory pair is listed concurrently: the source listing runs on a
+    worker thread while the backup listing runs on the caller's.
     """
-    import stat
-    # Clear the read-only flag and retry
-    os.chmod(path, stat.S_IWRITE)
-    func(path)
+    matcher = get_matcher(exclude_dirs, exclude_files)
+    stack = [('', source_path, backup_path, matcher.root)]
+    pending = []
+
+    with ThreadPoolExecutor(max_workers=1) as pool, ThreadPoolExecutor(max_workers=DU_WORKERS) as du_pool:
+        while stack:
+            rel_root, src_dir, dst_dir, state = stack.pop()
+            src_future = pool.submit(_list_dir, src_dir)
+            try:
+                dst_entries = _list_dir(dst_dir)
+            except OSError as e:
+                dst_entries = None
+                yield {'type': 'error', 'path': rel_root or '.', 'message': str(e)}
+            try:
+                src_entries = src_future.result()
+            except OSError as e:
+                if dst_entries is not None:
+                    yield {'type': 'error', 'path': rel_root or '.', 'message': str(e)}
+                continue
+            if dst_entries is None:
+                continue
+            if not rel_root:
+                dst_entries.pop(_name_key(PENDING_DIR), None)
+
+            subdirs = []
+            for key, dst in sorted(dst_entries.items()):
+                rel_path = os.path.join(rel_root, dst.name) if rel_root else dst.name
+                src = src_entries.pop(key, None)
+                dst_is_dir = dst.is_dir(follow_symlinks=False)
+
+                # A file replaced by a directory (or vice versa) is purged and recopied
+                if src is None or src.is_dir(follow_symlinks=False) != dst_is_dir:
+                    yield {'type': 'extra', 'kind': 'dir' if dst_is_dir else 'file', 'path': rel_path}
+                    if src is not None:
+                        src_entries[key] = src
+                    continue
+
+                pattern, child_state = matcher.match(state, dst.name, dst_is_dir)
+                if dst_is_dir:
+                    if pattern is not None:
+                        pending.append(({'type': 'excluded', 'kind': 'dir', 'path': rel_path, 'pattern': pattern},
+                                        _measure_dir(du_pool, dst)))
+                    else:
+                        subdirs.append((rel_path, src.path, dst.path, child_state))
+                    continue
+
+                if pattern is not None:
+                    yield {'type': 'excluded', 'kind': 'file', 'path': rel_path, 'pattern': pattern,
+                           'size': _entry_size(dst), 'files': 1}
+                    continue
+
+                try:
+                    src_stat = src.stat(follow_symlinks=False)
+                    dst_stat = dst.stat(follow_symlinks=False)
+                except OSError as e:
+                    yield {'type': 'error', 'path': rel_path, 'message': str(e)}
+                    continue
+                if (src_stat.st_size != dst_stat.st_size
+                        or abs(src_stat.st_mtime - dst_stat.st_mtime) > MTIME_TOLERANCE):
+                    yield {
+                        'type': 'changed',
+                        'kind': 'file',
+                        'path': rel_path,
+                        'size': src_stat.st_size,
+                        'backup_size': dst_stat.st_size,
+                        'mtime': src_stat.st_mtime,
+                        'backup_mtime': dst_stat.st_mtime,
+                    }
+
+            # Whatever is left only exists in the source
+            for key, src in sorted(src_entries.items()):
+                src_is_dir = src.is_dir(follow_symlinks=False)
+                if matcher.match(state, src.name, src_is_dir)[0] is not None:
+                    continue
+                rel_path = os.path.join(rel_root, src.name) if rel_root else src.name
+                yield {'type': 'new', 'kind': 'dir' if src_is_dir else 'file', 'path': rel_path}
+
+            # Reversed so the stack pops subdirectories in name order
+            stack.extend(reversed(subdirs))
+
+        for record, future in pending:
+            record['size'], record['files'] = future.result() if future is not None else (0, 0)
+            yield record
+
+
+def collect_mirror_diff(records, stream=None, compact: bool = False) -> dict:
+    """
+    Fold mirror_diff records into a scan result, optionally echoing each
+    record to `stream` as a JSON line while the walk is still running.
+
+    The result keeps the scan_backup keys (directories/files are the
+    exclusion matches) so delete-excluded.py can consume it unchanged;
+    with compact=True the exclusion matches are a path table instead, as
+    in scan_backup.
+    """
+    table = new_table() if compact else None
+    ids = {}
+    lists = {
+        ('excluded', 'dir'): [],
+        ('excluded', 'file'): [],
+        ('extra', 'dir'): [],
+        ('extra', 'file'): [],
+        ('changed', 'file'): [],
+    }
+    new_dirs = 0
+    new_files = 0
+    errors = []
+    reclaimable = _new_reclaimable()
+
+    for record in records:
+        if stream is not None:
+            stream.write(json.dumps(record) + '\n')
+        kind = record['type']
+        if kind == 'error':
+            errors.append(f"{record['path']} - {record['message']}")
+        elif kind == 'new':
+            if record['kind'] == 'dir':
+                new_dirs += 1
+            else:
+                new_files += 1
+        elif kind == 'excluded':
+            is_dir = record['kind'] == 'dir'
+            if table is not None:
+                add_match(table, ids, record['path'], is_dir)
+            else:
+                lists[(kind, record['kind'])].append(record['path'])
+            _add_reclaimable(reclaimable, record['pattern'], _top_level(record['path'], is_dir),
+                             record['size'], record['files'])
+        else:
+            lists[(kind, record['kind'])].append(record['path'])
+
+    if table is not None:
+        matches = dict(table, directory_count=len(table['matched_dirs']), file_count=len(table['file_names']))
+    else:
+        matches = {
+            'directories': lists[('excluded', 'dir')],
+            'files': lists[('excluded', 'file')],
+            'directory_count': len(lists[('excluded', 'dir')]),
+            'file_count': len(lists[('excluded', 'file')]),
+        }
+    return {
+        **matches,
+        'extra_directories': lists[('extra', 'dir')],
+        'extra_files': lists[('extra', 'file')],
+        'extra_directory_count': len(lists[('extra', 'dir')]),
+        'extra_file_count': len(lists[('extra', 'file')]),
+        'changed_files': lists[('changed', 'file')],
+        'changed_file_count': len(lists[('changed', 'file')]),
+        'new_directory_count': new_dirs,
+        'new_file_count': new_files,
+        'scan_errors': errors,
+        'reclaimable': _sorted_reclaimable(reclaimable),
+    }
 
 
 def delete_excluded(backup_path: str, directories: list[str], files: list[str], show_progress: bool = True) -> dict:
@@ -104,6 +419,7 @@ def delete_excluded(backup_path: str, directories: list[str], files: list[str],
     Returns dict with:
         - deleted_dirs: count of successfully deleted directories
         - deleted_files: count of successfully deleted files
+        - removed_dirs / removed_files: exact totals removed, directory contents included
         - errors: list of error messages
     """
     import stat
@@ -111,6 +427,8 @@ def delete_excluded(backup_path: str, directories: list[str], files: list[str],
     backup_path = Path(backup_path)
     deleted_dirs = 0
     deleted_files = 0
+    removed_dirs = 0
+    removed_files = 0
     errors = []
 
     total_dirs = len(directories)
@@ -121,13 +439,18 @@ def delete_excluded(backup_path: str, directories: list[str], files: list[str],
     # Delete directories first (they may contain matched files)
     for i, dir_path in enumerate(directories):
         full_path = backup_path / dir_path
-        if full_path.exists() and full_path.is_dir():
+        if full_path.is_dir() and not full_path.is_symlink():
             try:
-                # Use onerror handler to deal with read-only files (common in .git)
-                shutil.rmtree(full_path, onerror=remove_readonly)
+                # Read-only entries (common in .git) are made writable before deletion
+                removed = remove_tree(full_path)
+            except OSError as e:
+                removed = {'files': 0, 'dirs': 0, 'errors': [f"{full_path} - {e}"]}
+            removed_dirs += removed['dirs']
+            removed_files += removed['files']
+            if removed['errors']:
+                errors.extend(f"Dir: {err}" for err in removed['errors'])
+            else:
                 deleted_dirs += 1
-            except Exception as e:
-                errors.append(f"Dir: {dir_path} - {str(e)}")
 
         # Output progress to stderr every 500ms
         if show_progress:
@@ -148,6 +471,7 @@ def delete_excluded(backup_path: str, directories: list[str], files: list[str],
                     os.chmod(full_path, stat.S_IWRITE)
                 full_path.unlink()
                 deleted_files += 1
+                removed_files += 1
             except Exception as e:
                 errors.append(f"File: {file_path} - {str(e)}")
 
@@ -163,6 +487,8 @@ def delete_excluded(backup_path: str, directories: list[str], files: list[str],
     return {
         'deleted_dirs': deleted_dirs,
         'deleted_files': deleted_files,
+        'removed_dirs': removed_dirs,
+        'removed_files': removed_files,
         'errors': errors
     }
 
@@ -176,8 +502,15 @@ def main():
     parser.add_argument('--pretty', action='store_true', help='Pretty-print JSON output')
     parser.add_argument('--delete', action='store_true', help='Delete matched files and directories')
     parser.add_argument('--output', '-o', help='Save scan result to file (for use with delete-excluded.py)')
+    parser.add_argument('--compact', action='store_true',
+                        help='Write matches as a path table (smaller for large trees; read by delete-excluded.py)')
+    parser.add_argument('--mirror-source', metavar='SOURCE_PATH',
+                        help='Also diff the backup against its source (extras, changed files) in the same pass')
 
     args = parser.parse_args()
+    if args.compact and args.mirror_source and not args.output:
+        # Streamed mirror records are always full paths; only the saved result can be a table
+        parser.error('--compact with --mirror-source requires --output')
 
     # Validate paths
     if not os.path.isdir(args.backup_path):
@@ -188,32 +521,49 @@ def main():
         print(json.dumps({'error': f'Config file not found: {args.config_path}'}))
         sys.exit(1)
 
+    if args.mirror_source and not os.path.isdir(args.mirror_source):
+        print(json.dumps({'error': f'Source path not found: {args.mirror_source}'}))
+        sys.exit(1)
+
     # Load exclusions
     exclude_dirs, exclude_files = load_exclusions(args.config_path)
 
-    if not exclude_dirs and not exclude_files:
+    if not args.mirror_source and not exclude_dirs and not exclude_files:
         print(json.dumps({
             'directories': [],
             'files': [],
             'directory_count': 0,
             'file_count': 0,
+            'reclaimable': _new_reclaimable(),
             'message': 'No exclusion patterns configured'
         }))
         sys.exit(0)
 
-    # Scan backup
-    result = scan_backup(args.backup_path, exclude_dirs, exclude_files)
+    # Scan backup (streaming records to stdout in mirror mode unless saving to a file)
+    stream = sys.stdout if args.mirror_source and not args.output else None
+    if args.mirror_source:
+        records = mirror_diff(args.mirror_source, args.backup_path, exclude_dirs, exclude_files)
+        result = collect_mirror_diff(records, stream, compact=args.compact)
+    else:
+        result = scan_backup(args.backup_path, exclude_dirs, exclude_files, compact=args.compact)
 
     # Delete if requested
     if args.delete:
-        delete_result = delete_excluded(
-            args.backup_path,
-            result['directories'],
-            result['files']
-        )
+        if result.get('format') == FORMAT:
+            directories, files = table_paths(result)
+        else:
+            directories, files = result['directories'], result['files']
+        delete_result = delete_excluded(args.backup_path, directories, files)
         result.update(delete_result)
 
     # Output JSON
+    if stream is not None:
+        summary = {'type': 'summary'}
+        summary.update((k, v) for k, v in result.items() if not isinstance(v, list))  # counts + reclaimable
+        summary['errors'] = result.get('errors', []) + result['scan_errors']
+        print(json.dumps(summary))
+        return
+
     output_json = json.dumps(result, indent=2) if args.pretty else json.dumps(result)
 
     if args.output:
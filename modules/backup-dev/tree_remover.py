@@ -0,0 +1,291 @@
+"""
+Recursive directory remover shared by the backup-dev Python scripts.
+
+shutil.rmtree(path, onerror=remove_readonly) hits a read-only file (git
+objects, packs) by failing, chmod-ing and retrying - one exception per file
+- and cannot say how much it removed. remove_tree instead:
+
+    - expands the top of the tree breadth-first until there is enough work,
+      then removes each subtree depth-first on a thread pool
+    - on POSIX, opens every directory relative to its parent's handle with
+      O_NOFOLLOW and unlinks its entries through that handle (unlinkat via
+      dir_fd), so no path is resolved per file and a directory swapped for
+      a symlink mid-walk is never followed; at most one handle per level of
+      depth is open per worker
+    - removes symlinks, junctions and other reparse points as links and
+      never descends into them (DirEntry.is_junction needs Python 3.12, so
+      the reparse-point attribute is checked instead)
+    - clears permission bits before they get in the way: a directory
+      without owner rwx is fixed once before it is entered, and on Windows
+      read-only files and directories are made writable from the attributes
+      scandir already returned, before the delete
+    - returns exact file and directory counts, reporting progress as it goes
+
+Usage:
+    result = remove_tree(path, progress=lambda files, dirs: ...)
+    result = remove_tree(path, dry_run=True)   # count only
+    # {'files': ..., 'dirs': ..., 'errors': [...]}
+"""
+
+import os
+import stat
+import threading
+
+# Directories emptied in parallel (unlink is I/O bound)
+DEFAULT_WORKERS = 8
+
+# Directories entered breadth-first (handles held open) before handing
+# subtrees to the pool
+_MAX_EXPANDED = 64
+
+_HAVE_DIR_FD = (os.open in os.supports_dir_fd and os.unlink in os.supports_dir_fd
+                and os.rmdir in os.supports_dir_fd and os.scandir in os.supports_fd
+                and hasattr(os, 'O_DIRECTORY') and hasattr(os, 'O_NOFOLLOW'))
+_DIR_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0)
+_OWNER_RWX = stat.S_IRWXU
+_READONLY = getattr(stat, 'FILE_ATTRIBUTE_READONLY', 0x1)
+_REPARSE_POINT = getattr(stat, 'FILE_ATTRIBUTE_REPARSE_POINT', 0x400)
+_DIRECTORY = getattr(stat, 'FILE_ATTRIBUTE_DIRECTORY', 0x10)
+
+
+def _is_link(st: os.stat_result) -> bool:
+    """Symlink, or any Windows reparse point (junction, mount point, cloud placeholder)."""
+    return stat.S_ISLNK(st.st_mode) or bool(getattr(st, 'st_file_attributes', 0) & _REPARSE_POINT)
+
+
+def is_link_entry(entry: os.DirEntry) -> bool:
+    """
+    Whether a scandir entry is a symlink or junction (robocopy /XJ), without
+    an extra syscall: d_type on POSIX, the cached attributes on Windows.
+    """
+    if os.name == 'nt':
+        return _is_link(entry.stat(follow_symlinks=False))
+    return entry.is_symlink()
+
+
+def _remove_link(path: str, st: os.stat_result) -> None:
+    # A directory junction/symlink is removed with RemoveDirectory, which never touches its target
+    if getattr(st, 'st_file_attributes', 0) & _DIRECTORY:
+        os.rmdir(path)
+    else:
+        os.unlink(path)
+
+
+# ── POSIX: handles relative to the parent ──
+
+def _enter_at(parent_fd: int, name: str, display: str, dry_run: bool, errors: list) -> tuple:
+    """
+    Open one directory from its parent's handle and unlink its files.
+
+    Returns (handle, files, subdirectory names); handle is None if the
+    directory could not be entered (the error is recorded).
+    """
+    try:
+        try:
+            fd = os.open(name, _DIR_FLAGS, dir_fd=parent_fd)
+        except PermissionError:
+            if dry_run:
+                raise
+            # Unreadable directory: grant owner rwx once, then enter it
+            if not stat.S_ISDIR(os.stat(name, dir_fd=parent_fd, follow_symlinks=False).st_mode):
+                raise
+            os.chmod(name, _OWNER_RWX, dir_fd=parent_fd)
+            fd = os.open(name, _DIR_FLAGS, dir_fd=parent_fd)
+    except OSError as e:
+        errors.append(f"{display} - {e}")
+        return None, 0, []
+
+    files = 0
+    subdirs = []
+    try:
+        mode = stat.S_IMODE(os.fstat(fd).st_mode)
+        if not dry_run and mode & _OWNER_RWX != _OWNER_RWX:
+            # Entries can only be unlinked from a writable directory
+            os.fchmod(fd, mode | _OWNER_RWX)
+        with os.scandir(fd) as it:
+            for entry in it:
+                try:
+                    # d_type answers this without a stat; symlinks are not dirs here
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                        continue
+                    if not dry_run:
+                        os.unlink(entry.name, dir_fd=fd)
+                    files += 1
+                except OSError as e:
+                    errors.append(f"{os.path.join(display, entry.name)} - {e}")
+    except OSError as e:
+        os.close(fd)
+        errors.append(f"{display} - {e}")
+        return None, files, []
+    return fd, files, subdirs
+
+
+def _rmdir_at(parent_fd: int, name: str, dry_run: bool) -> None:
+    if not dry_run:
+        os.rmdir(name, dir_fd=parent_fd)
+
+
+# ── Windows: paths ──
+
+def _enter_path(parent: str, name: str, display: str, dry_run: bool, errors: list) -> tuple:
+    """Path-based variant for platforms without dir_fd (Windows); the handle is the path."""
+    files = 0
+    subdirs = []
+    try:
+        with os.scandir(display) as it:
+            for entry in it:
+                try:
+                    # scandir already has the attributes on Windows - no extra call
+                    st = entry.stat(follow_symlinks=False)
+                    if _is_link(st):
+                        if not dry_run:
+                            _remove_link(entry.path, st)
+                        files += 1
+                        continue
+                    if stat.S_ISDIR(st.st_mode):
+                        subdirs.append((entry.name, getattr(st, 'st_file_attributes', 0)))
+                        continue
+                    if not dry_run:
+                        if getattr(st, 'st_file_attributes', 0) & _READONLY:
+                            os.chmod(entry.path, stat.S_IWRITE | stat.S_IREAD)
+                        os.unlink(entry.path)
+                    files += 1
+                except OSError as e:
+                    errors.append(f"{entry.path} - {e}")
+    except OSError as e:
+        errors.append(f"{display} - {e}")
+        return None, files, []
+    return display, files, subdirs
+
+
+def _rmdir_path(parent: str, name, dry_run: bool) -> None:
+    name, attributes = name
+    if not dry_run:
+        path = os.path.join(parent, name)
+        if attributes & _READONLY:
+            # A read-only directory can't be removed on Windows
+            os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+        os.rmdir(path)
+
+
+if _HAVE_DIR_FD:
+    _enter, _rmdir, _close = _enter_at, _rmdir_at, os.close
+    _child_name = lambda child: child
+else:
+    _enter, _rmdir, _close = _enter_path, _rmdir_path, lambda handle: None
+    _child_name = lambda child: child[0]
+
+
+def _remove_subtree(parent, child, display: str, dry_run: bool, tally, errors: list) -> None:
+    """Depth-first removal of one directory below an open parent handle."""
+    # Frames: [handle, child (as passed to _rmdir), display path, subdirectories left]
+    stack = []
+    try:
+        handle, files, subdirs = _enter(parent, _child_name(child), display, dry_run, errors)
+        tally(files, 0)
+        if handle is None:
+            return
+        stack.append([handle, child, display, subdirs])
+        while stack:
+            frame = stack[-1]
+            if frame[3]:
+                sub = frame[3].pop()
+                sub_display = os.path.join(frame[2], _child_name(sub))
+                handle, files, subdirs = _enter(frame[0], _child_name(sub), sub_display, dry_run, errors)
+                tally(files, 0)
+                if handle is not None:
+                    stack.append([handle, sub, sub_display, subdirs])
+                continue
+            stack.pop()
+            _close(frame[0])
+            try:
+                _rmdir(stack[-1][0] if stack else parent, frame[1], dry_run)
+                tally(0, 1)
+            except OSError as e:
+                errors.append(f"{frame[2]} - {e}")
+    finally:
+        for frame in stack:
+            _close(frame[0])
+
+
+def remove_tree(path, workers: int = DEFAULT_WORKERS, progress=None, dry_run: bool = False) -> dict:
+    """
+    Delete a directory tree (or just count it with dry_run).
+
+    progress, if given, is called as progress(files, dirs) with running
+    totals after each directory is emptied or removed (from the worker
+    threads, one call at a time).
+
+    Returns dict with:
+        - files: files (and links) removed
+        - dirs: directories removed, including path itself
+        - errors: list of "full path - error" messages (the tree may be partly left)
+    """
+    path = os.fspath(path)
+    totals = {'files': 0, 'dirs': 0}
+    errors = []
+    lock = threading.Lock()
+
+    # A link or junction is removed as a link, like rmtree's refusal to follow it
+    st = os.lstat(path)
+    if _is_link(st):
+        if not dry_run:
+            _remove_link(path, st)
+        return {'files': 1, 'dirs': 0, 'errors': []}
+
+    def tally(files: int, dirs: int) -> None:
+        if not (files or dirs):
+            return
+        with lock:
+            totals['files'] += files
+            totals['dirs'] += dirs
+            if progress is not None:
+                progress(totals['files'], totals['dirs'])
+
+    full_path = os.path.abspath(path)
+    parent, name = os.path.split(full_path)
+    if _HAVE_DIR_FD:
+        top = os.open(parent, os.O_RDONLY | os.O_DIRECTORY)
+        root = name
+    else:
+        top = parent
+        root = (name, getattr(st, 'st_file_attributes', 0))
+
+    # Enter the top levels breadth-first so the pool gets a subtree per worker
+    expanded = []   # [handle, parent handle, child, display], parents first
+    pending = [(top, root, full_path)]
+    try:
+        while pending and len(pending) < 2 * workers and len(expanded) < _MAX_EXPANDED:
+            parent_handle, child, display = pending.pop(0)
+            handle, files, subdirs = _enter(parent_handle, _child_name(child), display, dry_run, errors)
+            tally(files, 0)
+            if handle is None:
+                continue
+            expanded.append((handle, parent_handle, child, display))
+            pending.extend((handle, sub, os.path.join(display, _child_name(sub))) for sub in subdirs)
+
+        if pending:
+            # Imported here so a run that never deletes in place doesn't load it
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                for future in [pool.submit(_remove_subtree, *item, dry_run, tally, errors) for item in pending]:
+                    future.result()
+
+        # Children were expanded after their parents, so reversed is deepest first
+        while expanded:
+            handle, parent_handle, child, display = expanded.pop()
+            _close(handle)
+            try:
+                _rmdir(parent_handle, child, dry_run)
+                tally(0, 1)
+            except OSError as e:
+                errors.append(f"{display} - {e}")
+    finally:
+        for handle, *_ in expanded:
+            _close(handle)
+        if _HAVE_DIR_FD:
+            os.close(top)
+
+    return {'files': totals['files'], 'dirs': totals['dirs'], 'errors': errors}
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Long-lived Python worker for console.ps1.
+
+Starting a fresh `python` for every console action costs interpreter
+startup, imports, and config parsing each time, and throws away whatever the
+last run had warmed up. The code counter paid this once per selected
+project. This worker is started once and answers line-delimited JSON-RPC 2.0
+requests on stdin/stdout. While it runs it keeps these warm:
+
+    - the line-counter, backup-dev and excel-tools modules (imported once)
+    - parsed config.json and the count-tree cache, reloaded only when the
+      file's mtime/size changes
+    - compiled exclusion matchers (exclusion_rules.get_matcher)
+    - the git blob count cache of count-lines --git
+    - workbook sheet listings, keyed by file mtime/size
+
+stdout carries only protocol lines. Anything a handler prints (tables,
+progress bars) goes to stderr, which the console shows as usual.
+
+Methods (params -> result):
+    ping           {}                          -> {pid, methods}
+    count          {path?, config?, subtree?, save_tree?, git?, format?}
+                   -> count-lines result (+ "source": "tree"|"scan")
+    scan           {backup_path, config?, mirror_source?, compact?, output?}
+                   -> scan-excluded result (counts only when written to output)
+    delete         {backup_path, scan_result, dry_run?, trash?, output?}
+                   -> delete-excluded result
+    excel.sheets   {files}                     -> {file: [{name, sheetId, rId, state}]}
+    excel.dump     {files, sheet?, cells?, pattern?, hidden_only?, output?, limit?}
+                   -> {count, records?}
+    excel.compare  {file_a, file_b}            -> {report: [lines]}
+    shutdown       {}                          -> {} (then the worker exits)
+
+The worker also exits when stdin closes (e.g. the console went away).
+Interactive excel-tools sessions still run as their own process, because the
+menu needs the terminal.
+
+Usage:
+    python console-worker.py
+    echo {"jsonrpc":"2.0","id":1,"method":"ping"} | python console-worker.py
+"""
+
+import contextlib
+import importlib.util
+import json
+import os
+import re
+import sys
+import traceback
+from pathlib import Path
+
+MODULES_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_CONFIG = MODULES_DIR.parent / 'config.json'
+
+_SCRIPTS = {
+    'count_lines': MODULES_DIR / 'line-counter' / 'count-lines.py',
+    'scan_excluded': MODULES_DIR / 'backup-dev' / 'scan-excluded.py',
+    'delete_excluded': MODULES_DIR / 'backup-dev' / 'delete-excluded.py',
+    'excel_tools': MODULES_DIR / 'excel-tools' / 'excel-tools.py',
+}
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+METHODS = {}
+
+_modules = {}
+_json_cache = {}
+_sheet_cache = {}
+_blob_cache = None
+_stopping = False
+
+
+def method(name: str):
+    def register(func):
+        METHODS[name] = func
+        return func
+    return register
+
+
+# ── Warm state ──
+
+def load_script(name: str):
+    """Import one of the console's Python scripts once (their file names aren't importable)."""
+    module = _modules.get(name)
+    if module is None:
+        path = _SCRIPTS[name]
+        # backup-dev scripts import their sibling helper modules
+        if str(path.parent) not in sys.path:
+            sys.path.insert(0, str(path.parent))
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[name] = module
+    return module
+
+
+def _stat_key(path) -> tuple:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def load_json_cached(path) -> dict:
+    """Parsed JSON file, re-read only when its mtime or size changed."""
+    path = os.path.abspath(path)
+    key = _stat_key(path)
+    cached = _json_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    _json_cache[path] = (key, data)
+    return data
+
+
+def _require(params: dict, *names: str) -> None:
+    missing = [name for name in names if not params.get(name)]
+    if missing:
+        raise ValueError(f"Missing parameter(s): {', '.join(missing)}")
+
+
+def _write_json(path: str, data: dict) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+# ── Methods ──
+
+@method('ping')
+def ping(params: dict) -> dict:
+    return {'pid': os.getpid(), 'methods': sorted(METHODS)}
+
+
+@method('count')
+def count(params: dict) -> dict:
+    """count-lines.py: [path] [--subtree] [--save-tree] [--git], table printed unless format='json'."""
+    global _blob_cache
+    cl = load_script('count_lines')
+    config_path = Path(params.get('config') or DEFAULT_CONFIG)
+    try:
+        snapshot = cl.load_config_snapshot(config_path)
+    except KeyError as e:
+        raise ValueError(f"Could not read config.json: missing {e}")
+    dev_root = snapshot['dev_root']
+    show_table = params.get('format', 'table') == 'table'
+    target = Path(os.path.abspath(params['path'])) if params.get('path') else dev_root
+
+    # Answer from the cached count tree when it covers the path (parsed once per save)
+    if params.get('subtree'):
+        try:
+            payload = load_json_cached(cl.COUNT_TREE_FILE)
+        except (OSError, json.JSONDecodeError):
+            payload = None
+        if (payload is not None
+                and payload.get('version') == cl.COUNT_TREE_VERSION
+                and payload['dev_root'] == str(dev_root)
+                and payload['created'] >= config_path.stat().st_mtime):
+            found = cl.find_count_tree_node(payload, target)
+            result = cl.query_count_tree(payload, target, found)
+            if result is not None:
+                if show_table:
+                    if found[0] == 'file':
+                        cl.print_file_table(result)
+                    else:
+                        cl.print_project_table(result)
+                result['source'] = 'tree'
+                return result
+        print(f"Note: No cached count tree covers {target}; scanning it.", file=sys.stderr)
+
+    if not target.exists():
+        raise ValueError(f"Path does not exist: {target}")
+
+    if target.is_file():
+        result = cl.scan_single_file(target)
+        if show_table:
+            cl.print_file_table(result)
+        result['source'] = 'scan'
+        return result
+
+    if params.get('git') and _blob_cache is None:
+        _blob_cache = cl.load_blob_cache()
+    count_tree = cl.new_count_tree() if params.get('save_tree') else None
+
+    result = cl.scan_project_lines(target, dev_root, snapshot['line_counter'], use_git=bool(params.get('git')),
+                                   count_tree=count_tree, blob_cache=_blob_cache,
+                                   exclusion_rules=snapshot['exclusion_rules'])
+    if count_tree is not None:
+        cl.save_count_tree(cl.finalize_count_tree(count_tree), target, dev_root)
+    if show_table:
+        cl.print_project_table(result)
+    result['source'] = 'scan'
+    return result
+
+
+@method('scan')
+def scan(params: dict) -> dict:
+    """scan-excluded.py: plain or --mirror-source scan, optionally saved to output."""
+    _require(params, 'backup_path')
+    se = load_script('scan_excluded')
+    # Importable once load_script has put backup-dev on sys.path
+    from exclusion_rules import exclusions_from_config
+    backup_path = params['backup_path']
+    if not os.path.isdir(backup_path):
+        raise ValueError(f"Backup path not found: {backup_path}")
+    mirror_source = params.get('mirror_source')
+    if mirror_source and not os.path.isdir(mirror_source):
+        raise ValueError(f"Source path not found: {mirror_source}")
+
+    config = load_json_cached(params.get('config') or DEFAULT_CONFIG)
+    exclude_dirs, exclude_files = exclusions_from_config(config)
+
+    if mirror_source:
+        result = se.collect_mirror_diff(se.mirror_diff(mirror_source, backup_path, exclude_dirs, exclude_files))
+    else:
+        result = se.scan_backup(backup_path, exclude_dirs, exclude_files, compact=bool(params.get('compact')))
+
+    if params.get('output'):
+        _write_json(params['output'], result)
+        # The caller reads the lists from the file; answer with the counts
+        return {k: v for k, v in result.items() if not isinstance(v, list)}
+    return result
+
+
+@method('delete')
+def delete(params: dict) -> dict:
+    """delete-excluded.py: delete (or --trash) the items of a scan result file."""
+    _require(params, 'backup_path', 'scan_result')
+    de = load_script('delete_excluded')
+    backup_path = Path(params['backup_path'])
+    if not backup_path.is_dir():
+        raise ValueError(f"Backup path not found: {backup_path}")
+    with open(params['scan_result'], 'r', encoding='utf-8') as f:
+        table = de.load_table(json.load(f))
+
+    dry_run = bool(params.get('dry_run'))
+    result = de.delete_items(backup_path, table, dry_run=dry_run, trash=bool(params.get('trash')))
+    result['purge_started'] = False if dry_run else de.start_purger(backup_path)
+
+    if params.get('output'):
+        _write_json(params['output'], result)
+    return result
+
+
+def _workbook_sheets(et, path: str) -> list[dict]:
+    key = (os.path.abspath(path), *_stat_key(path))
+    sheets = _sheet_cache.get(key)
+    if sheets is None:
+        sheets = et._get_workbook_info(path)
+        _sheet_cache[key] = sheets
+    return sheets
+
+
+@method('excel.sheets')
+def excel_sheets(params: dict) -> dict:
+    _require(params, 'files')
+    et = load_script('excel_tools')
+    return {path: _workbook_sheets(et, path) for path in params['files']}
+
+
+@method('excel.dump')
+def excel_dump(params: dict) -> dict:
+    """Formula dump with the same filters as menu option 5."""
+    _require(params, 'files')
+    et = load_script('excel_tools')
+    try:
+        options = {
+            'sheet': params.get('sheet', ''),
+            'cells': et._parse_cell_range(params.get('cells', '')),
+            'pattern': re.compile(params['pattern'], re.IGNORECASE) if params.get('pattern') else None,
+            'hidden_only': bool(params.get('hidden_only')),
+        }
+    except re.error as e:
+        raise ValueError(f"Invalid regex: {e}")
+    records = et._iter_formula_dump(params['files'], options)
+
+    if params.get('output'):
+        return {'count': et._export_formula_dump(records, params['output'])}
+
+    limit = params.get('limit')
+    collected = []
+    total = 0
+    for record in records:
+        total += 1
+        if limit is None or len(collected) < limit:
+            collected.append(record)
+    return {'count': total, 'records': collected}
+
+
+@method('excel.compare')
+def excel_compare(params: dict) -> dict:
+    _require(params, 'file_a', 'file_b')
+    et = load_script('excel_tools')
+    return {'report': et.compare_workbooks(params['file_a'], params['file_b'])}
+
+
+@method('shutdown')
+def shutdown(params: dict) -> dict:
+    global _stopping
+    _stopping = True
+    return {}
+
+
+# ── Protocol ──
+
+def _error(request_id, code: int, message: str) -> dict:
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+def handle(line: str) -> dict | None:
+    """Response for one request line (None for notifications)."""
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as e:
+        return _error(None, PARSE_ERROR, f"Parse error: {e}")
+    if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+        return _error(None, INVALID_REQUEST, 'Invalid request')
+
+    request_id = request.get('id')
+    handler = METHODS.get(request['method'])
+    params = request.get('params') or {}
+    if handler is None:
+        response = _error(request_id, METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+    elif not isinstance(params, dict):
+        response = _error(request_id, INVALID_PARAMS, 'params must be an object')
+    else:
+        try:
+            # Handlers print for the user; keep stdout for protocol lines only
+            with contextlib.redirect_stdout(sys.stderr):
+                response = {'jsonrpc': '2.0', 'id': request_id, 'result': handler(params)}
+        except (ValueError, FileNotFoundError) as e:
+            response = _error(request_id, INVALID_PARAMS, str(e))
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            response = _error(request_id, SERVER_ERROR, f"{type(e).__name__}: {e}")
+
+    return response if 'id' in request else None
+
+
+def serve(stdin, stdout) -> None:
+    for line in stdin:
+        # Windows PowerShell may open the pipe with a UTF-8 BOM
+        line = line.strip().lstrip('\ufeff')
+        if not line:
+            continue
+        response = handle(line)
+        if response is not None:
+            stdout.write(json.dumps(response) + '\n')
+            stdout.flush()
+        if _stopping:
+            break
+
+
+def main():
+    # Protocol lines are UTF-8 regardless of the console code page
+    sys.stdin.reconfigure(encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8')
+    serve(sys.stdin, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,31 +6,74 @@ Menu-driven CLI combining:
   2. Re-protect & Re-hide sheets
   3. Strip external workbook links
   4. Find & Replace in formulas
-  5. Dump all formulas (debug)
+  5. Dump formulas (debug) — terminal or TSV/NDJSON export, with filters
   6. Compare workbooks
   7. Generate Lumen invoices (domain-specific)
   8. Clear all tab colors
+  9. Bulk Find & Replace in formulas (CSV/JSON mapping file)
 
 Uses direct XML manipulation (zipfile) — no openpyxl — so conditional
 formatting, external links, and other Excel features are never corrupted
 during save.
 
+Saves stage the rewritten archive next to the workbook and commit it with
+an atomic rename. Optional "save" settings in excel-tools.json:
+
+    "save": {"backup": false, "fsync": "file"}
+
+backup keeps the previous version as <name>.bak; fsync is "none", "file"
+(flush the staged archive before the rename) or "full" (also flush the
+directory entry).
+
+Sheet protection uses Excel's legacy XOR hash unless excel-tools.json asks
+for the modern SHA-512 form:
+
+    "protection": {"algorithm": "sha512", "spinCount": 100000,
+                   "saltScope": "run", "workers": 0}
+
+saltScope "run" hashes once per batch, "file" once per workbook and
+"sheet" once per sheet (spread over a process pool of `workers`).
+
 Usage:
     python excel-tools.py
 """
 
-import calendar  # noqa: F401  (used in generate path, imported for completeness)
-import getpass
-import html
+from __future__ import annotations
+
+import fnmatch
+import functools
+import importlib.util
 import json
 import os
 import re
 import shutil
+import struct
 import sys
-import tempfile
-import zipfile
-from datetime import datetime
-from xml.etree import ElementTree as ET
+import zlib
+from collections import deque
+
+
+def _lazy_import(name: str):
+    """
+    Module that is only loaded on first attribute access.
+
+    Opening the menu and pressing Esc should not pay for the archive and XML
+    machinery; modules needed by a single option are imported inside it.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec   = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+zipfile = _lazy_import("zipfile")
+ET      = _lazy_import("xml.etree.ElementTree")
 
 
 # ── Excel XML namespaces ─────────────────────────────────────────────────────
@@ -40,12 +83,36 @@ NS = {
 }
 
 # ── Regex patterns (shared across options) ───────────────────────────────────
-# Matches any <f ...>...</f> formula element
-FORMULA_RE = re.compile(r"(<f(?:\s[^>]*)?>)(.*?)(</f>)", re.DOTALL)
+# Matches any <f ...>...</f> formula element (not self-closing shared refs)
+FORMULA_RE = re.compile(r"(<f(?:\s[^>]*)?(?<!/)>)(.*?)(</f>)", re.DOTALL)
 # Matches the r= attribute of an enclosing <c> cell element
 CELL_REF_RE = re.compile(r'<c\b[^>]*\br="([A-Z]{1,3}\d+)"')
 # Matches shared formula references (self-closing, no formula text stored)
-SHARED_REF_RE = re.compile(r'<f\s+t="shared"\s+si="\d+"\s*/>')
+SHARED_REF_RE = re.compile(r'<f\b[^>]*\bt="shared"[^>]*/>')
+# Single forward scan over a sheet: a <c r="…"> opening tag, or an <f>
+# element (attrs, text — text is None for self-closing shared refs)
+CELL_OR_FORMULA_RE = re.compile(
+    r'<(?:c\b[^>]*?\br="(([A-Z]{1,3})(\d+))"'
+    r'|f\b([^>]*?)(?:/>|>(.*?)</f>))',
+    re.DOTALL,
+)
+SHARED_SI_RE = re.compile(r'\bsi="(\d+)"')
+# A whole <c> element: (attrs, cell_ref, inner XML or None if self-closing)
+CELL_ELEMENT_RE = re.compile(
+    r'<c\b([^>]*?\br="([A-Z]{1,3}\d+)"[^>]*?)(?:/>|>(.*?)</c>)', re.DOTALL
+)
+# Tokens inside formula text: literals that must not be translated
+# (strings, quoted sheet names, [structured] refs) and relative references
+# (cell, whole-column and whole-row forms)
+FORMULA_TOKEN_RE = re.compile(
+    r'(?P<lit>"(?:[^"]|"")*"|\'(?:[^\']|\'\')*\'|\[[^\]]*\])'
+    r"|(?<![A-Za-z0-9_.$])(?:"
+    r"(?P<c1a>\$?)(?P<c1>[A-Z]{1,3}):(?P<c2a>\$?)(?P<c2>[A-Z]{1,3})"
+    r"|(?P<r1a>\$?)(?P<r1>\d+):(?P<r2a>\$?)(?P<r2>\d+)"
+    r"|(?P<ca>\$?)(?P<col>[A-Z]{1,3})(?P<ra>\$?)(?P<row>\d+)"
+    r")(?![A-Za-z0-9_.(!])"
+)
+MAX_ROW, MAX_COL = 1_048_576, 16_384
 # Matches <f> elements containing external workbook references ([1], [2], …)
 EXTERNAL_FORMULA_RE = re.compile(
     r"<f(?:\s[^>]*)?>(?=[^<]*\[[0-9]+\])[^<]*</f>"
@@ -85,17 +152,45 @@ DEFAULT_ALLOW: dict[str, bool] = {
     for attr, _, inverted in PROTECTION_OPTIONS
 }
 
+# ── Protection hashing (overridable via the "protection" section) ─────────────
+#   algorithm: "legacy" (16-bit XOR) or "sha512" (algorithmName="SHA-512")
+#   spinCount: SHA-512 iterations; Excel itself uses 100000
+#   saltScope: "run" — one salted hash for every sheet in the batch,
+#              "file" — one per workbook, "sheet" — one per sheet
+#   workers:   process pool size for per-file/per-sheet salts (0 = CPU count)
+PROTECTION_HASH_DEFAULTS: dict = {
+    "algorithm": "legacy",
+    "spinCount": 100_000,
+    "saltScope": "run",
+    "workers":   0,
+}
+_PROTECTION_HASH_SETTINGS: dict | None = None
+
+# Below this many SHA-512 iterations in total (about four Excel-strength
+# hashes) starting a process pool costs more than it saves
+_POOL_MIN_SPINS = 400_000
+
+# ── Save behaviour (overridable via the "save" section of excel-tools.json) ──
+FSYNC_POLICIES = ("none", "file", "full")
+SAVE_DEFAULTS: dict = {"backup": False, "fsync": "file"}
+_SAVE_SETTINGS: dict | None = None
+
+# Parts Excel rebuilds on its own; dropping one alone is not worth a rewrite
+DERIVED_PARTS = frozenset({"xl/calcChain.xml"})
+
 
 # ── Terminal UI ───────────────────────────────────────────────────────────────
-# Enable VT/ANSI escape processing on Windows 10+ consoles.
-if sys.platform == "win32":
-    try:
-        import ctypes as _ctypes
-        _ctypes.windll.kernel32.SetConsoleMode(
-            _ctypes.windll.kernel32.GetStdHandle(-11), 7
-        )
-    except Exception:
-        pass
+def _enable_vt_mode() -> None:
+    """Enable VT/ANSI escape processing on Windows 10+ consoles."""
+    if sys.platform == "win32":
+        try:
+            import ctypes as _ctypes
+            _ctypes.windll.kernel32.SetConsoleMode(
+                _ctypes.windll.kernel32.GetStdHandle(-11), 7
+            )
+        except Exception:
+            pass
+
 
 # ANSI colour codes — match PowerShell console ForegroundColor names.
 CYAN   = "\033[96m"
@@ -354,6 +449,108 @@ def _hash_password(password: str) -> str:
     return format(pwd_hash, "04X")
 
 
+def _hash_password_sha512(password: str, salt: bytes,
+                          spin_count: int) -> dict[str, str]:
+    """
+    Hash a password using Excel's modern (ISO/IEC 29500) sheet protection
+    algorithm: SHA-512 over salt + UTF-16LE password, then spin_count
+    rounds of SHA-512 over the previous digest + little-endian round index.
+
+    Returns the <sheetProtection> attributes as a dict. Module-level so it
+    can run in a process pool.
+    """
+    import base64
+    import hashlib
+
+    digest = hashlib.sha512(salt + password.encode("utf-16-le")).digest()
+    for i in range(spin_count):
+        digest = hashlib.sha512(digest + struct.pack("<I", i)).digest()
+    return {
+        "algorithmName": "SHA-512",
+        "hashValue":     base64.b64encode(digest).decode("ascii"),
+        "saltValue":     base64.b64encode(salt).decode("ascii"),
+        "spinCount":     str(spin_count),
+    }
+
+
+def _protection_hash_settings() -> dict:
+    """Return the "protection" section of excel-tools.json merged over defaults."""
+    global _PROTECTION_HASH_SETTINGS
+    if _PROTECTION_HASH_SETTINGS is None:
+        try:
+            configured = _load_config().get("protection", {})
+        except (OSError, ValueError):
+            configured = {}
+        _PROTECTION_HASH_SETTINGS = {**PROTECTION_HASH_DEFAULTS, **configured}
+    return _PROTECTION_HASH_SETTINGS
+
+
+def _describe_protection_hash() -> str:
+    """One-line description of the configured protection hash, for output."""
+    settings = _protection_hash_settings()
+    if settings["algorithm"] != "sha512":
+        return "legacy XOR"
+    return (
+        f"SHA-512, spinCount {settings['spinCount']},"
+        f" salt per {settings['saltScope']}"
+    )
+
+
+def _protection_hashes(password: str, layout: list[int]) -> list[list]:
+    """
+    Compute sheet protection hashes for a batch of workbooks.
+
+    layout[i] is the number of sheets in workbook i; the result mirrors it,
+    result[i][j] being the value to pass to add_protection_to_sheet for
+    sheet j of workbook i ("" when there is no password).
+
+    Legacy hashes are a hex string shared by every sheet. SHA-512 hashes
+    are computed once per run, per file or per sheet depending on
+    saltScope, and reused for every sheet in that scope. When enough
+    distinct hashes are needed they are spread over a process pool; if the
+    pool can't run (a worker that fails to import this script, say), they
+    are computed in-process instead.
+    """
+    if not password:
+        return [[""] * n for n in layout]
+    settings = _protection_hash_settings()
+    if settings["algorithm"] != "sha512":
+        legacy = _hash_password(password)
+        return [[legacy] * n for n in layout]
+
+    spin_count = int(settings["spinCount"])
+    scope      = settings["saltScope"]
+    if scope == "sheet":
+        needed = sum(layout)
+    elif scope == "file":
+        needed = len(layout)
+    else:
+        needed = 1 if layout else 0
+    salts = [os.urandom(16) for _ in range(needed)]
+
+    workers = int(settings["workers"]) or os.cpu_count() or 1
+    hashes  = None
+    if needed > 1 and workers > 1 and needed * spin_count >= _POOL_MIN_SPINS:
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, needed)) as pool:
+                hashes = list(pool.map(
+                    _hash_password_sha512,
+                    [password] * needed, salts, [spin_count] * needed,
+                ))
+        except Exception:
+            hashes = None   # any pool failure: fall back to computing in-process
+    if hashes is None:
+        hashes = [_hash_password_sha512(password, salt, spin_count) for salt in salts]
+
+    if scope == "sheet":
+        it = iter(hashes)
+        return [[next(it) for _ in range(n)] for n in layout]
+    if scope == "file":
+        return [[h] * n for h, n in zip(hashes, layout)]
+    return [[hashes[0]] * n for n in layout]
+
+
 def _xml_escape(text: str) -> str:
     """
     Escape text for use inside XML content (formula text).
@@ -365,6 +562,7 @@ def _xml_escape(text: str) -> str:
 
 def _xml_unescape(text: str) -> str:
     """Unescape XML entities back to plain text for display."""
+    import html
     return html.unescape(text)
 
 
@@ -408,36 +606,309 @@ def _get_sheet_paths(xlsx_path: str) -> dict[str, str]:
     return mapping
 
 
+# ── Shared formula expansion ──────────────────────────────────────────────────
+# Excel stores a filled-down formula once on the group's master cell
+# (<f t="shared" ref="…" si="N">text</f>) and writes every other cell as a
+# bare <f t="shared" si="N"/>. Masters are tokenized once per si; each child
+# is then rendered by applying its row/column offset to the relative refs.
+
+@functools.lru_cache(maxsize=None)
+def _col_to_num(col: str) -> int:
+    """Convert column letters to a 1-based number ("A" → 1, "AA" → 27)."""
+    num = 0
+    for ch in col:
+        num = num * 26 + ord(ch) - 64
+    return num
+
+
+@functools.lru_cache(maxsize=None)
+def _num_to_col(num: int) -> str:
+    """Convert a 1-based column number to letters (27 → "AA")."""
+    letters = ""
+    while num:
+        num, rem = divmod(num - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _split_cell_ref(cell_ref: str) -> tuple[int, int]:
+    """Split "B12" into (row, col) = (12, 2)."""
+    idx = len(cell_ref.rstrip("0123456789"))
+    return int(cell_ref[idx:]), _col_to_num(cell_ref[:idx])
+
+
+def _tokenize_formula(formula_text: str) -> list:
+    """
+    Split formula text into literal strings and translatable references.
+
+    Reference tokens are tuples:
+      ("cell", col_abs, col, row_abs, row)
+      ("cols", abs1, col1, abs2, col2)     — e.g. A:C
+      ("rows", abs1, row1, abs2, row2)     — e.g. 3:7
+    Tokens whose column is past XFD are left as literal text (names).
+    """
+    parts, pos = [], 0
+    for m in FORMULA_TOKEN_RE.finditer(formula_text):
+        if m.group("lit") is not None:
+            continue
+        if m.group("col") is not None:
+            col = _col_to_num(m.group("col"))
+            if col > MAX_COL:
+                continue
+            token = ("cell", bool(m.group("ca")), col,
+                     bool(m.group("ra")), int(m.group("row")))
+        elif m.group("c1") is not None:
+            token = ("cols", bool(m.group("c1a")), _col_to_num(m.group("c1")),
+                     bool(m.group("c2a")), _col_to_num(m.group("c2")))
+        else:
+            token = ("rows", bool(m.group("r1a")), int(m.group("r1")),
+                     bool(m.group("r2a")), int(m.group("r2")))
+        if m.start() > pos:
+            parts.append(formula_text[pos:m.start()])
+        parts.append(token)
+        pos = m.end()
+    if pos < len(formula_text):
+        parts.append(formula_text[pos:])
+    return parts
+
+
+def _translate_formula(parts: list, d_row: int, d_col: int) -> str:
+    """Render tokenized formula parts shifted by (d_row, d_col)."""
+    out = []
+    for part in parts:
+        if isinstance(part, str):
+            out.append(part)
+            continue
+        kind, abs1, v1, abs2, v2 = part
+        if kind == "cell":
+            col = v1 if abs1 else v1 + d_col
+            row = v2 if abs2 else v2 + d_row
+            if not (1 <= col <= MAX_COL and 1 <= row <= MAX_ROW):
+                out.append("#REF!")
+                continue
+            out.append(
+                f"{'$' if abs1 else ''}{_num_to_col(col)}"
+                f"{'$' if abs2 else ''}{row}"
+            )
+        elif kind == "cols":
+            c1 = v1 if abs1 else v1 + d_col
+            c2 = v2 if abs2 else v2 + d_col
+            if not (1 <= c1 <= MAX_COL and 1 <= c2 <= MAX_COL):
+                out.append("#REF!")
+                continue
+            out.append(
+                f"{'$' if abs1 else ''}{_num_to_col(c1)}:"
+                f"{'$' if abs2 else ''}{_num_to_col(c2)}"
+            )
+        else:
+            r1 = v1 if abs1 else v1 + d_row
+            r2 = v2 if abs2 else v2 + d_row
+            if not (1 <= r1 <= MAX_ROW and 1 <= r2 <= MAX_ROW):
+                out.append("#REF!")
+                continue
+            out.append(f"{'$' if abs1 else ''}{r1}:{'$' if abs2 else ''}{r2}")
+    return "".join(out)
+
+
+def _iter_sheet_formulas(sheet_xml: str, cells: tuple | None = None):
+    """
+    Yield (cell_ref, kind, si, open_tag, formula_xml, formula_text) for
+    every formula cell, or only those inside cells ((r1, c1, r2, c2), see
+    _parse_cell_range). Cells outside the range are dropped before their
+    text is unescaped or translated; only shared masters are still read,
+    because children inside the range are translated from them.
+
+    kind is "normal", "array", "shared" (group master) or "shared-ref"
+    (child whose text is translated from its master). si is the shared
+    group index, or None. open_tag is the raw <f …> tag and formula_xml the
+    raw element text as stored (None for shared-ref children).
+
+    One forward scan handles cell tracking; each master is tokenized once
+    and children only pay for an offset application. Children that appear
+    before their master (not written by Excel, but legal) are resolved at
+    the end of the sheet.
+    """
+    masters: dict[str, tuple[int, int, list]] = {}
+    pending  = []
+    cell_ref = "?"
+    cell_m   = None
+    for m in CELL_OR_FORMULA_RE.finditer(sheet_xml):
+        if m.group(1) is not None:
+            cell_m   = m
+            cell_ref = m.group(1)
+            continue
+        attrs    = m.group(4)
+        raw      = m.group(5)
+        shared   = 't="shared"' in attrs
+        si_m     = SHARED_SI_RE.search(attrs) if shared else None
+        si       = si_m.group(1) if si_m else None
+        in_range = cells is None or (
+            cell_m is not None
+            and cells[0] <= int(cell_m.group(3)) <= cells[2]
+            and cells[1] <= _col_to_num(cell_m.group(2)) <= cells[3]
+        )
+        if not in_range and not (shared and si is not None and raw):
+            continue
+        open_tag = f"<f{attrs}/>" if raw is None else f"<f{attrs}>"
+        if not raw:
+            text = ""
+        elif "&" in raw:
+            text = _xml_unescape(raw)
+        else:
+            text = raw
+
+        if shared and si is not None and not text:
+            master = masters.get(si)
+            if master is None or cell_m is None:
+                pending.append((cell_ref, si, open_tag))
+                continue
+            d_row = int(cell_m.group(3)) - master[0]
+            d_col = _col_to_num(cell_m.group(2)) - master[1]
+            yield (cell_ref, "shared-ref", si, open_tag, None,
+                   _translate_formula(master[2], d_row, d_col))
+        elif shared and si is not None:
+            if cell_m is not None:
+                masters[si] = (int(cell_m.group(3)), _col_to_num(cell_m.group(2)),
+                               _tokenize_formula(text))
+            if in_range:
+                yield cell_ref, "shared", si, open_tag, raw, text
+        elif 't="array"' in attrs:
+            yield cell_ref, "array", None, open_tag, raw, text
+        else:
+            yield cell_ref, "normal", None, open_tag, raw, text
+
+    for cell_ref, si, open_tag in pending:
+        master = masters.get(si)
+        if master is None or cell_ref == "?":
+            yield cell_ref, "shared-ref", si, open_tag, None, ""
+            continue
+        row, col = _split_cell_ref(cell_ref)
+        yield (cell_ref, "shared-ref", si, open_tag, None,
+               _translate_formula(master[2], row - master[0], col - master[1]))
+
+
+def _save_settings() -> dict:
+    """
+    Return the "save" section of excel-tools.json merged over the defaults.
+
+      backup: keep the original workbook as "<name>.bak" next to it
+      fsync:  "none" — no flush; "file" — fsync the staged archive before
+              the replace (default); "full" — also fsync the directory so
+              the rename itself is durable (POSIX only)
+    """
+    global _SAVE_SETTINGS
+    if _SAVE_SETTINGS is None:
+        try:
+            configured = _load_config().get("save", {})
+        except (OSError, ValueError):
+            configured = {}
+        _SAVE_SETTINGS = {**SAVE_DEFAULTS, **configured}
+        if _SAVE_SETTINGS["fsync"] not in FSYNC_POLICIES:
+            _SAVE_SETTINGS["fsync"] = SAVE_DEFAULTS["fsync"]
+    return _SAVE_SETTINGS
+
+
+def _fsync_directory(dir_path: str) -> None:
+    """Flush a directory entry to disk (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
 def _modify_xlsx(xlsx_path: str, modifications: dict,
-                 exclude: set[str] | None = None):
+                 exclude: set[str] | None = None,
+                 backup: bool | None = None, fsync: str | None = None) -> bool:
     """
     Modify specific XML files inside an xlsx archive in-place.
 
     modifications: dict mapping internal zip paths to callables.
-        Each callable receives raw XML bytes and returns modified XML bytes.
+        Each callable receives raw XML bytes and returns modified XML bytes,
+        or None to report that it has nothing to change.
     exclude: optional set of zip path prefixes to omit from the output.
         Example: {"xl/externalLinks/"} removes all files under that path.
+    backup: keep the original as "<name>.bak" (default from excel-tools.json).
+    fsync:  "none" | "file" | "full" (default from excel-tools.json).
+
+    Transformers run before anything is written. If none of them changes
+    its part (None or identical bytes) and no archive entry other than a
+    DERIVED_PARTS cache matches an exclude prefix, the workbook is left
+    untouched — mtime included — and False is returned. Otherwise the
+    workbook is rewritten and True returned.
+
+    The new archive is staged in the workbook's own directory and committed
+    with os.replace, so a save is a same-volume rename (no cross-device copy
+    on synced shares) and a crash leaves either the old or the new file.
     """
-    tmp_fd, tmp_path = tempfile.mkstemp(suffix=".xlsx")
-    os.close(tmp_fd)
-    exclude = exclude or set()
+    exclude  = exclude or set()
+    changed  = {}
+    excluded = False
+    with zipfile.ZipFile(xlsx_path, "r") as zf_in:
+        for item in zf_in.infolist():
+            if any(item.filename.startswith(p) for p in exclude):
+                excluded = excluded or item.filename not in DERIVED_PARTS
+                continue
+            if item.filename in modifications:
+                original = zf_in.read(item.filename)
+                data = modifications[item.filename](original)
+                if data is not None and data != original:
+                    changed[item.filename] = data
+    if not changed and not excluded:
+        return False
+
+    settings = _save_settings()
+    backup   = settings["backup"] if backup is None else backup
+    fsync    = settings["fsync"] if fsync is None else fsync
+
+    xlsx_path  = os.path.abspath(xlsx_path)
+    target_dir = os.path.dirname(xlsx_path)
+    import tempfile
+    tmp_fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(xlsx_path)}.", suffix=".tmp", dir=target_dir
+    )
 
     try:
-        with zipfile.ZipFile(xlsx_path, "r") as zf_in:
-            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zf_out:
-                for item in zf_in.infolist():
-                    if any(item.filename.startswith(p) for p in exclude):
-                        continue
-                    data = zf_in.read(item.filename)
-                    if item.filename in modifications:
-                        data = modifications[item.filename](data)
-                    # Preserve original ZipInfo (compression level, timestamps)
-                    zf_out.writestr(item, data)
-        shutil.move(tmp_path, xlsx_path)
-    except Exception:
+        with os.fdopen(tmp_fd, "wb") as tmp_file:
+            with zipfile.ZipFile(xlsx_path, "r") as zf_in:
+                with zipfile.ZipFile(tmp_file, "w", zipfile.ZIP_DEFLATED) as zf_out:
+                    for item in zf_in.infolist():
+                        if any(item.filename.startswith(p) for p in exclude):
+                            continue
+                        data = changed.get(item.filename)
+                        if data is None:
+                            data = zf_in.read(item.filename)
+                        # Preserve original ZipInfo (compression level, timestamps)
+                        zf_out.writestr(item, data)
+            if fsync != "none":
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+
+        # mkstemp creates owner-only files; keep the workbook's permissions
+        shutil.copymode(xlsx_path, tmp_path)
+
+        if backup:
+            backup_path = xlsx_path + ".bak"
+            if os.path.exists(backup_path):
+                os.unlink(backup_path)
+            try:
+                os.link(xlsx_path, backup_path)     # O(1) where supported
+            except OSError:
+                shutil.copy2(xlsx_path, backup_path)
+
+        os.replace(tmp_path, xlsx_path)
+        if fsync == "full":
+            _fsync_directory(target_dir)
+    except BaseException:
         if os.path.exists(tmp_path):
             os.unlink(tmp_path)
         raise
+    return True
 
 
 def browse_files(count: int | None = None) -> list[str]:
@@ -507,6 +978,7 @@ def _select_or_reuse_files(current_files: list[str]) -> list[str]:
 
 def _prompt_password() -> str:
     """Prompt for a sheet protection password (hidden input)."""
+    import getpass
     return getpass.getpass(
         f"  {YELLOW}Sheet protection password{RESET} {GRAY}(blank if none):{RESET} "
     )
@@ -549,11 +1021,14 @@ def _prompt_protection_settings(sheet_name: str) -> dict[str, bool]:
     return {attr: result[i] for i, (attr, _, _) in enumerate(PROTECTION_OPTIONS)}
 
 
-def add_protection_to_sheet(sheet_xml_bytes: bytes, pwd_hash: str,
+def add_protection_to_sheet(sheet_xml_bytes: bytes, pwd_hash: str | dict,
                              allow: dict[str, bool] | None = None) -> bytes:
     """
     Add (or replace) a <sheetProtection> element in a sheet XML.
 
+    pwd_hash: legacy hex hash (password="…"), a dict of SHA-512 attributes
+              from _hash_password_sha512, or "" for no password.
+
     allow: optional dict mapping XML attribute names to bool (True = user is
            allowed that action). When None, Excel's default dialog state is
            used — only 'Select locked/unlocked cells' are permitted, matching
@@ -567,7 +1042,9 @@ def add_protection_to_sheet(sheet_xml_bytes: bytes, pwd_hash: str,
         content = re.sub(r"<[^<]*sheetProtection[^>]*/\s*>", "", content)
 
     parts = ['sheet="1"']
-    if pwd_hash:
+    if isinstance(pwd_hash, dict):
+        parts.extend(f'{attr}="{value}"' for attr, value in pwd_hash.items())
+    elif pwd_hash:
         parts.append(f'password="{pwd_hash}"')
 
     if allow is not None:
@@ -652,17 +1129,19 @@ def unprotect_and_unhide(files: list[str], password: str):
         if hidden_sheets:
             def _unhide(xml_bytes):
                 content = xml_bytes.decode("utf-8")
-                content = re.sub(
+                content, n = re.subn(
                     r'(<sheet\b[^>]*?)\s+state="(?:hidden|veryHidden)"',
                     r"\1", content,
                 )
-                return content.encode("utf-8")
+                return content.encode("utf-8") if n else None
             modifications["xl/workbook.xml"] = _unhide
 
         if changes_made:
             try:
-                _modify_xlsx(filepath, modifications)
-                print(f"  {GREEN}Saved:{RESET} {filepath}")
+                if _modify_xlsx(filepath, modifications):
+                    print(f"  {GREEN}Saved:{RESET} {filepath}")
+                else:
+                    print(f"  {GRAY}Already up to date, not rewritten.{RESET}")
             except Exception as e:
                 print(f"  {RED}ERROR saving:{RESET} {e}")
         else:
@@ -776,24 +1255,38 @@ def reprotect_and_rehide(files: list[str], password: str):
         )
     # ─────────────────────────────────────────────────────────────────────
 
-    pwd_hash = _hash_password(password) if password else ""
-
+    # Read every workbook's sheet list first so protection hashes can be
+    # computed in one batch (SHA-512 hashing is deliberately expensive)
+    workbooks = []
     for filepath in files:
-        print(f"\n{CYAN}Restoring:{RESET} {filepath}")
-        if not os.path.isfile(filepath):
-            print(f"  {RED}ERROR:{RESET} File not found, skipping.")
-            continue
-
         try:
             file_sheets     = _get_workbook_info(filepath)
             sheet_paths_map = _get_sheet_paths(filepath)
         except Exception as e:
-            print(f"  {RED}ERROR{RESET} reading workbook: {e}")
+            workbooks.append((filepath, None, None, e))
+            continue
+        workbooks.append((filepath, file_sheets, sheet_paths_map, None))
+
+    if password:
+        print(f"\n  {GRAY}Protection hash: {_describe_protection_hash()}{RESET}")
+    hash_plan = _protection_hashes(
+        password, [len(w[1]) if w[1] else 0 for w in workbooks]
+    )
+
+    for (filepath, file_sheets, sheet_paths_map, error), file_hashes in zip(
+        workbooks, hash_plan
+    ):
+        print(f"\n{CYAN}Restoring:{RESET} {filepath}")
+        if not os.path.isfile(filepath):
+            print(f"  {RED}ERROR:{RESET} File not found, skipping.")
+            continue
+        if error is not None:
+            print(f"  {RED}ERROR{RESET} reading workbook: {error}")
             continue
 
         modifications = {}
 
-        for sheet in file_sheets:
+        for sheet, pwd_hash in zip(file_sheets, file_hashes):
             xml_path = sheet_paths_map.get(sheet["rId"], "")
             if not xml_path:
                 continue
@@ -841,8 +1334,10 @@ def reprotect_and_rehide(files: list[str], password: str):
 
         if modifications:
             try:
-                _modify_xlsx(filepath, modifications)
-                print(f"  {GREEN}Saved:{RESET} {filepath}")
+                if _modify_xlsx(filepath, modifications):
+                    print(f"  {GREEN}Saved:{RESET} {filepath}")
+                else:
+                    print(f"  {GRAY}Already up to date, not rewritten.{RESET}")
             except Exception as e:
                 print(f"  {RED}ERROR saving:{RESET} {e}")
 
@@ -959,7 +1454,9 @@ def strip_external_links(files: list[str]):
         exclude = {"xl/externalLinks/", "xl/calcChain.xml"}
 
         try:
-            _modify_xlsx(filepath, modifications, exclude=exclude)
+            if not _modify_xlsx(filepath, modifications, exclude=exclude):
+                print(f"  {GRAY}Already clean, not rewritten.{RESET}")
+                continue
             if total_removed:
                 print(
                     f"  {GREEN}Converted{RESET}"
@@ -975,6 +1472,136 @@ def strip_external_links(files: list[str]):
 # ║  OPTION 4 — FIND & REPLACE IN FORMULAS                                   ║
 # ╚══════════════════════════════════════════════════════════════════════════╝
 
+def _iter_formula_cells(sheet_xml: str):
+    """
+    Yield (cell_ref, formula_match) for every <f> element in a sheet.
+
+    Cell references are tracked with a single forward scan instead of
+    re-searching the text before every formula.
+    """
+    cells    = CELL_REF_RE.finditer(sheet_xml)
+    cell     = next(cells, None)
+    cell_ref = "?"
+    for f_match in FORMULA_RE.finditer(sheet_xml):
+        while cell is not None and cell.start() < f_match.start():
+            cell_ref = cell.group(1)
+            cell     = next(cells, None)
+        yield cell_ref, f_match
+
+
+def _plan_formula_edits(filepath: str, rewrite) -> tuple[dict, list]:
+    """
+    Read every sheet of a workbook once and plan formula rewrites.
+
+    rewrite: callable taking unescaped formula text and returning the new
+        text, or None when the formula is not a match.
+
+    Returns (plan, preview):
+      plan:    {xml_path: (crc32, sheet_xml, [(start, end, open_tag, close_tag,
+                cell_ref, new_text), …])} — exact spans of each <f> element
+      preview: [(sheet_name, cell_ref, old_text, new_text), …]
+
+    The CRC of each sheet part lets _apply_formula_plan detect a workbook
+    that changed between preview and apply.
+    """
+    sheets_info = _get_workbook_info(filepath)
+    sheet_paths = _get_sheet_paths(filepath)
+    plan, preview = {}, []
+    with zipfile.ZipFile(filepath, "r") as zf:
+        for sheet in sheets_info:
+            xml_path = sheet_paths.get(sheet["rId"], "")
+            if not xml_path:
+                continue
+            try:
+                raw       = zf.read(xml_path)
+                sheet_xml = raw.decode("utf-8")
+            except Exception:
+                continue    # missing or undecodable sheet part: skip just this sheet
+
+            edits = []
+            for cell_ref, f_match in _iter_formula_cells(sheet_xml):
+                formula_text = _xml_unescape(f_match.group(2))
+                new_text     = rewrite(formula_text)
+                if new_text is None:
+                    continue
+                edits.append((
+                    f_match.start(), f_match.end(), f_match.group(1),
+                    f_match.group(3), cell_ref, new_text,
+                ))
+                preview.append((sheet["name"], cell_ref, formula_text, new_text))
+            if edits:
+                plan[xml_path] = (zlib.crc32(raw), sheet_xml, edits)
+    return plan, preview
+
+
+def _apply_formula_plan(filepath: str, plan: dict, force_array: bool) -> int:
+    """
+    Write a plan from _plan_formula_edits back to the workbook in one save.
+
+    Splices the planned spans directly — no sheet is re-parsed. Raises
+    RuntimeError if a sheet's bytes no longer match the CRC recorded during
+    preview (the workbook was edited in between); the file is then left as
+    it was. Returns the number of formulas rewritten — 0 when the save
+    found nothing to change and left the file untouched.
+    """
+    def _make_splice(crc, sheet_xml, edits):
+        def _splice(xml_bytes):
+            if zlib.crc32(xml_bytes) != crc:
+                raise RuntimeError("workbook changed since preview; re-run")
+            parts, pos = [], 0
+            for start, end, open_tag, close_tag, cell_ref, new_text in edits:
+                if force_array and 't="array"' not in open_tag and cell_ref != "?":
+                    open_tag = f'<f t="array" ref="{cell_ref}">'
+                parts.append(sheet_xml[pos:start])
+                parts.append(open_tag + _xml_escape(new_text) + close_tag)
+                pos = end
+            parts.append(sheet_xml[pos:])
+            return "".join(parts).encode("utf-8")
+        return _splice
+
+    modifications = {
+        xml_path: _make_splice(*entry) for xml_path, entry in plan.items()
+    }
+    if not _modify_xlsx(filepath, modifications, exclude={"xl/calcChain.xml"}):
+        return 0
+    return sum(len(entry[2]) for entry in plan.values())
+
+
+def _print_formula_preview(rows: list[tuple], max_preview: int = 50) -> None:
+    """Print (filepath, sheet, cell, old, new) rows grouped by workbook."""
+    current_file = None
+    for filepath, sheet_name, cell_ref, old, new in rows[:max_preview]:
+        if filepath != current_file:
+            current_file = filepath
+            print(f"  {WHITE}{os.path.basename(filepath)}:{RESET}")
+        print(f"    {sheet_name}!{cell_ref}: ={old}")
+        print(f"      {GREEN}->{RESET} ={new}")
+    if len(rows) > max_preview:
+        print(f"    {GRAY}… and {len(rows) - max_preview} more{RESET}")
+
+
+def _apply_formula_plans(plans: dict[str, dict], force_array: bool) -> None:
+    """Apply per-workbook plans and report the result for each file."""
+    for filepath, plan in plans.items():
+        try:
+            count = _apply_formula_plan(filepath, plan, force_array)
+            if not count:
+                print(
+                    f"  {GRAY}{os.path.basename(filepath)}:"
+                    f" nothing changed, not rewritten.{RESET}"
+                )
+                continue
+            print(
+                f"  {GREEN}{os.path.basename(filepath)}:{RESET}"
+                f" replaced {count} formula(s)"
+            )
+        except Exception as e:
+            print(
+                f"  {RED}ERROR saving{RESET}"
+                f" {os.path.basename(filepath)}: {e}"
+            )
+
+
 def find_replace_formulas(files: list[str]):
     """
     Find and replace text within formulas across all sheets.
@@ -982,6 +1609,8 @@ def find_replace_formulas(files: list[str]):
     everything else are untouched.
 
     Handles XML entity encoding; shows a preview before applying changes.
+    The preview pass records the exact span of every matching formula and
+    the apply pass splices those spans without re-reading the sheets.
     """
     print(f"\n  {GRAY}NOTE: Enter formulas as they appear in Excel (without leading '=').{RESET}")
     print(f"  {GRAY}Example: to change =SUM(A1:A10) to =SUM(B1:B10),{RESET}")
@@ -1008,36 +1637,23 @@ def find_replace_formulas(files: list[str]):
     search_lower   = search_str.lower()
     search_pattern = re.compile(re.escape(search_str), re.IGNORECASE)
 
-    # First pass: preview matches
+    def _rewrite(formula_text):
+        if search_lower not in formula_text.lower():
+            return None
+        return search_pattern.sub(lambda _: replace_str, formula_text)
+
+    # Preview pass: one read per workbook, producing the match plan
+    plans: dict[str, dict] = {}
     all_matches = []
     for filepath in files:
         try:
-            sheets_info = _get_workbook_info(filepath)
-            sheet_paths = _get_sheet_paths(filepath)
+            plan, preview = _plan_formula_edits(filepath, _rewrite)
         except Exception as e:
             print(f"  {RED}ERROR{RESET} reading {os.path.basename(filepath)}: {e}")
             continue
-
-        for sheet in sheets_info:
-            xml_path = sheet_paths.get(sheet["rId"], "")
-            if not xml_path:
-                continue
-            try:
-                with zipfile.ZipFile(filepath, "r") as zf:
-                    sheet_xml = zf.read(xml_path).decode("utf-8")
-            except Exception:
-                continue
-
-            for f_match in FORMULA_RE.finditer(sheet_xml):
-                formula_text = _xml_unescape(f_match.group(2))
-                if search_lower not in formula_text.lower():
-                    continue
-                preceding = sheet_xml[: f_match.start()]
-                cell_ref  = "?"
-                c_matches = list(CELL_REF_RE.finditer(preceding))
-                if c_matches:
-                    cell_ref = c_matches[-1].group(1)
-                all_matches.append((filepath, sheet["name"], cell_ref, formula_text))
+        if plan:
+            plans[filepath] = plan
+            all_matches.extend((filepath, *row) for row in preview)
 
     if not all_matches:
         print(f"\n  {YELLOW}No formulas containing '{search_str}' found.{RESET}")
@@ -1047,18 +1663,7 @@ def find_replace_formulas(files: list[str]):
         f"\n  {CYAN}Found {len(all_matches)} formula(s)"
         f" containing '{search_str}':{RESET}\n"
     )
-    current_file = None
-    max_preview  = 50
-    for i, (filepath, sheet_name, cell_ref, formula_text) in enumerate(all_matches):
-        if filepath != current_file:
-            current_file = filepath
-            print(f"  {WHITE}{os.path.basename(filepath)}:{RESET}")
-        if i < max_preview:
-            new_display = search_pattern.sub(lambda _: replace_str, formula_text)
-            print(f"    {sheet_name}!{cell_ref}: ={formula_text}")
-            print(f"      {GREEN}->{RESET} ={new_display}")
-    if len(all_matches) > max_preview:
-        print(f"    {GRAY}… and {len(all_matches) - max_preview} more{RESET}")
+    _print_formula_preview(all_matches)
 
     print(f"\n  {GRAY}Mark replaced formulas as array formulas (Ctrl+Shift+Enter)?{RESET}")
     print(f"  {GRAY}Required for formulas using array math like (range=val)*(range=val).{RESET}")
@@ -1075,131 +1680,202 @@ def find_replace_formulas(files: list[str]):
         print(f"  {GRAY}Cancelled.{RESET}")
         return
 
-    # Second pass: apply replacements
-    for filepath in files:
-        try:
-            sheets_info = _get_workbook_info(filepath)
-            sheet_paths = _get_sheet_paths(filepath)
-        except Exception:
-            continue
+    # Apply pass: execute the plan directly
+    _apply_formula_plans(plans, force_array)
 
-        modifications = {}
-        file_count    = 0
 
-        for sheet in sheets_info:
-            xml_path = sheet_paths.get(sheet["rId"], "")
-            if not xml_path:
-                continue
-            try:
-                with zipfile.ZipFile(filepath, "r") as zf:
-                    sheet_xml = zf.read(xml_path).decode("utf-8")
-            except Exception:
-                continue
+# ╔══════════════════════════════════════════════════════════════════════════╗
+# ║  OPTION 5 — DUMP ALL FORMULAS (DEBUG)                                    ║
+# ╚══════════════════════════════════════════════════════════════════════════╝
 
-            sheet_matches = sum(
-                1 for f_match in FORMULA_RE.finditer(sheet_xml)
-                if search_lower in _xml_unescape(f_match.group(2)).lower()
-            )
-            if sheet_matches == 0:
-                continue
+# Characters that are invisible or look like ordinary spaces in Excel's
+# formula bar: C0/C1 controls, NBSP, soft hyphen, zero-width and BOM
+HIDDEN_CHAR_RE = re.compile(
+    "[\x00-\x1f\x7f-\x9f\u00a0\u00ad\u200b-\u200f\u2028-\u202f\u2060\ufeff]"
+)
+DUMP_FIELDS = ("file", "sheet", "cell", "kind", "tag", "raw", "text")
 
-            def _make_replace(pat=search_pattern, repl=replace_str,
-                              arr=force_array, sxml=sheet_xml):
-                def _do_replace(xml_bytes):
-                    content = xml_bytes.decode("utf-8")
-
-                    def _replace_in_formula(m):
-                        open_tag     = m.group(1)
-                        formula_xml  = m.group(2)
-                        close_tag    = m.group(3)
-                        formula_text = _xml_unescape(formula_xml)
-                        if search_lower not in formula_text.lower():
-                            return m.group(0)
-                        new_text = pat.sub(lambda _: repl, formula_text)
-                        new_xml  = _xml_escape(new_text)
-                        if arr and 't="array"' not in open_tag:
-                            pos = content.find(m.group(0))
-                            preceding = content[:pos] if pos >= 0 else ""
-                            c_m = list(CELL_REF_RE.finditer(preceding))
-                            if c_m:
-                                cell_ref = c_m[-1].group(1)
-                                open_tag = f'<f t="array" ref="{cell_ref}">'
-                        return open_tag + new_xml + close_tag
-
-                    content = FORMULA_RE.sub(_replace_in_formula, content)
-                    return content.encode("utf-8")
-                return _do_replace
-
-            modifications[xml_path] = _make_replace()
-            file_count += sheet_matches
 
-        if modifications:
-            try:
-                _modify_xlsx(filepath, modifications, exclude={"xl/calcChain.xml"})
-                print(
-                    f"  {GREEN}{os.path.basename(filepath)}:{RESET}"
-                    f" replaced {file_count} formula(s)"
-                )
-            except Exception as e:
-                print(
-                    f"  {RED}ERROR saving{RESET}"
-                    f" {os.path.basename(filepath)}: {e}"
-                )
+def _parse_cell_range(cells_raw: str) -> tuple[int, int, int, int] | None:
+    """
+    "A1:F200" (or a single "B7") as (r1, c1, r2, c2); None for "".
+    Raises ValueError for anything else.
+    """
+    if not cells_raw:
+        return None
+    first, _, last = cells_raw.upper().replace("$", "").partition(":")
+    if not re.fullmatch(r"[A-Z]{1,3}\d+", first) or (
+        last and not re.fullmatch(r"[A-Z]{1,3}\d+", last)
+    ):
+        raise ValueError(f"Invalid cell range '{cells_raw}'")
+    r1, c1 = _split_cell_ref(first)
+    r2, c2 = _split_cell_ref(last) if last else (r1, c1)
+    return (min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2))
+
+
+def _prompt_dump_options() -> dict | None:
+    """
+    Ask for dump destination and filters. Returns None on invalid input.
 
+    Keys: output (path or ""), sheet (glob or ""), cells ((r1, c1, r2, c2)
+    or None), pattern (compiled regex or None), hidden_only (bool).
+    """
+    print(f"\n  {GRAY}Leave blank to accept the default shown in brackets.{RESET}")
+    output = input(
+        f"  {YELLOW}Export to file (.tsv / .ndjson){RESET} {GRAY}[terminal]:{RESET} "
+    ).strip().strip('"')
+    if output and not output.lower().endswith((".tsv", ".ndjson", ".jsonl")):
+        print(f"  {RED}ERROR:{RESET} Export file must end in .tsv or .ndjson.")
+        return None
 
-# ╔══════════════════════════════════════════════════════════════════════════╗
-# ║  OPTION 5 — DUMP ALL FORMULAS (DEBUG)                                    ║
-# ╚══════════════════════════════════════════════════════════════════════════╝
+    sheet = input(f"  {YELLOW}Sheet name filter (glob){RESET} {GRAY}[all]:{RESET} ").strip()
 
-def dump_formulas(files: list[str]):
+    cells_raw = input(f"  {YELLOW}Cell range (e.g. A1:F200){RESET} {GRAY}[all]:{RESET} ").strip()
+    try:
+        cells = _parse_cell_range(cells_raw)
+    except ValueError:
+        print(f"  {RED}ERROR:{RESET} Invalid cell range '{cells_raw}'.")
+        return None
+
+    pattern     = None
+    pattern_raw = input(f"  {YELLOW}Formula regex{RESET} {GRAY}[none]:{RESET} ").strip()
+    if pattern_raw:
+        try:
+            pattern = re.compile(pattern_raw, re.IGNORECASE)
+        except re.error as e:
+            print(f"  {RED}ERROR:{RESET} Invalid regex: {e}")
+            return None
+
+    hidden_only = (
+        input(
+            f"  {YELLOW}Only formulas with hidden characters?{RESET}"
+            f" {GRAY}(y/N):{RESET} "
+        ).strip().upper() == "Y"
+    )
+    return {
+        "output": output, "sheet": sheet, "cells": cells,
+        "pattern": pattern, "hidden_only": hidden_only,
+    }
+
+
+def _iter_formula_dump(files: list[str], options: dict):
     """
-    Dump raw formula XML from the first selected file, showing decoded text
-    and Python repr to expose hidden/invisible characters.
+    Yield one record dict (DUMP_FIELDS) per formula across all files,
+    applying the filters during the scan: the sheet filter skips whole
+    sheets before they are read, and the cell range is passed down to
+    _iter_sheet_formulas so out-of-range formulas are never unescaped or
+    translated. Unreadable workbooks are reported and skipped.
     """
-    for filepath in files[:1]:
-        print(f"\n  {CYAN}File:{RESET} {os.path.basename(filepath)}")
+    sheet_glob = options["sheet"].lower()
+    cells      = options["cells"]
+    pattern    = options["pattern"]
+    hidden     = options["hidden_only"]
+
+    for filepath in files:
         try:
             sheets_info = _get_workbook_info(filepath)
             sheet_paths = _get_sheet_paths(filepath)
+            zf = zipfile.ZipFile(filepath, "r")
         except Exception as e:
-            print(f"  {RED}ERROR:{RESET} {e}")
-            return
-
-        for sheet in sheets_info:
-            xml_path = sheet_paths.get(sheet["rId"], "")
-            if not xml_path:
-                continue
-            try:
-                with zipfile.ZipFile(filepath, "r") as zf:
+            print(f"  {RED}ERROR{RESET} reading {os.path.basename(filepath)}: {e}")
+            continue
+        with zf:
+            for sheet in sheets_info:
+                xml_path = sheet_paths.get(sheet["rId"], "")
+                if not xml_path:
+                    continue
+                if sheet_glob and not fnmatch.fnmatchcase(sheet["name"].lower(), sheet_glob):
+                    continue
+                try:
                     sheet_xml = zf.read(xml_path).decode("utf-8")
-            except Exception:
-                continue
+                except Exception:
+                    continue
 
-            formulas = list(FORMULA_RE.finditer(sheet_xml))
-            if not formulas:
-                continue
+                for cell_ref, kind, _, open_tag, raw, text in _iter_sheet_formulas(sheet_xml, cells):
+                    if pattern is not None and not pattern.search(text):
+                        continue
+                    if hidden and not HIDDEN_CHAR_RE.search(text):
+                        continue
+                    yield {
+                        "file": filepath, "sheet": sheet["name"], "cell": cell_ref,
+                        "kind": kind, "tag": open_tag, "raw": raw, "text": text,
+                    }
 
-            print(
-                f"\n  {CYAN}--- {sheet['name']}"
-                f" ({len(formulas)} formulas) ---{RESET}"
-            )
-            for f_match in formulas:
-                open_tag    = f_match.group(1)
-                formula_xml = f_match.group(2)
 
-                preceding = sheet_xml[: f_match.start()]
-                cell_ref  = "?"
-                c_matches = list(CELL_REF_RE.finditer(preceding))
-                if c_matches:
-                    cell_ref = c_matches[-1].group(1)
+def _export_formula_dump(records, output_path: str) -> int:
+    """
+    Stream dump records to a TSV or NDJSON file with a large write buffer.
+    Returns the number of records written.
+    """
+    count = 0
+    with open(output_path, "w", encoding="utf-8", newline="",
+              buffering=1 << 20) as fh:
+        if output_path.lower().endswith(".tsv"):
+            import csv
+            writer = csv.writer(fh, delimiter="\t", lineterminator="\n")
+            writer.writerow(DUMP_FIELDS)
+            for record in records:
+                writer.writerow(
+                    "" if record[f] is None else record[f] for f in DUMP_FIELDS
+                )
+                count += 1
+        else:
+            for record in records:
+                fh.write(json.dumps(record, ensure_ascii=False))
+                fh.write("\n")
+                count += 1
+    return count
 
-                display  = _xml_unescape(formula_xml)
-                tag_info = f" {open_tag}" if open_tag != "<f>" else ""
-                print(f"    {YELLOW}{cell_ref}{tag_info}:{RESET}")
-                print(f"      {GRAY}raw:{RESET}  {formula_xml}")
-                if display != formula_xml:
-                    print(f"      {GRAY}text:{RESET} {display}")
-                print(f"      {GRAY}repr:{RESET} {repr(formula_xml)}")
+
+def dump_formulas(files: list[str]):
+    """
+    Dump formulas from all selected files, either to the terminal (raw XML,
+    decoded text and Python repr to expose hidden/invisible characters) or
+    streamed to a TSV / NDJSON file. Optional filters: sheet name glob,
+    cell range, regex on the formula text, hidden characters only.
+    """
+    options = _prompt_dump_options()
+    if options is None:
+        return
+    records = _iter_formula_dump(files, options)
+
+    if options["output"]:
+        try:
+            count = _export_formula_dump(records, options["output"])
+        except OSError as e:
+            print(f"  {RED}ERROR{RESET} writing {options['output']}: {e}")
+            return
+        print(f"\n  {GREEN}Exported {count} formula(s) to:{RESET} {options['output']}")
+        return
+
+    current     = (None, None)
+    count       = 0
+    sheet_count = 0
+    for record in records:
+        if (record["file"], record["sheet"]) != current:
+            # Records are streamed, so each sheet's total follows its formulas
+            if sheet_count:
+                print(f"  {GRAY}({sheet_count} formulas){RESET}")
+            if record["file"] != current[0]:
+                print(f"\n  {CYAN}File:{RESET} {os.path.basename(record['file'])}")
+            print(f"\n  {CYAN}--- {record['sheet']} ---{RESET}")
+            current     = (record["file"], record["sheet"])
+            sheet_count = 0
+        count       += 1
+        sheet_count += 1
+
+        tag_info = f" {record['tag']}" if record["tag"] != "<f>" else ""
+        print(f"    {YELLOW}{record['cell']}{tag_info}:{RESET}")
+        if record["kind"] == "shared-ref":
+            print(f"      {GRAY}expanded:{RESET} {record['text']}")
+            continue
+        print(f"      {GRAY}raw:{RESET}  {record['raw']}")
+        if record["text"] != record["raw"]:
+            print(f"      {GRAY}text:{RESET} {record['text']}")
+        print(f"      {GRAY}repr:{RESET} {repr(record['raw'])}")
+    if sheet_count:
+        print(f"  {GRAY}({sheet_count} formulas){RESET}")
+    print(f"\n  {GRAY}{count} formula(s) shown.{RESET}")
 
 
 # ╔══════════════════════════════════════════════════════════════════════════╗
@@ -1211,47 +1887,23 @@ def _extract_formulas(xlsx_path: str, sheet_xml_path: str) -> dict[str, str]:
     Extract all formulas from a single sheet XML.
 
     Returns dict mapping cell reference → formula text (decoded/unescaped).
-    Shared formulas are resolved: cells referencing a shared formula master
-    get the master formula stored (Excel recalculates them from the master
-    so the individual cells don't store their own formula text).
+    Shared formulas are expanded: each child cell gets its master's formula
+    translated to the child's position, tagged "[shared-ref:si=N]", so
+    filled-down columns compare cell by cell.
     """
     with zipfile.ZipFile(xlsx_path, "r") as zf:
         sheet_xml = zf.read(sheet_xml_path).decode("utf-8")
 
     formulas = {}
-
-    # First pass: collect explicit formulas (non-empty <f>…</f>)
-    for fm in FORMULA_RE.finditer(sheet_xml):
-        open_tag     = fm.group(1)
-        formula_xml  = fm.group(2)
-        formula_text = _xml_unescape(formula_xml)
-
-        preceding = sheet_xml[: fm.start()]
-        cell_ref  = "?"
-        c_matches = list(CELL_REF_RE.finditer(preceding))
-        if c_matches:
-            cell_ref = c_matches[-1].group(1)
-
-        if 't="shared"' in open_tag and 'ref="' in open_tag:
-            si_match = re.search(r'si="(\d+)"', open_tag)
-            if si_match:
-                formulas[cell_ref] = f"[shared:si={si_match.group(1)}] {formula_text}"
-        elif 't="array"' in open_tag:
-            formulas[cell_ref] = f"[array] {formula_text}"
+    for cell_ref, kind, si, _, _, text in _iter_sheet_formulas(sheet_xml):
+        if kind == "shared":
+            formulas[cell_ref] = f"[shared:si={si}] {text}"
+        elif kind == "shared-ref":
+            formulas[cell_ref] = f"[shared-ref:si={si}] {text}"
+        elif kind == "array":
+            formulas[cell_ref] = f"[array] {text}"
         else:
-            formulas[cell_ref] = formula_text
-
-    # Second pass: shared formula references (self-closing, no formula text)
-    for sm in SHARED_REF_RE.finditer(sheet_xml):
-        preceding = sheet_xml[: sm.start()]
-        cell_ref  = "?"
-        c_matches = list(CELL_REF_RE.finditer(preceding))
-        if c_matches:
-            cell_ref = c_matches[-1].group(1)
-        si_match = re.search(r'si="(\d+)"', sm.group(0))
-        si = si_match.group(1) if si_match else "?"
-        formulas[cell_ref] = f"[shared-ref:si={si}]"
-
+            formulas[cell_ref] = text
     return formulas
 
 
@@ -1261,9 +1913,10 @@ def _normalize_formula(formula: str, sheet_name_map: dict[str, str]) -> str:
     names (Sheet1, Sheet2, …).
 
     This makes '='January 2026'!K2' and '='Month YYYY'!K2' compare equal.
-    Also strips shared/array metadata prefixes for comparison purposes.
+    Also strips shared/shared-ref/array metadata prefixes for comparison
+    purposes.
     """
-    normalized = re.sub(r"^\[(?:shared:si=\d+|array)\]\s*", "", formula)
+    normalized = re.sub(r"^\[(?:shared(?:-ref)?:si=\d+|array)\]\s*", "", formula)
 
     for original, canonical in sheet_name_map.items():
         escaped = re.escape(original)
@@ -1512,42 +2165,87 @@ def _resolve_l9_formula(sheet_xml_bytes: bytes, po_number: str) -> bytes:
     return content.encode("utf-8")
 
 
-def _read_reference_data(xlsx_path: str, sheet_xml_path: str) -> dict:
-    """Read the Reference sheet and return a dict of (col, row) → value."""
+def _read_reference_data(xlsx_path: str, sheet_xml_path: str) -> dict[str, list]:
+    """
+    Read the Reference sheet into a column index: letter → list of values,
+    where list[i] holds row i + 1 (None for empty cells).
+
+    Streams the sheet XML with iterparse in a single pass, so memory stays
+    flat for tens of thousands of rows. Shared strings (t="s"), inline
+    strings, booleans and numbers are decoded to Python values.
+    """
+    ns      = NS["sp"]
+    c_tag   = f"{{{ns}}}c"
+    row_tag = f"{{{ns}}}row"
+    v_tag   = f"{{{ns}}}v"
+    t_tag   = f"{{{ns}}}t"
+
+    columns: dict[str, list] = {}
     with zipfile.ZipFile(xlsx_path, "r") as zf:
-        data = zf.read(sheet_xml_path).decode("utf-8")
+        strings = _read_shared_strings(zf)
+        with zf.open(sheet_xml_path) as fh:
+            for _, elem in ET.iterparse(fh, events=("end",)):
+                if elem.tag == row_tag:
+                    elem.clear()
+                    continue
+                if elem.tag != c_tag:
+                    continue
+                ref = elem.get("r", "")
+                idx = len(ref.rstrip("0123456789"))
+                if not idx or idx == len(ref):
+                    continue
+                cell_type = elem.get("t", "")
+                if cell_type == "inlineStr":
+                    raw = "".join(t.text or "" for t in elem.iter(t_tag))
+                else:
+                    v_elem = elem.find(v_tag)
+                    raw    = v_elem.text if v_elem is not None else None
+                if not raw:
+                    continue
+                value  = _parse_cell_value(cell_type, raw, strings)
+                column = columns.setdefault(ref[:idx], [])
+                row    = int(ref[idx:])
+                if len(column) < row:
+                    column.extend([None] * (row - len(column)))
+                column[row - 1] = value
+    return columns
+
+
+def _reference_text(value) -> str:
+    """Render a reference cell value as text (numbers without a trailing .0)."""
+    if value is None or isinstance(value, _ExcelError):
+        return ""
+    if isinstance(value, float):
+        return _format_number(value)
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    return value
 
-    cell_pattern = re.compile(
-        r'<c r="([A-Z]+)(\d+)"([^>]*)>(.*?)</c>', re.DOTALL
-    )
-    ref_data = {}
-    for m in cell_pattern.finditer(data):
-        col, row_s = m.group(1), m.group(2)
-        inner      = m.group(4)
-        v_match    = re.search(r"<v>(.*?)</v>", inner)
-        if v_match and v_match.group(1):
-            ref_data[(col, int(row_s))] = v_match.group(1)
-    return ref_data
-
-
-def _build_po_lookup(ref_data: dict) -> dict[str, str]:
-    """Build a site code → PO number mapping from Reference sheet data."""
+
+def _build_po_lookup(ref_data: dict[str, list]) -> dict[str, str]:
+    """
+    Build a site code → PO number mapping from the Reference column index
+    (codes in column A, PO numbers in column D; row 1 is the header).
+    The first occurrence of a code wins; every data row is considered.
+    """
+    codes = ref_data.get("A", [])
+    pos   = ref_data.get("D", [])
     code_to_po: dict[str, str] = {}
-    for row in range(2, 101):
-        code = ref_data.get(("A", row))
-        po   = ref_data.get(("D", row))
+    for i in range(1, len(codes)):
+        code = _reference_text(codes[i])
         if code and code not in code_to_po:
-            code_to_po[code] = po or ""
+            code_to_po[code] = _reference_text(pos[i]) if i < len(pos) else ""
     return code_to_po
 
 
-def _prepare_invoice_workbook(wb_xml_bytes: bytes) -> bytes:
+def _prepare_invoice_workbook(wb_xml_bytes: bytes, full_calc: bool = True) -> bytes:
     """
     Invoice-specific workbook.xml transformation:
       - Strip external references and defined names
       - Hide the Reference (third) sheet
       - Reset activeTab to 0 (Summary)
-      - Add fullCalcOnLoad="1" so Excel recalculates C17-dependent formulas
+      - Add fullCalcOnLoad="1" so Excel recalculates C17-dependent formulas,
+        unless full_calc is False (cached values were computed at generation)
     """
     content = clean_workbook_external_refs(wb_xml_bytes).decode("utf-8")
 
@@ -1560,11 +2258,619 @@ def _prepare_invoice_workbook(wb_xml_bytes: bytes) -> bytes:
     # Reset activeTab so Excel doesn't open on the hidden Reference sheet
     content = re.sub(r' activeTab="\d+"', "", content)
     # Force full recalculation on open
-    content = re.sub(r'(<calcPr\b)', r'\1 fullCalcOnLoad="1"', content)
+    if full_calc:
+        content = re.sub(r'(<calcPr\b)', r'\1 fullCalcOnLoad="1"', content)
 
     return content.encode("utf-8")
 
 
+# ── Formula evaluation (invoice cached values) ────────────────────────────────
+# A deliberately small evaluator: enough of Excel's grammar and the
+# INDEX / MATCH / VLOOKUP / SUM / IF / IFERROR functions to recompute the
+# cells that depend on C17, so generated invoices carry correct cached <v>
+# values and do not need fullCalcOnLoad. Anything outside that subset
+# raises _Unsupported and the invoice falls back to a full recalc on open.
+
+class _Unsupported(Exception):
+    """Formula syntax or function the evaluator does not implement."""
+
+
+class _ExcelError(Exception):
+    """An Excel error value (#N/A, #VALUE!, …); raised and stored as a value."""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+EVAL_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<str>"(?:[^"]|"")*")
+      | (?P<err>\#(?:N/A|VALUE!|REF!|DIV/0!|NUM!|NAME\?|NULL!))
+      | (?P<ref>(?:(?:'(?:[^']|'')+'|[A-Za-z_][\w.]*)!)?
+                \$?[A-Z]{1,3}\$?\d+(?::\$?[A-Z]{1,3}\$?\d+)?)(?![\w(])
+      | (?P<num>(?:\d+\.?\d*|\.\d+)(?:[Ee][+-]?\d+)?)
+      | (?P<bool>TRUE|FALSE)(?![\w(])
+      | (?P<func>[A-Za-z_][\w.]*)\s*\(
+      | (?P<op><>|<=|>=|[-+*/^&=<>%(),])
+    )""",
+    re.VERBOSE,
+)
+EXTERNAL_REF_RE = re.compile(r"\[\d+\]")
+_COMPARE_OPS = ("=", "<>", "<", ">", "<=", ">=")
+
+
+def _lex_formula(text: str) -> list[tuple[str, str]]:
+    """Split formula text into (kind, text) tokens."""
+    tokens, pos = [], 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = EVAL_TOKEN_RE.match(text, pos)
+        if not m:
+            raise _Unsupported(f"cannot parse near {text[pos:pos + 20]!r}")
+        kind = m.lastgroup
+        tokens.append((kind, m.group(kind)))
+        pos = m.end()
+    return tokens
+
+
+def _parse_ref(ref_text: str) -> tuple:
+    """Parse "Sheet!$A$1:B2" into ("ref", sheet_or_None, r1, c1, r2, c2)."""
+    sheet, _, cells = ref_text.rpartition("!")
+    if sheet.startswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    first, _, last = cells.replace("$", "").partition(":")
+    r1, c1 = _split_cell_ref(first)
+    r2, c2 = _split_cell_ref(last) if last else (r1, c1)
+    return ("ref", sheet or None,
+            min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2))
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_formula(text: str) -> tuple:
+    """
+    Parse formula text into a tuple AST (cached per distinct formula).
+
+    Precedence, lowest first: comparison, &, + -, * /, ^, unary -, %.
+    """
+    tokens = _lex_formula(text)
+    pos = 0
+
+    def peek(value=None):
+        if pos >= len(tokens):
+            return None
+        tok = tokens[pos]
+        if value is None or (tok[0] == "op" and tok[1] == value):
+            return tok
+        return None
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def expect(value):
+        if not peek(value):
+            raise _Unsupported(f"expected {value!r}")
+        take()
+
+    def binary(next_level, ops):
+        def level():
+            node = next_level()
+            while (tok := peek()) and tok[0] == "op" and tok[1] in ops:
+                take()
+                node = ("bin", tok[1], node, next_level())
+            return node
+        return level
+
+    def primary():
+        tok = peek()
+        if tok is None:
+            raise _Unsupported("unexpected end of formula")
+        kind, value = take()
+        if kind == "num":
+            return ("const", float(value))
+        if kind == "str":
+            return ("const", value[1:-1].replace('""', '"'))
+        if kind == "bool":
+            return ("const", value == "TRUE")
+        if kind == "err":
+            return ("err", value)
+        if kind == "ref":
+            return _parse_ref(value)
+        if kind == "func":
+            name = value.upper()
+            if name.startswith("_XLFN."):
+                name = name[6:]
+            args = []
+            if peek(")"):
+                take()
+                return ("func", name, args)
+            while True:
+                if peek(",") or peek(")"):
+                    args.append(("blank",))
+                else:
+                    args.append(comparison())
+                if peek(","):
+                    take()
+                    continue
+                expect(")")
+                return ("func", name, args)
+        if kind == "op" and value == "(":
+            node = comparison()
+            expect(")")
+            return node
+        raise _Unsupported(f"unexpected token {value!r}")
+
+    def percent():
+        node = primary()
+        while peek("%"):
+            take()
+            node = ("bin", "/", node, ("const", 100.0))
+        return node
+
+    def unary():
+        if peek("-"):
+            take()
+            return ("neg", unary())
+        if peek("+"):
+            take()
+            return unary()
+        return percent()
+
+    power      = binary(unary, ("^",))
+    term       = binary(power, ("*", "/"))
+    additive   = binary(term, ("+", "-"))
+    concat     = binary(additive, ("&",))
+    comparison = binary(concat, _COMPARE_OPS)
+
+    node = comparison()
+    if pos != len(tokens):
+        raise _Unsupported(f"unexpected token {tokens[pos][1]!r}")
+    return node
+
+
+def _formula_refs(node: tuple):
+    """Yield every ("ref", …) node in an AST."""
+    if node[0] == "ref":
+        yield node
+    elif node[0] == "func":
+        for arg in node[2]:
+            yield from _formula_refs(arg)
+    elif node[0] == "bin":
+        yield from _formula_refs(node[2])
+        yield from _formula_refs(node[3])
+    elif node[0] == "neg":
+        yield from _formula_refs(node[1])
+
+
+def _read_shared_strings(zf: zipfile.ZipFile) -> list[str]:
+    """Return the workbook's shared string table (empty if absent)."""
+    try:
+        ss_xml = zf.read("xl/sharedStrings.xml")
+    except KeyError:
+        return []
+    ns = NS["sp"]
+    return [
+        "".join(t.text or "" for t in si.iter(f"{{{ns}}}t"))
+        for si in ET.fromstring(ss_xml).findall(f"{{{ns}}}si")
+    ]
+
+
+def _parse_cell_value(cell_type: str, raw: str | None, strings: list[str]):
+    """Convert a cell's t= attribute and <v>/<t> text to a Python value."""
+    if raw is None:
+        return None
+    if cell_type == "s":
+        return strings[int(raw)]
+    if cell_type in ("str", "inlineStr"):
+        return _xml_unescape(raw)
+    if cell_type == "b":
+        return raw == "1"
+    if cell_type == "e":
+        return _ExcelError(raw)
+    try:
+        return float(raw)
+    except ValueError:
+        return _xml_unescape(raw)
+
+
+def _load_workbook_model(xlsx_path: str, sheets_info: list[dict],
+                         sheet_paths: dict[str, str]) -> dict:
+    """
+    Load cached values and parsed formulas for every sheet of a workbook.
+
+    Returns {"names": {lower_name: name}, "values": {name: {(row, col): v}},
+    "formulas": {name: {(row, col): ast}}, "unsupported": [(name, ref, text)]}.
+    Formulas referencing external workbooks are treated as constants — they
+    are stripped to their cached values during generation anyway.
+    """
+    model = {"names": {}, "values": {}, "formulas": {}, "unsupported": []}
+    with zipfile.ZipFile(xlsx_path, "r") as zf:
+        strings = _read_shared_strings(zf)
+        for sheet in sheets_info:
+            xml_path = sheet_paths.get(sheet["rId"], "")
+            if not xml_path:
+                continue
+            name      = sheet["name"]
+            sheet_xml = zf.read(xml_path).decode("utf-8")
+            values    = {}
+            for m in CELL_ELEMENT_RE.finditer(sheet_xml):
+                inner = m.group(3) or ""
+                t_m   = re.search(r'\bt="([^"]*)"', m.group(1))
+                if t_m and t_m.group(1) == "inlineStr":
+                    raw = "".join(re.findall(r"<t\b[^>]*>(.*?)</t>", inner, re.DOTALL))
+                else:
+                    v_m = re.search(r"<v>(.*?)</v>", inner, re.DOTALL)
+                    raw = v_m.group(1) if v_m else None
+                values[_split_cell_ref(m.group(2))] = _parse_cell_value(
+                    t_m.group(1) if t_m else "", raw, strings
+                )
+
+            formulas = {}
+            for cell_ref, _, _, _, _, text in _iter_sheet_formulas(sheet_xml):
+                if cell_ref == "?" or not text or EXTERNAL_REF_RE.search(text):
+                    continue
+                try:
+                    formulas[_split_cell_ref(cell_ref)] = _parse_formula(text)
+                except _Unsupported:
+                    model["unsupported"].append((name, cell_ref, text))
+
+            model["names"][name.lower()] = name
+            model["values"][name]        = values
+            model["formulas"][name]      = formulas
+    return model
+
+
+# Ranges up to this many cells are indexed cell by cell in _dirty_cells;
+# larger ones (whole columns, say) are checked per sheet instead
+_DIRTY_INDEX_MAX_CELLS = 4096
+
+
+def _dirty_cells(model: dict, seeds: set[tuple]) -> set[tuple]:
+    """
+    Return every (sheet, row, col) formula cell that depends, directly or
+    transitively, on one of the seed cells.
+
+    A reverse index (precedent cell -> dependent formulas) is built once
+    and walked breadth-first from the seeds, so each cell is visited once.
+    """
+    by_cell  = {}   # (sheet, row, col) -> dependent formula cells
+    by_sheet = {}   # sheet -> [(r1, c1, r2, c2, dependent)] for large ranges
+    for sheet, formulas in model["formulas"].items():
+        for (row, col), ast in formulas.items():
+            key = (sheet, row, col)
+            for ref in _formula_refs(ast):
+                ref_sheet = model["names"].get((ref[1] or sheet).lower())
+                if ref_sheet is None:
+                    continue
+                r1, c1, r2, c2 = ref[2:]
+                if (r2 - r1 + 1) * (c2 - c1 + 1) > _DIRTY_INDEX_MAX_CELLS:
+                    by_sheet.setdefault(ref_sheet, []).append((r1, c1, r2, c2, key))
+                    continue
+                for r in range(r1, r2 + 1):
+                    for c in range(c1, c2 + 1):
+                        by_cell.setdefault((ref_sheet, r, c), []).append(key)
+
+    dirty = set(seeds)
+    queue = deque(seeds)
+    while queue:
+        cell = queue.popleft()
+        d_sheet, d_row, d_col = cell
+        dependents = by_cell.get(cell, [])
+        ranges     = by_sheet.get(d_sheet)
+        if ranges:
+            dependents = dependents + [key for r1, c1, r2, c2, key in ranges
+                                       if r1 <= d_row <= r2 and c1 <= d_col <= c2]
+        for key in dependents:
+            if key not in dirty:
+                dirty.add(key)
+                queue.append(key)
+    return dirty - seeds
+
+
+def _type_rank(value) -> int:
+    """Excel's cross-type ordering: numbers < text < booleans."""
+    if isinstance(value, bool):
+        return 2
+    if isinstance(value, str):
+        return 1
+    return 0
+
+
+def _compare(a, b) -> int:
+    """Compare two scalars Excel-style (text is case-insensitive)."""
+    if a is None:
+        a = "" if isinstance(b, str) else False if isinstance(b, bool) else 0.0
+    if b is None:
+        b = "" if isinstance(a, str) else False if isinstance(a, bool) else 0.0
+    ra, rb = _type_rank(a), _type_rank(b)
+    if ra != rb:
+        return -1 if ra < rb else 1
+    if ra == 1:
+        a, b = a.lower(), b.lower()
+    return (a > b) - (a < b)
+
+
+def _to_number(value) -> float:
+    if isinstance(value, _ExcelError):
+        raise value
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            raise _ExcelError("#VALUE!") from None
+    return value
+
+
+def _to_text(value) -> str:
+    if isinstance(value, _ExcelError):
+        raise value
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return format(value, ".15g")
+    return value
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        upper = value.upper()
+        if upper in ("TRUE", "FALSE"):
+            return upper == "TRUE"
+        raise _ExcelError("#VALUE!")
+    return bool(_to_number(value))
+
+
+def _format_number(value: float) -> str:
+    """Shortest round-trip text for a number, as Excel stores it in <v>."""
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _evaluate_cells(model: dict, overrides: dict[tuple, object],
+                    targets: set[tuple]) -> dict[tuple, object]:
+    """
+    Evaluate the target (sheet, row, col) formula cells.
+
+    overrides replace stored values (e.g. the new C17). Target cells read
+    each other through a memo; every other cell reads its cached value.
+    Returns {(sheet, row, col): value}; Excel errors come back as
+    _ExcelError values. Raises _Unsupported if any target cannot be handled.
+    """
+    memo:   dict[tuple, object] = {}
+    active: set[tuple] = set()
+
+    def cell(sheet, row, col):
+        key = (sheet, row, col)
+        if key in overrides:
+            return overrides[key]
+        if key in targets:
+            if key not in memo:
+                if key in active:
+                    raise _Unsupported("circular reference")
+                active.add(key)
+                try:
+                    memo[key] = scalar(evaluate(model["formulas"][sheet][(row, col)], sheet))
+                except _ExcelError as e:
+                    memo[key] = e
+                finally:
+                    active.discard(key)
+            return memo[key]
+        return model["values"][sheet].get((row, col))
+
+    def scalar(value):
+        if isinstance(value, tuple):
+            _, sheet, r1, c1, r2, c2 = value
+            if r1 != r2 or c1 != c2:
+                raise _ExcelError("#VALUE!")
+            value = cell(sheet, r1, c1)
+        if isinstance(value, _ExcelError):
+            raise value
+        return value
+
+    def cells_of(rng):
+        if not isinstance(rng, tuple):
+            return [[rng]]
+        _, sheet, r1, c1, r2, c2 = rng
+        return [[cell(sheet, r, c) for c in range(c1, c2 + 1)]
+                for r in range(r1, r2 + 1)]
+
+    def vector(rng):
+        grid = cells_of(rng)
+        if len(grid) == 1:
+            return grid[0]
+        if all(len(row) == 1 for row in grid):
+            return [row[0] for row in grid]
+        raise _ExcelError("#N/A")
+
+    def lookup(value, items, match_type):
+        """Position (0-based) of value in items per MATCH semantics."""
+        if match_type == 0:
+            if isinstance(value, str) and any(ch in value for ch in "*?"):
+                pattern = re.compile(
+                    "".join(".*" if ch == "*" else "." if ch == "?" else re.escape(ch)
+                            for ch in value) + r"\Z",
+                    re.IGNORECASE | re.DOTALL,
+                )
+                for i, item in enumerate(items):
+                    if isinstance(item, str) and pattern.match(item):
+                        return i
+            else:
+                for i, item in enumerate(items):
+                    if (item is not None and not isinstance(item, _ExcelError)
+                            and _type_rank(item) == _type_rank(value)
+                            and _compare(item, value) == 0):
+                        return i
+            raise _ExcelError("#N/A")
+        best = None
+        for i, item in enumerate(items):
+            if item is None or isinstance(item, _ExcelError):
+                continue
+            if _type_rank(item) != _type_rank(value):
+                continue
+            order = _compare(item, value)
+            if order == 0:
+                best = i
+                if match_type > 0:
+                    continue
+                break
+            if (order < 0) == (match_type > 0):
+                best = i
+            else:
+                break
+        if best is None:
+            raise _ExcelError("#N/A")
+        return best
+
+    def func(name, args, sheet):
+        if name == "IF":
+            if not 2 <= len(args) <= 3:
+                raise _Unsupported("IF arity")
+            if _to_bool(scalar(evaluate(args[0], sheet))):
+                return evaluate(args[1], sheet)
+            return evaluate(args[2], sheet) if len(args) == 3 else False
+        if name == "IFERROR":
+            try:
+                return scalar(evaluate(args[0], sheet))
+            except _ExcelError:
+                return evaluate(args[1], sheet)
+        if name == "SUM":
+            total = 0.0
+            for arg in args:
+                value = evaluate(arg, sheet)
+                if isinstance(value, tuple):
+                    for row in cells_of(value):
+                        for item in row:
+                            if isinstance(item, _ExcelError):
+                                raise item
+                            if isinstance(item, float):
+                                total += item
+                else:
+                    total += _to_number(value)
+            return total
+        if name == "INDEX":
+            rng = evaluate(args[0], sheet)
+            if not isinstance(rng, tuple):
+                raise _Unsupported("INDEX over a non-range")
+            _, ref_sheet, r1, c1, r2, c2 = rng
+            row_n = int(_to_number(scalar(evaluate(args[1], sheet))))
+            col_n = (int(_to_number(scalar(evaluate(args[2], sheet))))
+                     if len(args) > 2 and args[2] != ("blank",) else 0)
+            if r1 == r2 and len(args) == 2:
+                row_n, col_n = 1, row_n
+            col_n = col_n or 1
+            if row_n < 1 or col_n < 1 or r1 + row_n - 1 > r2 or c1 + col_n - 1 > c2:
+                raise _ExcelError("#REF!")
+            return ("ref", ref_sheet, r1 + row_n - 1, c1 + col_n - 1,
+                    r1 + row_n - 1, c1 + col_n - 1)
+        if name == "MATCH":
+            value      = scalar(evaluate(args[0], sheet))
+            items      = vector(evaluate(args[1], sheet))
+            match_type = (int(_to_number(scalar(evaluate(args[2], sheet))))
+                          if len(args) > 2 else 1)
+            return float(lookup(value, items, match_type) + 1)
+        if name == "VLOOKUP":
+            value = scalar(evaluate(args[0], sheet))
+            grid  = cells_of(evaluate(args[1], sheet))
+            col_n = int(_to_number(scalar(evaluate(args[2], sheet))))
+            approx = (_to_bool(scalar(evaluate(args[3], sheet)))
+                      if len(args) > 3 else True)
+            if col_n < 1 or col_n > len(grid[0]):
+                raise _ExcelError("#REF!")
+            row_i = lookup(value, [row[0] for row in grid], 1 if approx else 0)
+            return grid[row_i][col_n - 1]
+        raise _Unsupported(f"function {name}")
+
+    def evaluate(node, sheet):
+        kind = node[0]
+        if kind == "const":
+            return node[1]
+        if kind == "blank":
+            return None
+        if kind == "err":
+            raise _ExcelError(node[1])
+        if kind == "ref":
+            ref_sheet = sheet
+            if node[1] is not None:
+                ref_sheet = model["names"].get(node[1].lower())
+                if ref_sheet is None:
+                    raise _Unsupported(f"unknown sheet {node[1]!r}")
+            return ("ref", ref_sheet, *node[2:])
+        if kind == "func":
+            return func(node[1], node[2], sheet)
+        if kind == "neg":
+            return -_to_number(scalar(evaluate(node[1], sheet)))
+        op = node[1]
+        a  = scalar(evaluate(node[2], sheet))
+        b  = scalar(evaluate(node[3], sheet))
+        if op == "&":
+            return _to_text(a) + _to_text(b)
+        if op in _COMPARE_OPS:
+            order = _compare(a, b)
+            return {"=": order == 0, "<>": order != 0, "<": order < 0,
+                    ">": order > 0, "<=": order <= 0, ">=": order >= 0}[op]
+        a, b = _to_number(a), _to_number(b)
+        if op == "+":
+            return a + b
+        if op == "-":
+            return a - b
+        if op == "*":
+            return a * b
+        if op == "/":
+            if b == 0:
+                raise _ExcelError("#DIV/0!")
+            return a / b
+        try:
+            return float(a ** b)
+        except (OverflowError, ZeroDivisionError, TypeError):
+            raise _ExcelError("#NUM!") from None
+
+    results = {}
+    for key in targets:
+        value = cell(*key)
+        results[key] = 0.0 if value is None else value
+    return results
+
+
+def _write_cached_values(sheet_xml_bytes: bytes, values: dict[str, object]) -> bytes:
+    """
+    Replace the cached <v> of the given cells (cell_ref → value), keeping
+    each cell's <f> element and style. Strings are written as t="str",
+    booleans as t="b" and errors as t="e".
+    """
+    if not values:
+        return sheet_xml_bytes
+    content = sheet_xml_bytes.decode("utf-8")
+
+    def _rewrite(m):
+        value = values.get(m.group(2))
+        if value is None:
+            return m.group(0)
+        attrs = re.sub(r'\s+t="[^"]*"', "", m.group(1))
+        f_m   = re.search(r"<f\b[^>]*/>|<f\b.*?</f>", m.group(3) or "", re.DOTALL)
+        f_xml = f_m.group(0) if f_m else ""
+        if isinstance(value, _ExcelError):
+            return f'<c{attrs} t="e">{f_xml}<v>{value.code}</v></c>'
+        if isinstance(value, bool):
+            return f'<c{attrs} t="b">{f_xml}<v>{int(value)}</v></c>'
+        if isinstance(value, str):
+            return f'<c{attrs} t="str">{f_xml}<v>{_xml_escape(value)}</v></c>'
+        return f"<c{attrs}>{f_xml}<v>{_format_number(value)}</v></c>"
+
+    content = CELL_ELEMENT_RE.sub(_rewrite, content)
+    return content.encode("utf-8")
+
+
 def generate_invoices(
     template_path:     str,
     po_ref_path:       str,
@@ -1580,9 +2886,11 @@ def generate_invoices(
       1. Copy the MASTER template.
       2. Set C17 to the site code; resolve L9 to the PO number.
       3. Strip external link formulas from all sheets.
-      4. Protect all sheets with the given password.
-      5. Hide the Reference sheet; reset activeTab; add fullCalcOnLoad.
-      6. Remove external link relationship/content-type entries and files.
+      4. Evaluate every C17-dependent formula and write its cached value.
+      5. Protect all sheets with the given password.
+      6. Hide the Reference sheet; reset activeTab. fullCalcOnLoad is only
+         added when a dependent formula is outside the evaluator's subset.
+      7. Remove external link relationship/content-type entries and files.
     """
     site_codes = _read_site_codes(po_ref_path)
     print(
@@ -1608,20 +2916,49 @@ def generate_invoices(
         for si in sheets_info
         if sheet_paths.get(si["rId"])
     ]
+    sheet_names = {
+        sheet_paths[si["rId"]]: si["name"]
+        for si in sheets_info
+        if sheet_paths.get(si["rId"])
+    }
 
     sheet3_rId      = sheets_info[2]["rId"]
     sheet3_xml_path = sheet_paths.get(sheet3_rId, "")
     ref_data  = _read_reference_data(template_path, sheet3_xml_path)
     po_lookup = _build_po_lookup(ref_data)
 
-    pwd_hash = _hash_password(password) if password else ""
+    hash_plan = _protection_hashes(
+        password, [len(all_sheet_paths)] * len(site_codes)
+    )
+
+    # Cells whose cached values change with the site code
+    model         = _load_workbook_model(template_path, sheets_info, sheet_paths)
+    invoice_sheet = sheets_info[1]["name"]
+    c17_key       = (invoice_sheet, 17, _col_to_num("C"))
+    l9_key        = (invoice_sheet, 9, _col_to_num("L"))
+    seeds = {c17_key}
+    if (9, _col_to_num("L")) in model["formulas"].get(invoice_sheet, {}):
+        seeds.add(l9_key)
+    dirty = _dirty_cells(model, seeds)
+    if model["unsupported"]:
+        sheet, ref, _ = model["unsupported"][0]
+        print(
+            f"  {YELLOW}NOTE:{RESET} {len(model['unsupported'])} formula(s)"
+            f" (first: {sheet}!{ref}) can't be evaluated here;"
+            f" invoices will recalculate on open."
+        )
 
     print(f"  {GRAY}Output directory: {output_dir}{RESET}")
-    print(f"  {GRAY}Password hash: {pwd_hash if pwd_hash else '(none)'}{RESET}")
-    print(f"  {GRAY}PO lookup: {len(po_lookup)} codes mapped{RESET}\n")
+    print(
+        f"  {GRAY}Password hash:"
+        f" {_describe_protection_hash() if password else '(none)'}{RESET}"
+    )
+    print(f"  {GRAY}PO lookup: {len(po_lookup)} codes mapped{RESET}")
+    print(f"  {GRAY}Site-code dependent formulas: {len(dirty)}{RESET}\n")
 
     created = 0
-    for code in site_codes:
+    for code, file_hashes in zip(site_codes, hash_plan):
+        sheet_hashes = dict(zip(all_sheet_paths, file_hashes))
         filename    = filename_template.format(code=code, year_month=year_month)
         output_path = os.path.join(output_dir, filename)
         shutil.copy2(template_path, output_path)
@@ -1630,13 +2967,31 @@ def generate_invoices(
         if not po_number:
             print(f"    {YELLOW}WARNING:{RESET} No PO number found for {code}")
 
+        full_calc = bool(model["unsupported"])
+        cached: dict[str, dict[str, object]] = {}
+        if not full_calc:
+            overrides = {c17_key: code}
+            if l9_key in seeds:
+                overrides[l9_key] = po_number
+            try:
+                results = _evaluate_cells(model, overrides, dirty)
+            except _Unsupported as e:
+                full_calc = True
+                print(f"    {GRAY}Recalculate on open ({e}){RESET}")
+            else:
+                for (sheet, row, col), value in results.items():
+                    cached.setdefault(sheet, {})[f"{_num_to_col(col)}{row}"] = value
+
         modifications: dict = {}
 
-        def _make_sheet2_mod(site_code=code, po=po_number, ph=pwd_hash):
+        def _make_sheet2_mod(site_code=code, po=po_number,
+                             ph=sheet_hashes[sheet2_xml_path],
+                             values=cached.get(invoice_sheet, {})):
             def _mod(xml_bytes):
                 xml_bytes = _set_c17_value(xml_bytes, site_code)
                 xml_bytes = _resolve_l9_formula(xml_bytes, po)
                 xml_bytes = strip_external_formulas(xml_bytes)
+                xml_bytes = _write_cached_values(xml_bytes, values)
                 xml_bytes = add_protection_to_sheet(xml_bytes, ph)
                 return xml_bytes
             return _mod
@@ -1646,15 +3001,21 @@ def generate_invoices(
             if sp == sheet2_xml_path:
                 continue
 
-            def _make_other_mod(ph=pwd_hash):
+            def _make_other_mod(ph=sheet_hashes[sp],
+                                values=cached.get(sheet_names[sp], {})):
                 def _mod(xml_bytes):
                     xml_bytes = strip_external_formulas(xml_bytes)
+                    xml_bytes = _write_cached_values(xml_bytes, values)
                     xml_bytes = add_protection_to_sheet(xml_bytes, ph)
                     return xml_bytes
                 return _mod
             modifications[sp] = _make_other_mod()
 
-        modifications["xl/workbook.xml"]            = _prepare_invoice_workbook
+        def _make_workbook_mod(fc=full_calc):
+            def _mod(xml_bytes):
+                return _prepare_invoice_workbook(xml_bytes, fc)
+            return _mod
+        modifications["xl/workbook.xml"]            = _make_workbook_mod()
         modifications["xl/_rels/workbook.xml.rels"] = clean_workbook_rels
         modifications["[Content_Types].xml"]        = clean_content_types
 
@@ -1734,14 +3095,160 @@ def clear_tab_colors(files: list[str]):
 
         if changes_made:
             try:
-                _modify_xlsx(filepath, modifications)
-                print(f"  {GREEN}Saved:{RESET} {filepath}")
+                if _modify_xlsx(filepath, modifications):
+                    print(f"  {GREEN}Saved:{RESET} {filepath}")
+                else:
+                    print(f"  {GRAY}Already up to date, not rewritten.{RESET}")
             except Exception as e:
                 print(f"  {RED}ERROR saving:{RESET} {e}")
         else:
             print(f"  {GRAY}No changes needed.{RESET}")
 
 
+# ╔══════════════════════════════════════════════════════════════════════════╗
+# ║  OPTION 9 — BULK FIND & REPLACE FROM A MAPPING FILE                      ║
+# ╚══════════════════════════════════════════════════════════════════════════╝
+
+def _load_replace_pairs(mapping_path: str) -> list[tuple[str, str]]:
+    """
+    Read search/replace pairs from a CSV or JSON mapping file.
+
+    CSV:  two columns (search, replace); a "search,replace" header row is
+          skipped.
+    JSON: either {"search": "replace", …} or a list of [search, replace]
+          pairs / {"search": …, "replace": …} objects.
+
+    '@' implicit intersection operators are stripped, as in option 4.
+    Raises ValueError for malformed rows or empty search strings.
+    """
+    pairs: list[tuple[str, str]] = []
+    if mapping_path.lower().endswith(".json"):
+        with open(mapping_path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        items = data.items() if isinstance(data, dict) else data
+        for item in items:
+            if isinstance(item, dict):
+                item = (item.get("search"), item.get("replace", ""))
+            if len(item) != 2 or not isinstance(item[0], str):
+                raise ValueError(f"invalid mapping entry: {item!r}")
+            pairs.append((item[0], str(item[1] or "")))
+    else:
+        with open(mapping_path, "r", encoding="utf-8-sig", newline="") as fh:
+            import csv
+            for line_no, row in enumerate(csv.reader(fh), 1):
+                if not row or not any(cell.strip() for cell in row):
+                    continue
+                if line_no == 1 and [c.strip().lower() for c in row[:2]] == ["search", "replace"]:
+                    continue
+                if len(row) < 2:
+                    raise ValueError(f"line {line_no}: expected search,replace")
+                pairs.append((row[0], row[1]))
+
+    cleaned = []
+    for search, replace in pairs:
+        search, replace = search.strip().replace("@", ""), replace.strip().replace("@", "")
+        if not search:
+            raise ValueError("empty search string in mapping")
+        cleaned.append((search, replace))
+    return cleaned
+
+
+def _compile_replace_pairs(pairs: list[tuple[str, str]]):
+    """
+    Compile pairs into one case-insensitive alternation, longest first.
+
+    Ordering by length makes overlapping keys resolve to the longest match
+    at each position (e.g. "Sheet10" wins over "Sheet1"). Returns
+    (pattern, lookup) where lookup maps lowercased search → replacement;
+    later duplicates of a key (ignoring case) override earlier ones.
+    """
+    lookup: dict[str, str] = {}
+    for search, replace in pairs:
+        lookup[search.lower()] = replace
+    ordered = sorted(lookup, key=len, reverse=True)
+    pattern = re.compile("|".join(re.escape(k) for k in ordered), re.IGNORECASE)
+    return pattern, lookup
+
+
+def bulk_find_replace_formulas(files: list[str]):
+    """
+    Apply many search/replace pairs to formulas in a single pass.
+
+    Pairs come from a CSV or JSON mapping file and are compiled into one
+    matcher. Each workbook's sheets are read once to build the preview;
+    the planned edits are kept in memory and written back in one save per
+    workbook, so nothing is rescanned between preview and apply.
+    """
+    mapping_path = input(
+        f"\n  {YELLOW}Mapping file (CSV or JSON):{RESET} "
+    ).strip().strip('"')
+    if not mapping_path:
+        print(f"  {GRAY}No mapping file entered. Aborting.{RESET}")
+        return
+    try:
+        pairs = _load_replace_pairs(mapping_path)
+    except (OSError, ValueError) as e:
+        print(f"  {RED}ERROR{RESET} reading mapping: {e}")
+        return
+    if not pairs:
+        print(f"  {GRAY}Mapping file contains no pairs. Aborting.{RESET}")
+        return
+
+    pattern, lookup = _compile_replace_pairs(pairs)
+    print(f"\n  {CYAN}Loaded {len(lookup)} replacement pair(s).{RESET}")
+
+    hit_count = {key: 0 for key in lookup}
+
+    def _swap(m):
+        key = m.group(0).lower()
+        hit_count[key] += 1
+        return lookup[key]
+
+    def _rewrite(formula_text):
+        new_text = pattern.sub(_swap, formula_text)
+        return new_text if new_text != formula_text else None
+
+    plans: dict[str, dict] = {}
+    all_changes = []
+    for filepath in files:
+        try:
+            plan, preview = _plan_formula_edits(filepath, _rewrite)
+        except Exception as e:
+            print(f"  {RED}ERROR{RESET} reading {os.path.basename(filepath)}: {e}")
+            continue
+        if plan:
+            plans[filepath] = plan
+            all_changes.extend((filepath, *row) for row in preview)
+
+    if not all_changes:
+        print(f"\n  {YELLOW}No formulas matched any search string.{RESET}")
+        return
+
+    print(f"\n  {CYAN}Matches per pair:{RESET}")
+    for search, replace in pairs:
+        count = hit_count.get(search.lower(), 0)
+        colour = WHITE if count else GRAY
+        print(f"    {colour}{count:>6}{RESET}  '{search}' -> '{replace}'")
+
+    print(f"\n  {CYAN}{len(all_changes)} formula(s) will change:{RESET}\n")
+    _print_formula_preview(all_changes)
+
+    print(f"\n  {GRAY}Mark replaced formulas as array formulas (Ctrl+Shift+Enter)?{RESET}")
+    force_array = (
+        input(f"  {YELLOW}Force array formula?{RESET} {GRAY}(y/N):{RESET} ")
+        .strip().upper() == "Y"
+    )
+    confirm = input(
+        f"\n  {YELLOW}Apply {len(all_changes)} replacement(s)"
+        f" across {len(plans)} workbook(s)?{RESET} {GRAY}(y/N):{RESET} "
+    ).strip().upper()
+    if confirm != "Y":
+        print(f"  {GRAY}Cancelled.{RESET}")
+        return
+
+    _apply_formula_plans(plans, force_array)
+
+
 # ╔══════════════════════════════════════════════════════════════════════════╗
 # ║  MAIN / MENU                                                             ║
 # ╚══════════════════════════════════════════════════════════════════════════╝
@@ -1755,11 +3262,13 @@ _MAIN_MENU = [
     ("6", "Compare workbooks"),
     ("7", "Generate Lumen invoices"),
     ("8", "Clear all tab colors"),
+    ("9", "Bulk Find & Replace  (mapping file)"),
     ("0", "Exit"),
 ]
 
 
 def main():
+    _enable_vt_mode()
     _box_header("Excel Tools")
 
     current_files: list[str] = []
@@ -1894,6 +3403,7 @@ def main():
                     print(f"  {CYAN}PO Ref:{RESET}    {os.path.basename(po_ref_path)}")
                     print(f"  {CYAN}Output to:{RESET} {output_dir}")
 
+                    from datetime import datetime
                     now = datetime.now()
                     ym_input = input(
                         f"\n  {YELLOW}Invoice period (YYYY-MM){RESET}"
@@ -1929,6 +3439,7 @@ def main():
                             print(f"  {GRAY}Cancelled.{RESET}")
                             continue
 
+                    import getpass
                     password = getpass.getpass(
                         f"\n  {YELLOW}Sheet protection password:{RESET} "
                     )
@@ -1951,6 +3462,13 @@ def main():
             clear_tab_colors(current_files)
             print(f"\n{GRAY}Done.{RESET}")
 
+        elif choice == "9":
+            current_files = _select_or_reuse_files(current_files)
+            if not current_files:
+                continue
+            bulk_find_replace_formulas(current_files)
+            print(f"\n{GRAY}Done.{RESET}")
+
         elif choice == "0":
             print(f"\n{CYAN}Goodbye.{RESET}\n")
             break
@@ -13,6 +13,7 @@ Usage:
     python count-lines.py --show-exclusions
     python count-lines.py --manage
     python count-lines.py --add-ext .zip --add-pattern backup
+    python count-lines.py [PATH] --format json|csv
 
 Arguments:
     PATH                  Optional path to analyze (default: devRoot from config.json)
@@ -22,6 +23,36 @@ Arguments:
     --add-pattern PAT     Add global path pattern exclusion (e.g., backup)
     --remove-ext EXT      Remove global extension exclusion
     --remove-pattern PAT  Remove global path pattern exclusion
+    --format FORMAT       Output format: table (default), json, or csv
+    --git                 Git-aware mode: list files of git repositories from
+                          .git/index, skip .gitignore'd output, and reuse
+                          counts cached by blob SHA for unchanged files
+    --snapshot [NAME]     Save the run (per-project and per-file counts) to the
+                          SQLite snapshot store in modules/line-counter/.cache/
+    --since NAME          Show per-project growth since a snapshot ('latest'
+                          for the most recent snapshot of the same path)
+    --list-snapshots      List saved snapshots
+    --save-tree           Cache the scan as a hierarchical count tree (per
+                          directory and per file totals)
+    --subtree PATH        Answer the count for PATH (a directory or file inside
+                          the cached tree) without touching the disk; falls
+                          back to scanning PATH if the tree doesn't cover it
+                          or config.json changed since it was saved
+
+Files whose size and mtime match the reference snapshot (the --since
+snapshot, or the latest one when saving) reuse its counts without being read.
+
+config.json is parsed only after it changes: devRoot, the lineCounter section
+and the compiled exclusion rules are kept in .cache/config-snapshot.bin.
+
+Library use:
+    scan_project_lines() returns the structured result (per project: files,
+    lines, blank/comment/code, excluded counts, bytes read, elapsed, and a
+    per-language breakdown) without printing anything; count_project_lines()
+    prints the table on top of it.
+
+Languages are detected by file extension; code/comment/blank classification
+runs in the same single read as line counting.
 
 Examples:
     python count-lines.py
@@ -30,118 +61,976 @@ Examples:
     python count-lines.py --add-ext .zip
     python count-lines.py --add-ext .zip --add-pattern backup
     python count-lines.py --manage
+    python count-lines.py --format csv > counts.csv
 """
 
+from __future__ import annotations
+
 import os
+import io
+import contextlib
 import sys
 import json
+import re
 import fnmatch
+import marshal
+import struct
 import argparse
 from pathlib import Path
 from collections import defaultdict
 import time
 
-# Global variable to store exclusion config
-_exclusion_config = None
-
-def load_exclusion_config(config_path: Path) -> dict:
-    """Load line counter exclusion configuration from config.json."""
-    global _exclusion_config
-
-    if _exclusion_config is not None:
-        return _exclusion_config
-
-    try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        _exclusion_config = config.get('lineCounter', {})
-        return _exclusion_config
-    except (FileNotFoundError, KeyError, json.JSONDecodeError) as e:
-        print(f"Warning: Could not read lineCounter config from config.json: {e}")
-        print(f"Using default exclusions only (.git, node_modules, hidden files)")
-        _exclusion_config = {}
-        return _exclusion_config
-
-def should_exclude(file_path: Path, base_path: Path, dev_root: Path, config: dict) -> bool:
-    """Check if a file should be excluded from counting based on config.json settings."""
-    rel_path = file_path.relative_to(base_path)
-    parts = rel_path.parts
-
-    # Get global and project-specific exclusions from config
-    global_exclusions = config.get('globalExclusions', {})
-    project_exclusions = config.get('projectExclusions', {})
-
+# Per-project counters included in structured (JSON/CSV) results
+RESULT_COUNTERS = ('files', 'lines', 'blank', 'comment', 'code', 'excluded_files', 'excluded_dirs',
+                   'binary_files', 'large_files', 'bytes_read', 'cached_files', 'elapsed')
+
+def compile_exclusion_rules(exclusion_config: dict) -> dict:
+    """
+    Preprocess the lineCounter section for should_exclude().
+
+    Extension and file name lists become sets, path patterns are lowercased
+    once, and each project's filePatterns are joined into one regex. Apart
+    from the compiled regex ('file_regex') everything is a builtin type, so
+    the rules can be stored in the config snapshot.
+    """
+    global_ex = exclusion_config.get('globalExclusions', {})
+    projects = {}
+    for name, proj_config in exclusion_config.get('projectExclusions', {}).items():
+        file_patterns = proj_config.get('filePatterns', [])
+        projects[name] = {
+            'exclude_all': bool(proj_config.get('excludeAll', False)),
+            'include_only': frozenset(proj_config.get('includeOnly', [])),
+            'files': frozenset(proj_config.get('files', [])),
+            # fnmatch semantics: pattern and name are both normcase'd
+            'file_pattern': '|'.join(fnmatch.translate(os.path.normcase(p)) for p in file_patterns),
+            'extensions': frozenset(proj_config.get('extensions', [])),
+            'path_patterns': tuple(p.lower() for p in proj_config.get('pathPatterns', [])),
+        }
+    rules = {
+        'extensions': frozenset(global_ex.get('extensions', [])),
+        'path_patterns': tuple(p.lower() for p in global_ex.get('pathPatterns', [])),
+        'projects': projects,
+    }
+    return _compile_file_patterns(rules)
+
+def _compile_file_patterns(rules: dict) -> dict:
+    for proj in rules['projects'].values():
+        proj['file_regex'] = re.compile(proj['file_pattern']) if proj['file_pattern'] else None
+    return rules
+
+def should_exclude(file_path: Path, base_path: Path, dev_root: Path, rules: dict) -> bool:
+    """Check if a file should be excluded from counting (rules from compile_exclusion_rules)."""
     # Apply global exclusions
-    # Check global extensions
-    for ext in global_exclusions.get('extensions', []):
-        if file_path.suffix == ext:
-            return True
+    suffix = file_path.suffix
+    if suffix in rules['extensions']:
+        return True
 
     # Check global path patterns (case-insensitive)
     file_path_str = str(file_path).lower()
-    for pattern in global_exclusions.get('pathPatterns', []):
-        if pattern.lower() in file_path_str:
+    for pattern in rules['path_patterns']:
+        if pattern in file_path_str:
             return True
 
+    project_exclusions = rules['projects']
+    if not project_exclusions:
+        return False
+
     # Determine the project name from the dev root perspective
     try:
         rel_to_dev = file_path.relative_to(dev_root)
         project = rel_to_dev.parts[0] if len(rel_to_dev.parts) > 0 else None
     except ValueError:
         # File is outside dev root, use first part of relative path
+        parts = file_path.relative_to(base_path).parts
         project = parts[0] if len(parts) > 0 else None
 
     # Apply project-specific exclusions
-    if project and project in project_exclusions:
-        proj_config = project_exclusions[project]
+    proj = project_exclusions.get(project) if project else None
+    if proj is None:
+        return False
 
-        # Check if entire project is excluded
-        if proj_config.get('excludeAll', False):
-            return True
+    # Check if entire project is excluded
+    if proj['exclude_all']:
+        return True
 
-        # Check includeOnly whitelist (if present, only these files are included)
-        include_only = proj_config.get('includeOnly', [])
-        if include_only:
-            return file_path.name not in include_only
+    # Check includeOnly whitelist (if present, only these files are included)
+    name = file_path.name
+    if proj['include_only']:
+        return name not in proj['include_only']
 
-        # Check exact filename exclusions
-        for filename in proj_config.get('files', []):
-            if file_path.name == filename:
-                return True
+    # Check exact filename exclusions
+    if name in proj['files']:
+        return True
 
-        # Check filename patterns (supports wildcards)
-        for pattern in proj_config.get('filePatterns', []):
-            if fnmatch.fnmatch(file_path.name, pattern):
-                return True
+    # Check filename patterns (supports wildcards)
+    if proj['file_regex'] is not None and proj['file_regex'].match(os.path.normcase(name)):
+        return True
 
-        # Check project-specific extensions
-        for ext in proj_config.get('extensions', []):
-            if file_path.suffix == ext:
-                return True
+    # Check project-specific extensions
+    if suffix in proj['extensions']:
+        return True
 
-        # Check project-specific path patterns (case-insensitive)
-        for pattern in proj_config.get('pathPatterns', []):
-            if pattern.lower() in file_path_str:
-                return True
+    # Check project-specific path patterns (case-insensitive)
+    for pattern in proj['path_patterns']:
+        if pattern in file_path_str:
+            return True
 
     return False
 
+# Comment syntax: (line comment markers, block comment (start, end) pairs)
+_HASH = (('#',), ())
+_C_STYLE = (('//',), (('/*', '*/'),))
+
+# Language name -> file extensions
+_LANGUAGE_EXTENSIONS = {
+    'Python':     ('.py', '.pyw', '.pyi'),
+    'PowerShell': ('.ps1', '.psm1', '.psd1'),
+    'Shell':      ('.sh', '.bash', '.zsh'),
+    'YAML':       ('.yml', '.yaml'),
+    'TOML':       ('.toml',),
+    'Ruby':       ('.rb',),
+    'R':          ('.r',),
+    'C':          ('.c', '.h'),
+    'C++':        ('.cpp', '.cc', '.cxx', '.hpp', '.hh'),
+    'C#':         ('.cs',),
+    'Java':       ('.java',),
+    'JavaScript': ('.js', '.jsx', '.mjs', '.cjs'),
+    'TypeScript': ('.ts', '.tsx'),
+    'Go':         ('.go',),
+    'Rust':       ('.rs',),
+    'Swift':      ('.swift',),
+    'Kotlin':     ('.kt', '.kts'),
+    'PHP':        ('.php',),
+    'SCSS':       ('.scss', '.less'),
+    'CSS':        ('.css',),
+    'SQL':        ('.sql',),
+    'Lua':        ('.lua',),
+    'HTML':       ('.html', '.htm', '.vue', '.svelte'),
+    'XML':        ('.xml', '.xaml', '.csproj', '.props', '.targets', '.config'),
+    'Batch':      ('.bat', '.cmd'),
+    'INI':        ('.ini', '.cfg'),
+    'JSON':       ('.json',),
+    'Markdown':   ('.md', '.markdown'),
+    'Text':       ('.txt', '.rst'),
+}
+
+# Language name -> comment syntax (languages not listed have no comments)
+_COMMENT_SYNTAX = {
+    'Python':     _HASH,
+    'PowerShell': (('#',), (('<#', '#>'),)),
+    'Shell':      _HASH,
+    'YAML':       _HASH,
+    'TOML':       _HASH,
+    'Ruby':       _HASH,
+    'R':          _HASH,
+    'C':          _C_STYLE,
+    'C++':        _C_STYLE,
+    'C#':         _C_STYLE,
+    'Java':       _C_STYLE,
+    'JavaScript': _C_STYLE,
+    'TypeScript': _C_STYLE,
+    'Go':         _C_STYLE,
+    'Rust':       _C_STYLE,
+    'Swift':      _C_STYLE,
+    'Kotlin':     _C_STYLE,
+    'PHP':        (('//', '#'), (('/*', '*/'),)),
+    'SCSS':       _C_STYLE,
+    'CSS':        ((), (('/*', '*/'),)),
+    'SQL':        (('--',), (('/*', '*/'),)),
+    'Lua':        (('--',), (('--[[', ']]'),)),
+    'HTML':       ((), (('<!--', '-->'),)),
+    'XML':        ((), (('<!--', '-->'),)),
+    'Batch':      (('::', 'REM ', 'rem '), ()),
+    'INI':        ((';', '#'), ()),
+}
+
+# String literals are skipped so markers inside them ("http://") aren't comments
+_STRING_LITERALS = r'"(?:\\.|[^"\\])*"' + '|' + r"'(?:\\.|[^'\\])*'"
+# Languages where quotes are plain text
+_NO_STRING_LANGUAGES = {'HTML', 'XML', 'Batch', 'INI', 'Markdown', 'Text'}
+
+OTHER_LANGUAGE = 'Other'
+
+# Extension (lowercase) -> language name
+LANGUAGE_BY_EXTENSION = {
+    ext: language
+    for language, extensions in _LANGUAGE_EXTENSIONS.items()
+    for ext in extensions
+}
+
+# Files with a NUL byte in their first block are binary and never read further
+BINARY_SNIFF_BYTES = 8192
+
+# Files larger than this are skipped unread (lineCounter.maxFileSizeMB overrides)
+DEFAULT_MAX_FILE_SIZE_MB = 20
+
+# Line classification counters produced for every counted file
+COUNT_KEYS = ('lines', 'blank', 'comment', 'code')
+
+# Per-language counters included in structured results
+LANGUAGE_COUNTERS = ('files', *COUNT_KEYS)
+
+_token_patterns = {}
+
+def _get_token_pattern(language: str):
+    """
+    Compile (once per language) a regex matching string literals and comment
+    markers, longest marker first so '--[[' wins over '--'.
+
+    Returns (pattern, block_ends) or None for languages without comments.
+    """
+    if language in _token_patterns:
+        return _token_patterns[language]
+
+    line_markers, block_pairs = _COMMENT_SYNTAX.get(language, ((), ()))
+    if not line_markers and not block_pairs:
+        _token_patterns[language] = None
+        return None
+
+    block_ends = dict(block_pairs)
+    markers = sorted(set(line_markers) | set(block_ends), key=len, reverse=True)
+    alternatives = [re.escape(m) for m in markers]
+    if language not in _NO_STRING_LANGUAGES:
+        alternatives.insert(0, _STRING_LITERALS)
+
+    _token_patterns[language] = (re.compile('|'.join(alternatives)), block_ends)
+    return _token_patterns[language]
+
+def detect_language(file_path: Path) -> str:
+    """Map a file to its language name by extension."""
+    return LANGUAGE_BY_EXTENSION.get(file_path.suffix.lower(), OTHER_LANGUAGE)
+
+def classify_lines(lines, language: str) -> dict:
+    """
+    Classify an iterable of lines into blank/comment/code in a single pass.
+
+    A streaming state machine tracks open block comments across lines. A line
+    is code if it has any non-whitespace outside comments, comment if it has
+    only comment text, and blank if it is whitespace only.
+    """
+    counts = {'lines': 0, 'blank': 0, 'comment': 0, 'code': 0}
+    token_info = _get_token_pattern(language)
+
+    if token_info is None:
+        # No comment syntax: every non-blank line is code
+        for line in lines:
+            counts['lines'] += 1
+            if line.strip():
+                counts['code'] += 1
+            else:
+                counts['blank'] += 1
+        return counts
+
+    token_re, block_ends = token_info
+    block_end = None  # Closing delimiter of the currently open block comment
+
+    for line in lines:
+        counts['lines'] += 1
+        if not line.strip():
+            counts['blank'] += 1
+            continue
+
+        pos = 0
+        length = len(line)
+        has_code = False
+        has_comment = block_end is not None
+
+        while pos < length:
+            if block_end is not None:
+                end = line.find(block_end, pos)
+                if end == -1:
+                    break
+                pos = end + len(block_end)
+                block_end = None
+                continue
+
+            match = token_re.search(line, pos)
+            if match is None:
+                if line[pos:].strip():
+                    has_code = True
+                break
+
+            if line[pos:match.start()].strip():
+                has_code = True
+
+            token = match.group()
+            if token in block_ends:
+                has_comment = True
+                block_end = block_ends[token]
+                pos = match.end()
+            elif token[0] in '"\'':
+                # String literal: code, and markers inside it are ignored
+                has_code = True
+                pos = match.end()
+            else:
+                # Line comment: the rest of the line is comment text
+                has_comment = True
+                break
+
+        if has_code:
+            counts['code'] += 1
+        elif has_comment:
+            counts['comment'] += 1
+        else:
+            counts['code'] += 1
+
+    return counts
+
+def decode_text(data: bytes) -> str:
+    """Decode file bytes: BOM-marked UTF-16, then UTF-8, falling back to Latin-1."""
+    if data[:2] in (b'\xff\xfe', b'\xfe\xff'):
+        return data.decode('utf-16', errors='replace')
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+def is_binary_block(block: bytes) -> bool:
+    """A NUL byte in the first block marks a file as binary (UTF-16 BOMs excepted)."""
+    return b'\0' in block and block[:2] not in (b'\xff\xfe', b'\xfe\xff')
+
+def classify_file(file_path: Path, language: str = None):
+    """
+    Count and classify lines in a file with one read.
+
+    The first block is sniffed for NUL bytes before anything else is read, so
+    binaries cost a single small read. Text is read once in binary mode and
+    decoded in memory (UTF-8 with Latin-1 fallback) instead of re-reading the
+    file per candidate encoding.
+
+    Returns dict with lines, blank, comment and code counts (all zero if the
+    file cannot be read), or None if the file is binary.
+    """
+    if language is None:
+        language = detect_language(file_path)
+
+    try:
+        with open(file_path, 'rb') as f:
+            head = f.read(BINARY_SNIFF_BYTES)
+            if is_binary_block(head):
+                return None
+            data = head + f.read()
+    except OSError:
+        return {'lines': 0, 'blank': 0, 'comment': 0, 'code': 0}
+
+    return classify_lines(io.StringIO(decode_text(data), newline=None), language)
+
 def count_lines_in_file(file_path: Path) -> int:
-    """Count lines in a file, handling various encodings."""
-    encodings = ['utf-8', 'latin-1', 'cp1252']
+    """Count lines in a file, handling various encodings (0 for binaries)."""
+    counts = classify_file(file_path)
+    return counts['lines'] if counts else 0
+
+def _sort_languages(languages: dict) -> dict:
+    """Order a language breakdown by code lines descending."""
+    return dict(sorted(languages.items(), key=lambda x: x[1]['code'], reverse=True))
+
+def _new_language_stats() -> dict:
+    return {key: 0 for key in LANGUAGE_COUNTERS}
+
+def _add_language_counts(languages: dict, language: str, counts: dict):
+    """Accumulate one file's classified counts into a language breakdown."""
+    stats = languages.setdefault(language, _new_language_stats())
+    stats['files'] += 1
+    for key in COUNT_KEYS:
+        stats[key] += counts[key]
+
+# ── Git-aware scanning ──────────────────────────────────────────────────────
 
-    for encoding in encodings:
+# Cache of classified counts for git blobs, shared across repos and runs
+CACHE_DIR = Path(__file__).resolve().parent / '.cache'
+BLOB_CACHE_FILE = CACHE_DIR / 'blob-counts.json'
+
+# Entries kept in the blob cache; the least recently used are dropped first
+BLOB_CACHE_MAX_ENTRIES = 200_000
+
+_GITLINK_MODE = 0o160000
+
+def find_git_dir(repo_root: Path):
+    """Return the git directory for a work tree (handles `.git` files), or None."""
+    git_path = repo_root / '.git'
+    if git_path.is_dir():
+        return git_path
+    if git_path.is_file():
         try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                return sum(1 for _ in f)
-        except (UnicodeDecodeError, PermissionError):
+            content = git_path.read_text(encoding='utf-8').strip()
+        except OSError:
+            return None
+        if content.startswith('gitdir:'):
+            git_dir = Path(content[len('gitdir:'):].strip())
+            if not git_dir.is_absolute():
+                git_dir = repo_root / git_dir
+            return git_dir if git_dir.is_dir() else None
+    return None
+
+def read_git_index(git_dir: Path) -> dict:
+    """
+    Parse `.git/index` directly (versions 2-4) without spawning git.
+
+    Returns dict mapping POSIX-style relative path -> (sha_hex, mtime_s,
+    mtime_ns, size) for stage-0 file entries. Submodule entries are skipped.
+    Raises ValueError for unsupported or corrupt indexes.
+    """
+    with open(git_dir / 'index', 'rb') as f:
+        data = f.read()
+
+    if len(data) < 12 or data[:4] != b'DIRC':
+        raise ValueError('not a git index')
+    version, entry_count = struct.unpack('>II', data[4:12])
+    if version not in (2, 3, 4):
+        raise ValueError(f'unsupported index version {version}')
+
+    entries = {}
+    pos = 12
+    previous_name = b''
+    for _ in range(entry_count):
+        entry_start = pos
+        (_ctime_s, _ctime_ns, mtime_s, mtime_ns, _dev, _ino, mode,
+         _uid, _gid, size) = struct.unpack('>10I', data[pos:pos + 40])
+        sha = data[pos + 40:pos + 60].hex()
+        flags, = struct.unpack('>H', data[pos + 60:pos + 62])
+        pos += 62
+        if flags & 0x4000:  # Extended flags (version 3+)
+            pos += 2
+
+        if version == 4:
+            # Prefix-compressed name: varint strip count, then NUL-terminated suffix
+            strip = data[pos] & 0x7F
+            while data[pos] & 0x80:
+                pos += 1
+                strip = ((strip + 1) << 7) | (data[pos] & 0x7F)
+            pos += 1
+            end = data.index(b'\0', pos)
+            name = previous_name[:len(previous_name) - strip] + data[pos:end]
+            pos = end + 1
+        else:
+            end = data.index(b'\0', pos)
+            name = data[pos:end]
+            # Entries are NUL-padded to a multiple of 8 bytes
+            pos = entry_start + ((end - entry_start + 8) & ~7)
+        previous_name = name
+
+        stage = (flags >> 12) & 0x3
+        if stage != 0 or mode == _GITLINK_MODE:
             continue
-        except Exception:
-            return 0
-    return 0
+        entries[name.decode('utf-8', 'surrogateescape')] = (sha, mtime_s, mtime_ns, size)
+
+    return entries
+
+def _translate_gitignore_glob(pattern: str) -> str:
+    """Translate a gitignore glob (with `**`) to a regex body."""
+    regex = []
+    i = 0
+    length = len(pattern)
+    while i < length:
+        c = pattern[i]
+        if c == '*':
+            if pattern[i:i + 3] == '**/':
+                regex.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern[i:i + 2] == '**':
+                regex.append('.*')
+                i += 2
+                continue
+            regex.append('[^/]*')
+        elif c == '?':
+            regex.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                regex.append('\\[')
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                regex.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < length:
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(c))
+        i += 1
+    return ''.join(regex)
+
+def parse_gitignore(lines) -> list:
+    """
+    Compile gitignore lines into rules: (regex, negate, dir_only, match_path).
+
+    match_path=True rules (patterns containing a non-trailing '/') are matched
+    against the path relative to the .gitignore's directory; others against
+    the basename only.
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip('\n').rstrip('\r')
+        if not line or line.startswith('#'):
+            continue
+        if not line.endswith('\\ '):
+            line = line.rstrip(' ')
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        match_path = '/' in line
+        line = line.lstrip('/')
+        regex = re.compile(_translate_gitignore_glob(line) + r'\Z', re.DOTALL)
+        rules.append((regex, negate, dir_only, match_path))
+    return rules
+
+def load_gitignore(path: Path) -> list:
+    """Read and compile a .gitignore-style file (missing files yield no rules)."""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return parse_gitignore(f)
+    except OSError:
+        return []
+
+def is_git_ignored(rel_path: str, is_dir: bool, rule_sets: list) -> bool:
+    """
+    Apply gitignore rules to a repo-relative POSIX path.
+
+    rule_sets: list of (base_dir, rules) from the repo root down to the
+    path's parent, where base_dir is the repo-relative directory ('' for the
+    root) the rules were loaded from. The last matching rule wins.
+    """
+    ignored = False
+    name = rel_path.rsplit('/', 1)[-1]
+    for base_dir, rules in rule_sets:
+        if base_dir:
+            if not rel_path.startswith(base_dir + '/'):
+                continue
+            local_path = rel_path[len(base_dir) + 1:]
+        else:
+            local_path = rel_path
+        for regex, negate, dir_only, match_path in rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(local_path if match_path else name):
+                ignored = not negate
+    return ignored
+
+def iter_git_worktree(repo_root: Path):
+    """
+    Walk a git work tree and yield (kind, path, blob_sha) records.
+
+    kind is one of:
+        'file'          - tracked or untracked, non-ignored file; blob_sha is
+                          set when the index stat data shows the file is
+                          unchanged, so cached counts for that blob apply
+        'ignored_file'  - untracked file matched by .gitignore, or inside an
+                          ignored directory that is only entered because it
+                          holds tracked files
+        'ignored_dir'   - directory matched by .gitignore (not descended)
+        'excluded_dir'  - hidden or node_modules directory (default rule)
+
+    Raises ValueError/OSError if the repository index cannot be read.
+    """
+    git_dir = find_git_dir(repo_root)
+    if git_dir is None:
+        raise ValueError(f'not a git work tree: {repo_root}')
+
+    index = read_git_index(git_dir)
+    index_mtime = (git_dir / 'index').stat().st_mtime
+
+    # Directories containing tracked files are never pruned as ignored
+    tracked_dirs = set()
+    for rel_path in index:
+        parts = rel_path.split('/')[:-1]
+        for i in range(1, len(parts) + 1):
+            tracked_dirs.add('/'.join(parts[:i]))
+
+    root_rules = load_gitignore(git_dir / 'info' / 'exclude') + load_gitignore(repo_root / '.gitignore')
+    # in_ignored: the directory (or an ancestor) is ignored but holds tracked
+    # files; like git, nothing untracked below it is counted
+    stack = [(repo_root, '', [('', root_rules)], False)]
+
+    while stack:
+        dir_path, rel_dir, rule_sets, in_ignored = stack.pop()
+        try:
+            entries = list(os.scandir(dir_path))
+        except OSError:
+            continue
+
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            path = Path(entry.path)
+
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name.startswith('.') or entry.name == 'node_modules':
+                    yield 'excluded_dir', path, None
+                    continue
+                ignored = in_ignored or is_git_ignored(rel_path, True, rule_sets)
+                if ignored and rel_path not in tracked_dirs:
+                    yield 'ignored_dir', path, None
+                else:
+                    child_rules = load_gitignore(path / '.gitignore')
+                    child_sets = rule_sets + [(rel_path, child_rules)] if child_rules else rule_sets
+                    stack.append((path, rel_path, child_sets, ignored))
+                continue
+
+            if not entry.is_file():
+                continue
+
+            index_entry = index.get(rel_path)
+            if index_entry is None:
+                if in_ignored or is_git_ignored(rel_path, False, rule_sets):
+                    yield 'ignored_file', path, None
+                else:
+                    yield 'file', path, None
+                continue
+
+            # Tracked file: reuse the blob SHA only if stat data proves it is
+            # unchanged (and not racily modified after the index was written)
+            sha, mtime_s, mtime_ns, size = index_entry
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            unchanged = (
+                st.st_size == size
+                and int(st.st_mtime) == mtime_s
+                and (mtime_ns == 0 or st.st_mtime_ns % 1_000_000_000 == mtime_ns)
+                and st.st_mtime < index_mtime
+            )
+            yield 'file', path, sha if unchanged else None
+
+def load_blob_cache(cache_file: Path = BLOB_CACHE_FILE) -> dict:
+    """Load cached counts keyed by "<blob sha>:<language>"."""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def save_blob_cache(cache: dict, cache_file: Path = BLOB_CACHE_FILE):
+    """
+    Persist the blob count cache (best effort).
+
+    Entries are kept in use order (hits are moved to the end), so trimming
+    the front down to BLOB_CACHE_MAX_ENTRIES drops the least recently used.
+    """
+    excess = len(cache) - BLOB_CACHE_MAX_ENTRIES
+    if excess > 0:
+        for key in list(cache)[:excess]:
+            del cache[key]
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, separators=(',', ':'))
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print(f"Warning: Could not save blob count cache: {e}", file=sys.stderr)
+
+# ── Config snapshot ──────────────────────────────────────────────────────────
+
+# Preprocessed config.json for counting, rebuilt when config.json changes
+CONFIG_SNAPSHOT_FILE = CACHE_DIR / 'config-snapshot.bin'
+CONFIG_SNAPSHOT_VERSION = 1
+
+def load_config_snapshot(config_path: Path, snapshot_file: Path = CONFIG_SNAPSHOT_FILE) -> dict:
+    """
+    The parts of config.json a count needs, with the exclusion rules compiled.
+
+    The first launch after config.json changes parses it and stores dev_root,
+    the lineCounter section and compile_exclusion_rules() output as a marshal
+    snapshot keyed by the config's path, mtime and size; later launches read
+    that instead. Raises OSError/KeyError/JSONDecodeError like reading
+    config.json directly.
+
+    Returns dict with dev_root (Path), line_counter and exclusion_rules.
+    """
+    st = os.stat(config_path)
+    key = (os.path.abspath(config_path), st.st_mtime_ns, st.st_size,
+           CONFIG_SNAPSHOT_VERSION, sys.version_info[:2])
+    snapshot = None
+    try:
+        with open(snapshot_file, 'rb') as f:
+            stored = marshal.load(f)
+        if stored['key'] == key:
+            snapshot = stored
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        pass
+
+    if snapshot is None:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        line_counter = config.get('lineCounter', {})
+        rules = compile_exclusion_rules(line_counter)
+        snapshot = {
+            'key': key,
+            'dev_root': config['paths']['devRoot'],
+            'line_counter': line_counter,
+            'exclusion_rules': {**rules, 'projects': {
+                name: {k: v for k, v in proj.items() if k != 'file_regex'}
+                for name, proj in rules['projects'].items()
+            }},
+        }
+        try:
+            snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = snapshot_file.with_suffix('.tmp')
+            with open(tmp_file, 'wb') as f:
+                marshal.dump(snapshot, f)
+            os.replace(tmp_file, snapshot_file)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not save config snapshot: {e}", file=sys.stderr)
+        snapshot['exclusion_rules'] = rules
+    else:
+        _compile_file_patterns(snapshot['exclusion_rules'])
+
+    return {
+        'dev_root': Path(snapshot['dev_root']),
+        'line_counter': snapshot['line_counter'],
+        'exclusion_rules': snapshot['exclusion_rules'],
+    }
+
+# ── Hierarchical count tree ─────────────────────────────────────────────────
+
+# Cached tree from the last --save-tree scan, answered by --subtree queries
+COUNT_TREE_FILE = CACHE_DIR / 'count-tree.json'
+COUNT_TREE_VERSION = 1
+
+# Per-directory totals stored in the tree (node 't' arrays follow this order)
+TREE_COUNTERS = ('files', *COUNT_KEYS, 'excluded_files', 'excluded_dirs', 'binary_files', 'large_files')
+
+# File leaves are [language, lines, blank, comment, code] or one of these markers
+TREE_EXCLUDED = 'x'
+TREE_BINARY = 'b'
+TREE_LARGE = 'L'
+_LEAF_COUNTER = {TREE_EXCLUDED: 'excluded_files', TREE_BINARY: 'binary_files', TREE_LARGE: 'large_files'}
+
+def new_count_tree() -> dict:
+    """Create an empty directory node: subdirs (d), files (f), excluded dirs (xd)."""
+    return {'d': {}, 'f': {}, 'xd': []}
+
+def tree_dir(tree: dict, rel_parts) -> dict:
+    """Return (creating as needed) the node for a directory below the tree root."""
+    node = tree
+    for part in rel_parts:
+        node = node['d'].get(part) or node['d'].setdefault(part, new_count_tree())
+    return node
+
+def _leaf_stats(leaf) -> tuple:
+    """Return (counter dict, language or None) for a file leaf."""
+    stats = dict.fromkeys(TREE_COUNTERS, 0)
+    if isinstance(leaf, list):
+        stats['files'] = 1
+        stats.update(zip(COUNT_KEYS, leaf[1:]))
+        return stats, leaf[0]
+    stats[_LEAF_COUNTER[leaf]] = 1
+    return stats, None
+
+def finalize_count_tree(node: dict) -> dict:
+    """
+    Compute per-directory totals bottom-up and drop empty containers.
+
+    Each directory node gains 't' (TREE_COUNTERS values) and 'l'
+    ({language: [files, lines, blank, comment, code]}).
+    """
+    totals = [0] * len(TREE_COUNTERS)
+    languages = {}
+
+    def _merge_languages(source: dict):
+        for language, values in source.items():
+            merged = languages.setdefault(language, [0] * len(LANGUAGE_COUNTERS))
+            for i, value in enumerate(values):
+                merged[i] += value
+
+    for child in node.get('d', {}).values():
+        finalize_count_tree(child)
+        for i, value in enumerate(child['t']):
+            totals[i] += value
+        _merge_languages(child['l'])
+
+    for leaf in node.get('f', {}).values():
+        stats, language = _leaf_stats(leaf)
+        for i, key in enumerate(TREE_COUNTERS):
+            totals[i] += stats[key]
+        if language is not None:
+            _merge_languages({language: [1, *leaf[1:]]})
+
+    totals[TREE_COUNTERS.index('excluded_dirs')] += len(node.get('xd', ()))
+    node['t'] = totals
+    node['l'] = languages
+    for key in ('d', 'f', 'xd'):
+        if not node.get(key):
+            node.pop(key, None)
+    return node
+
+def save_count_tree(tree: dict, base_path: Path, dev_root: Path, tree_file: Path = COUNT_TREE_FILE):
+    """Serialize a finalized count tree compactly (best effort)."""
+    payload = {
+        'version': COUNT_TREE_VERSION,
+        'base_path': str(base_path),
+        'dev_root': str(dev_root),
+        'created': time.time(),
+        'root': tree
+    }
+    try:
+        tree_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = tree_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(tmp_file, tree_file)
+    except OSError as e:
+        print(f"Warning: Could not save count tree: {e}", file=sys.stderr)
+
+def load_count_tree(tree_file: Path = COUNT_TREE_FILE):
+    """Load the cached count tree, or None if missing or from another version."""
+    try:
+        with open(tree_file, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if payload.get('version') != COUNT_TREE_VERSION:
+        return None
+    return payload
+
+def _node_project(name: str, node: dict) -> dict:
+    """Build a result project entry from a finalized directory node."""
+    stats = dict(zip(TREE_COUNTERS, node['t']))
+    languages = {
+        language: dict(zip(LANGUAGE_COUNTERS, values))
+        for language, values in node['l'].items()
+    }
+    return {'name': name, **_complete_stats(stats), 'languages': _sort_languages(languages)}
+
+def _complete_stats(stats: dict) -> dict:
+    """Fill run-only counters for results answered from the tree (nothing read)."""
+    stats = dict(stats)
+    stats.update({'bytes_read': 0, 'cached_files': stats['files'], 'elapsed': 0.0})
+    return {key: stats[key] for key in RESULT_COUNTERS}
+
+def find_count_tree_node(payload: dict, target: Path):
+    """
+    Locate target in a cached count tree without touching the disk.
+
+    Returns ('dir', node) or ('file', leaf), or None if target is outside
+    the tree or was not scanned.
+    """
+    try:
+        rel_path = target.relative_to(Path(payload['base_path']))
+    except ValueError:
+        return None
+
+    node = payload['root']
+    parts = rel_path.parts
+    for i, part in enumerate(parts):
+        subdirs = node.get('d', {})
+        if part in subdirs:
+            node = subdirs[part]
+        elif i == len(parts) - 1 and part in node.get('f', {}):
+            return 'file', node['f'][part]
+        else:
+            return None
+    return 'dir', node
+
+def query_count_tree(payload: dict, target: Path, found: tuple = None):
+    """
+    Answer a count for target (a directory or file under the cached tree's
+    base path) without touching the disk.
 
-def count_project_lines(base_path: Path, dev_root: Path = None, exclusion_config: dict = None):
-    """Count lines across all projects with exclusions."""
+    found: the find_count_tree_node() result, if the caller already has it.
+
+    Returns a result shaped like scan_project_lines() (or scan_single_file()
+    for files), or None if target is outside the tree or was not scanned.
+    """
+    start_time = time.time()
+    if found is None:
+        found = find_count_tree_node(payload, target)
+    if found is None:
+        return None
+
+    kind, node = found
+    if kind == 'file':
+        # File query: single-file result from the leaf
+        stats, language = _leaf_stats(node)
+        languages = {}
+        if language is not None:
+            languages[language] = dict(zip(LANGUAGE_COUNTERS, [1, *node[1:]]))
+        project = {'name': target.name, **_complete_stats(stats), 'languages': languages}
+        return {
+            'base_path': str(target),
+            'projects': [project],
+            'totals': {key: project[key] for key in RESULT_COUNTERS},
+            'languages': dict(languages),
+            'elapsed': time.time() - start_time
+        }
+
+    # Directory query: each child is a project, as when scanning target itself
+    projects = [_node_project(name, child) for name, child in node.get('d', {}).items()]
+    for name, leaf in node.get('f', {}).items():
+        stats, language = _leaf_stats(leaf)
+        languages = {}
+        if language is not None:
+            languages[language] = dict(zip(LANGUAGE_COUNTERS, [1, *leaf[1:]]))
+        projects.append({'name': name, **_complete_stats(stats), 'languages': languages})
+    for name in node.get('xd', ()):
+        stats = dict.fromkeys(TREE_COUNTERS, 0)
+        stats['excluded_dirs'] = 1
+        projects.append({'name': name, **_complete_stats(stats), 'languages': {}})
+
+    projects.sort(key=lambda p: p['lines'], reverse=True)
+    root_project = _node_project('', node)
+    return {
+        'base_path': str(target),
+        'projects': projects,
+        'totals': {key: root_project[key] for key in RESULT_COUNTERS},
+        'languages': root_project['languages'],
+        'elapsed': time.time() - start_time
+    }
+
+def scan_project_lines(base_path: Path, dev_root: Path = None, exclusion_config: dict = None,
+                       use_git: bool = False, previous_files: dict = None,
+                       file_records: list = None, count_tree: dict = None,
+                       blob_cache: dict = None, exclusion_rules: dict = None) -> dict:
+    """
+    Count lines across all projects with exclusions and return the result.
+
+    Performs no output, so the result can be rendered as a table, serialized
+    to JSON/CSV, or consumed directly by other tools.
+
+    use_git: for every directory containing `.git`, list files via the git
+        index instead of a plain walk. Untracked files honor .gitignore
+        (ignored build output is skipped and reported as excluded), and
+        unchanged tracked files reuse counts cached by blob SHA.
+    previous_files: per-file records from a snapshot (see
+        load_snapshot_files); files whose size, mtime and language match
+        reuse the recorded counts instead of being read.
+    file_records: if given, a per-file record (path, project, size,
+        mtime_ns, language, lines, blank, comment, code) is appended for
+        every counted file, for saving as a snapshot.
+    count_tree: if given (see new_count_tree), every file and excluded
+        directory is recorded into this hierarchical tree in the same scan;
+        finalize it with finalize_count_tree() to get per-directory totals.
+    blob_cache: the blob count cache for use_git, if the caller keeps one
+        loaded across scans (console-worker.py); read from disk otherwise.
+        New entries are added to it and saved.
+    exclusion_rules: exclusion_config already compiled with
+        compile_exclusion_rules() (e.g. from load_config_snapshot());
+        compiled here otherwise.
+
+    Returns dict with:
+        - base_path: analyzed path
+        - projects: list of per-project dicts (name, files, lines, blank,
+          comment, code, excluded_files, excluded_dirs, binary_files,
+          large_files, bytes_read, cached_files, elapsed, languages), sorted
+          by lines descending
+        - totals: the same counters summed across all projects
+        - languages: {language: {files, lines, blank, comment, code}} totals
+        - elapsed: wall-clock seconds for the whole scan
+
+    Each file is read once; blank/comment/code classification happens in
+    the same pass as line counting. Binary files (NUL byte in the first
+    block) are counted in binary_files after one small read, and files over
+    lineCounter.maxFileSizeMB are counted in large_files without being read.
+    """
     start_time = time.time()
 
     # If dev_root not specified, assume base_path is the dev root
@@ -151,19 +1040,133 @@ def count_project_lines(base_path: Path, dev_root: Path = None, exclusion_config
     # If exclusion_config not provided, use empty dict (no exclusions except defaults)
     if exclusion_config is None:
         exclusion_config = {}
+    if exclusion_rules is None:
+        exclusion_rules = compile_exclusion_rules(exclusion_config)
 
     # Track both included and excluded items per project
     project_stats = defaultdict(lambda: {
         'files': 0, 'lines': 0,
-        'excluded_files': 0, 'excluded_dirs': 0
+        'blank': 0, 'comment': 0, 'code': 0,
+        'excluded_files': 0, 'excluded_dirs': 0,
+        'binary_files': 0, 'large_files': 0,
+        'bytes_read': 0, 'cached_files': 0, 'elapsed': 0.0,
+        'languages': {}
     })
 
-    total_files = 0
-    total_lines = 0
-    total_excluded_files = 0
-    total_excluded_dirs = 0
+    max_file_size = int(exclusion_config.get('maxFileSizeMB', DEFAULT_MAX_FILE_SIZE_MB) * 1024 * 1024)
+
+    if use_git and blob_cache is None:
+        blob_cache = load_blob_cache()
+    blob_cache_added = 0
+
+    def project_of(path: Path) -> str:
+        """Top-level directory under base_path that a path belongs to."""
+        rel_path = path.relative_to(base_path)
+        return rel_path.parts[0] if len(rel_path.parts) > 0 else 'root'
+
+    def count_file(file_path: Path, blob_sha: str = None):
+        nonlocal blob_cache_added
+        file_start = time.perf_counter()
+
+        try:
+            rel_path = file_path.relative_to(base_path)
+        except ValueError:
+            return
+        project = rel_path.parts[0] if len(rel_path.parts) > 0 else 'root'
+        stats = project_stats[project]
+        tree_leaf = None
+
+        try:
+            if should_exclude(file_path, base_path, dev_root, exclusion_rules):
+                stats['excluded_files'] += 1
+                tree_leaf = TREE_EXCLUDED
+                return
+
+            language = detect_language(file_path)
+            st = file_path.stat()
+            rel_key = rel_path.as_posix()
+            cache_key = f"{blob_sha}:{language}" if blob_sha else None
+            previous = previous_files.get(rel_key) if previous_files else None
+
+            if cache_key and cache_key in blob_cache:
+                # Move to the end: the cache is trimmed least recently used first
+                cached = blob_cache[cache_key] = blob_cache.pop(cache_key)
+                counts = dict(zip(COUNT_KEYS, cached))
+                stats['cached_files'] += 1
+            elif previous and previous[:3] == (st.st_size, st.st_mtime_ns, language):
+                # Unchanged since the previous snapshot: reuse its counts
+                counts = dict(zip(COUNT_KEYS, previous[3:]))
+                stats['cached_files'] += 1
+            elif st.st_size > max_file_size:
+                stats['large_files'] += 1
+                tree_leaf = TREE_LARGE
+                return
+            else:
+                counts = classify_file(file_path, language)
+                if counts is None:
+                    stats['binary_files'] += 1
+                    stats['bytes_read'] += min(st.st_size, BINARY_SNIFF_BYTES)
+                    tree_leaf = TREE_BINARY
+                    return
+                stats['bytes_read'] += st.st_size
+                if cache_key:
+                    blob_cache[cache_key] = [counts[key] for key in COUNT_KEYS]
+                    blob_cache_added += 1
+
+            stats['files'] += 1
+            for key in COUNT_KEYS:
+                stats[key] += counts[key]
+            _add_language_counts(stats['languages'], language, counts)
+            tree_leaf = [language, *(counts[key] for key in COUNT_KEYS)]
+
+            if file_records is not None:
+                file_records.append((rel_key, project, st.st_size, st.st_mtime_ns, language,
+                                     *(counts[key] for key in COUNT_KEYS)))
+
+        except Exception as e:
+            return
+        finally:
+            stats['elapsed'] += time.perf_counter() - file_start
+            if count_tree is not None and tree_leaf is not None:
+                tree_dir(count_tree, rel_path.parts[:-1])['f'][rel_path.name] = tree_leaf
+
+    def record_excluded_dir(dir_path: Path):
+        rel_path = dir_path.relative_to(base_path)
+        project_stats[project_of(dir_path)]['excluded_dirs'] += 1
+        if count_tree is not None:
+            tree_dir(count_tree, rel_path.parts[:-1])['xd'].append(rel_path.name)
+
+    def scan_git_repo(repo_root: Path) -> bool:
+        """Count a git work tree via its index; False if the index is unusable."""
+        try:
+            records = list(iter_git_worktree(repo_root))
+        except (OSError, ValueError, struct.error):
+            return False
+
+        for kind, path, blob_sha in records:
+            if kind == 'file':
+                count_file(path, blob_sha)
+            elif kind == 'ignored_file':
+                try:
+                    rel_path = path.relative_to(base_path)
+                except ValueError:
+                    continue
+                project_stats[project_of(path)]['excluded_files'] += 1
+                if count_tree is not None:
+                    tree_dir(count_tree, rel_path.parts[:-1])['f'][rel_path.name] = TREE_EXCLUDED
+            else:
+                try:
+                    record_excluded_dir(path)
+                except ValueError:
+                    continue
+        return True
+
+    if use_git and find_git_dir(base_path) is not None and scan_git_repo(base_path):
+        walker = ()
+    else:
+        walker = os.walk(base_path)
 
-    for root, dirs, files in os.walk(base_path):
+    for root, dirs, files in walker:
         # Track excluded directories (.git, .hidden, node_modules)
         original_dirs = dirs.copy()
         dirs[:] = [d for d in dirs if not d.startswith('.') and d != 'node_modules']
@@ -172,41 +1175,96 @@ def count_project_lines(base_path: Path, dev_root: Path = None, exclusion_config
         for d in original_dirs:
             if d not in dirs:
                 try:
-                    dir_path = Path(root) / d
-                    rel_path = dir_path.relative_to(base_path)
-                    project = rel_path.parts[0] if len(rel_path.parts) > 0 else 'root'
-                    project_stats[project]['excluded_dirs'] += 1
-                    total_excluded_dirs += 1
+                    record_excluded_dir(Path(root) / d)
                 except:
                     continue
 
-        for file in files:
-            file_path = Path(root) / file
-
-            try:
-                rel_path = file_path.relative_to(base_path)
-                project = rel_path.parts[0] if len(rel_path.parts) > 0 else 'root'
+        # Hand git repositories to the index-based scanner
+        if use_git:
+            for d in list(dirs):
+                repo_root = Path(root) / d
+                if (repo_root / '.git').exists() and scan_git_repo(repo_root):
+                    dirs.remove(d)
 
-                if should_exclude(file_path, base_path, dev_root, exclusion_config):
-                    project_stats[project]['excluded_files'] += 1
-                    total_excluded_files += 1
-                    continue
-
-                lines = count_lines_in_file(file_path)
+        for file in files:
+            count_file(Path(root) / file)
 
-                project_stats[project]['files'] += 1
-                project_stats[project]['lines'] += lines
-                total_files += 1
-                total_lines += lines
+    if use_git and blob_cache_added:
+        save_blob_cache(blob_cache)
 
-            except Exception as e:
-                continue
-
-    # Display results
+    # Sort by lines descending (included items only)
+    projects = [
+        {'name': name, **stats, 'languages': _sort_languages(stats['languages'])}
+        for name, stats in sorted(project_stats.items(),
+                                  key=lambda x: x[1]['lines'],
+                                  reverse=True)
+    ]
+
+    totals = {key: sum(p[key] for p in projects) for key in RESULT_COUNTERS}
+
+    languages = {}
+    for project in projects:
+        for language, lang_stats in project['languages'].items():
+            merged = languages.setdefault(language, _new_language_stats())
+            for key in LANGUAGE_COUNTERS:
+                merged[key] += lang_stats[key]
+
+    return {
+        'base_path': str(base_path),
+        'projects': projects,
+        'totals': totals,
+        'languages': _sort_languages(languages),
+        'elapsed': time.time() - start_time
+    }
+
+def scan_single_file(file_path: Path) -> dict:
+    """Count a single file and return a result shaped like scan_project_lines()."""
+    start_time = time.time()
+    language = detect_language(file_path)
+    counts = classify_file(file_path, language)
+    elapsed = time.time() - start_time
+    size = file_path.stat().st_size
+
+    languages = {}
+    if counts is None:
+        # Binary: report it, but without lines or a language entry
+        stats = {
+            'files': 0, 'lines': 0, 'blank': 0, 'comment': 0, 'code': 0,
+            'binary_files': 1, 'bytes_read': min(size, BINARY_SNIFF_BYTES)
+        }
+    else:
+        stats = {'files': 1, **counts, 'binary_files': 0, 'bytes_read': size}
+        _add_language_counts(languages, language, counts)
+    stats.update({
+        'excluded_files': 0, 'excluded_dirs': 0, 'large_files': 0,
+        'cached_files': 0, 'elapsed': elapsed
+    })
+    stats = {key: stats[key] for key in RESULT_COUNTERS}
+    return {
+        'base_path': str(file_path),
+        'projects': [{'name': file_path.name, **stats, 'languages': languages}],
+        'totals': dict(stats),
+        'languages': dict(languages),
+        'elapsed': elapsed
+    }
+
+def format_excluded(files: int, dirs: int, empty: str = "0", large: int = 0) -> str:
+    """Format excluded counts as "26(f), 1(d), 2(L)"."""
+    excluded_parts = []
+    if files > 0:
+        excluded_parts.append(f"{files}(f)")
+    if dirs > 0:
+        excluded_parts.append(f"{dirs}(d)")
+    if large > 0:
+        excluded_parts.append(f"{large}(L)")
+    return ", ".join(excluded_parts) if excluded_parts else empty
+
+def print_project_table(result: dict):
+    """Display a scan result as the colored per-project table."""
     print("\n" + "="*80)
-    print(f"ANALYZING: {base_path}")
+    print(f"ANALYZING: {result['base_path']}")
     print("="*80)
-    print(f"{'Project':<30} {'Files':>10} {'Lines':>13} {'Excluded':>15} {'Status':<10}")
+    print(f"{'Project':<25} {'Files':>9} {'Lines':>12} {'Binary':>8} {'Excluded':>12} {'Status':<9}")
     print("-"*80)
 
     # Color codes for terminal output
@@ -215,58 +1273,307 @@ def count_project_lines(base_path: Path, dev_root: Path = None, exclusion_config
     YELLOW = '\033[93m'  # Highlighting
     RESET = '\033[0m'
 
-    # Sort by lines descending (included items only)
-    sorted_projects = sorted(project_stats.items(),
-                            key=lambda x: x[1]['lines'],
-                            reverse=True)
-
-    for project, stats in sorted_projects:
+    for stats in result['projects']:
+        project = stats['name']
         # Determine if this project has any included files
         has_included = stats['files'] > 0
-        has_excluded = stats['excluded_files'] > 0 or stats['excluded_dirs'] > 0
+        has_excluded = (stats['excluded_files'] > 0 or stats['excluded_dirs'] > 0
+                        or stats['large_files'] > 0 or stats['binary_files'] > 0)
 
         if has_included:
             # Show included files (normal white text)
-            excluded_parts = []
-            if stats['excluded_files'] > 0:
-                excluded_parts.append(f"{stats['excluded_files']}(f)")
-            if stats['excluded_dirs'] > 0:
-                excluded_parts.append(f"{stats['excluded_dirs']}(d)")
-            excluded_count = ", ".join(excluded_parts) if excluded_parts else "0"
+            excluded_count = format_excluded(stats['excluded_files'], stats['excluded_dirs'],
+                                             large=stats['large_files'])
 
             color = WHITE if has_excluded else RESET
-            print(f"{color}{project:<30} {stats['files']:>10,} {stats['lines']:>13,} {excluded_count:>15} {'included':<10}{RESET}")
+            print(f"{color}{project:<25} {stats['files']:>9,} {stats['lines']:>12,} "
+                  f"{stats['binary_files']:>8,} {excluded_count:>12} {'included':<9}{RESET}")
 
         if has_excluded and not has_included:
             # Show projects that are entirely excluded (gray text)
-            excluded_parts = []
-            if stats['excluded_files'] > 0:
-                excluded_parts.append(f"{stats['excluded_files']}(f)")
-            if stats['excluded_dirs'] > 0:
-                excluded_parts.append(f"{stats['excluded_dirs']}(d)")
-            excluded_desc = ", ".join(excluded_parts)
+            excluded_desc = format_excluded(stats['excluded_files'], stats['excluded_dirs'], empty="",
+                                            large=stats['large_files'])
 
-            print(f"{GRAY}{project:<30} {'---':>10} {'---':>13} {excluded_desc:>15} {'excluded':<10}{RESET}")
+            print(f"{GRAY}{project:<25} {'---':>9} {'---':>12} {stats['binary_files']:>8,} "
+                  f"{excluded_desc:>12} {'excluded':<9}{RESET}")
 
-    elapsed = time.time() - start_time
+    totals = result['totals']
 
     print("="*80)
-    print(f"{'TOTAL INCLUDED':<30} {total_files:>10,} {total_lines:>13,} {'':<15} {'':<10}")
+    print(f"{'TOTAL INCLUDED':<25} {totals['files']:>9,} {totals['lines']:>12,} {'':<8} {'':<12} {'':<9}")
 
     # Format total excluded
-    excluded_parts = []
-    if total_excluded_files > 0:
-        excluded_parts.append(f"{total_excluded_files}(f)")
-    if total_excluded_dirs > 0:
-        excluded_parts.append(f"{total_excluded_dirs}(d)")
-    total_excluded_desc = ", ".join(excluded_parts) if excluded_parts else "0"
+    total_excluded_desc = format_excluded(totals['excluded_files'], totals['excluded_dirs'],
+                                          large=totals['large_files'])
 
-    print(f"{GRAY}{'TOTAL EXCLUDED':<30} {'---':>10} {'---':>13} {total_excluded_desc:>15} {'':<10}{RESET}")
+    print(f"{GRAY}{'TOTAL EXCLUDED':<25} {'---':>9} {'---':>12} {totals['binary_files']:>8,} "
+          f"{total_excluded_desc:>12} {'':<9}{RESET}")
     print("="*80)
-    print(f"\nProcessing time: {elapsed:.2f} seconds")
-    print(f"Legend: {WHITE}Normal text{RESET} = included, {GRAY}Gray{RESET} = excluded | Format: X(f)=files, X(d)=dirs")
+    print_language_table(result['languages'])
+    print(f"\nProcessing time: {result['elapsed']:.2f} seconds")
+    print(f"Legend: {WHITE}Normal text{RESET} = included, {GRAY}Gray{RESET} = excluded | "
+          f"Format: X(f)=files, X(d)=dirs, X(L)=over size limit")
     print("="*80)
 
+def print_file_table(result: dict):
+    """Display a single-file scan result in the standard table format."""
+    stats = result['projects'][0]
+    status = 'binary' if stats['binary_files'] else 'included'
+
+    print("\n" + "="*80)
+    print(f"ANALYZING: {result['base_path']}")
+    print("="*80)
+    print(f"{'File':<30} {'Files':>10} {'Lines':>13} {'Excluded':>15} {'Status':<10}")
+    print("-"*80)
+    print(f"{stats['name']:<30} {1:>10,} {stats['lines']:>13,} {'0':>15} {status:<10}")
+    print("="*80)
+    print(f"{'TOTAL':<30} {1:>10,} {stats['lines']:>13,}")
+    print("="*80)
+    print_language_table(result['languages'])
+
+def print_language_table(languages: dict):
+    """Display the per-language code/comment/blank breakdown."""
+    if not languages:
+        return
+
+    print(f"{'Language':<20} {'Files':>10} {'Code':>13} {'Comment':>11} {'Blank':>11} {'Lines':>11}")
+    print("-"*80)
+    for language, stats in languages.items():
+        print(f"{language:<20} {stats['files']:>10,} {stats['code']:>13,} {stats['comment']:>11,} {stats['blank']:>11,} {stats['lines']:>11,}")
+    print("="*80)
+
+def format_result_json(result: dict) -> str:
+    """Serialize a scan result as JSON."""
+    return json.dumps(result, indent=2)
+
+def format_result_csv(result: dict) -> str:
+    """
+    Serialize a scan result as CSV.
+
+    Each project gets a row with language "*" followed by one row per
+    language; the TOTAL rows follow the same layout. Per-language rows leave
+    the exclusion, bytes and timing columns empty.
+    """
+    import csv
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(['project', 'language', *RESULT_COUNTERS])
+
+    def _write_rows(name, stats, languages):
+        writer.writerow([name, '*', *(_csv_value(stats[key]) for key in RESULT_COUNTERS)])
+        for language, lang_stats in languages.items():
+            writer.writerow([name, language, *(lang_stats.get(key, '') for key in RESULT_COUNTERS)])
+
+    for stats in result['projects']:
+        _write_rows(stats['name'], stats, stats['languages'])
+    _write_rows('TOTAL', result['totals'], result['languages'])
+    return buffer.getvalue()
+
+def _csv_value(value):
+    """Round float timings so CSV output stays diff-friendly."""
+    return f"{value:.4f}" if isinstance(value, float) else value
+
+def emit_result(result: dict, output_format: str):
+    """Write a scan result to stdout in a machine-readable format."""
+    if output_format == 'json':
+        print(format_result_json(result))
+    elif output_format == 'csv':
+        sys.stdout.write(format_result_csv(result))
+
+# ── Snapshots ───────────────────────────────────────────────────────────────
+
+SNAPSHOT_DB = CACHE_DIR / 'snapshots.sqlite'
+
+# Project-level counters stored per snapshot and compared in delta reports
+SNAPSHOT_COUNTERS = ('files', *COUNT_KEYS, 'excluded_files', 'excluded_dirs')
+
+_SNAPSHOT_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    base_path TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS project_counts (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    project TEXT NOT NULL,
+    {', '.join(f'{key} INTEGER NOT NULL' for key in SNAPSHOT_COUNTERS)},
+    PRIMARY KEY (snapshot_id, project)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS file_counts (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    project TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    {', '.join(f'{key} INTEGER NOT NULL' for key in COUNT_KEYS)},
+    PRIMARY KEY (snapshot_id, path)
+) WITHOUT ROWID;
+"""
+
+def open_snapshot_db(db_path: Path = SNAPSHOT_DB) -> sqlite3.Connection:
+    """Open (creating if needed) the SQLite snapshot store."""
+    import sqlite3
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.executescript(_SNAPSHOT_SCHEMA)
+    return conn
+
+def find_snapshot(conn: sqlite3.Connection, name: str, base_path: Path = None):
+    """
+    Look up a snapshot by name; 'latest' selects the most recent snapshot of
+    base_path. Returns (id, name, base_path, created) or None.
+    """
+    if name == 'latest':
+        return conn.execute(
+            'SELECT id, name, base_path, created FROM snapshots'
+            ' WHERE base_path = ? ORDER BY created DESC LIMIT 1',
+            (str(base_path),)
+        ).fetchone()
+    return conn.execute(
+        'SELECT id, name, base_path, created FROM snapshots WHERE name = ?', (name,)
+    ).fetchone()
+
+def list_snapshots(conn: sqlite3.Connection) -> list:
+    """Return [(name, base_path, created, files, lines)] newest first."""
+    return conn.execute(
+        'SELECT s.name, s.base_path, s.created,'
+        ' COALESCE(SUM(p.files), 0), COALESCE(SUM(p.lines), 0)'
+        ' FROM snapshots s LEFT JOIN project_counts p ON p.snapshot_id = s.id'
+        ' GROUP BY s.id ORDER BY s.created DESC'
+    ).fetchall()
+
+def save_snapshot(conn: sqlite3.Connection, result: dict, file_records: list, name: str = None) -> str:
+    """
+    Persist a scan result and its per-file records; returns the snapshot name.
+
+    An explicit name replaces the snapshot of that name. The default
+    timestamp name never does: a second run within the same second gets a
+    numbered suffix instead.
+    """
+    created = time.time()
+
+    with conn:
+        if name:
+            conn.execute('DELETE FROM snapshots WHERE name = ?', (name,))
+        else:
+            stamp = time.strftime('%Y-%m-%d_%H%M%S', time.localtime(created))
+            name = stamp
+            suffix = 1
+            while conn.execute('SELECT 1 FROM snapshots WHERE name = ?', (name,)).fetchone():
+                suffix += 1
+                name = f"{stamp}_{suffix}"
+        snapshot_id = conn.execute(
+            'INSERT INTO snapshots (name, base_path, created) VALUES (?, ?, ?)',
+            (name, result['base_path'], created)
+        ).lastrowid
+        conn.executemany(
+            f'INSERT INTO project_counts VALUES (?, ?, {", ".join("?" * len(SNAPSHOT_COUNTERS))})',
+            [(snapshot_id, p['name'], *(p[key] for key in SNAPSHOT_COUNTERS)) for p in result['projects']]
+        )
+        conn.executemany(
+            f'INSERT INTO file_counts VALUES (?, {", ".join("?" * (5 + len(COUNT_KEYS)))})',
+            [(snapshot_id, *record) for record in file_records]
+        )
+    return name
+
+def load_snapshot_files(conn: sqlite3.Connection, snapshot_id: int) -> dict:
+    """Map relative path -> (size, mtime_ns, language, lines, blank, comment, code)."""
+    rows = conn.execute(
+        f'SELECT path, size, mtime_ns, language, {", ".join(COUNT_KEYS)}'
+        ' FROM file_counts WHERE snapshot_id = ?', (snapshot_id,)
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+def load_snapshot_projects(conn: sqlite3.Connection, snapshot_id: int) -> dict:
+    """Map project -> {counter: value} for a snapshot."""
+    rows = conn.execute(
+        f'SELECT project, {", ".join(SNAPSHOT_COUNTERS)} FROM project_counts WHERE snapshot_id = ?',
+        (snapshot_id,)
+    )
+    return {row[0]: dict(zip(SNAPSHOT_COUNTERS, row[1:])) for row in rows}
+
+def compute_delta(previous_projects: dict, result: dict) -> list:
+    """
+    Compare a scan result with a snapshot's project counts.
+
+    Returns one dict per project present in either (name, status, and for
+    each counter: <counter>_before, <counter>_after, <counter>_delta),
+    sorted by line growth descending. status is 'added', 'removed',
+    'changed' or 'unchanged'.
+    """
+    current = {p['name']: p for p in result['projects']}
+    empty = {key: 0 for key in SNAPSHOT_COUNTERS}
+    delta = []
+
+    for name in set(previous_projects) | set(current):
+        before = previous_projects.get(name, empty)
+        after = current.get(name, empty)
+        row = {'name': name}
+        for key in SNAPSHOT_COUNTERS:
+            row[f'{key}_before'] = before[key]
+            row[f'{key}_after'] = after[key]
+            row[f'{key}_delta'] = after[key] - before[key]
+
+        if name not in previous_projects:
+            row['status'] = 'added'
+        elif name not in current:
+            row['status'] = 'removed'
+        elif any(row[f'{key}_delta'] for key in SNAPSHOT_COUNTERS):
+            row['status'] = 'changed'
+        else:
+            row['status'] = 'unchanged'
+        delta.append(row)
+
+    delta.sort(key=lambda r: (r['lines_delta'], r['lines_after']), reverse=True)
+    return delta
+
+def print_delta_table(delta: list, since: str):
+    """Display per-project growth since a snapshot."""
+    GRAY = '\033[90m'
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    RESET = '\033[0m'
+
+    print("\n" + "="*80)
+    print(f"CHANGES SINCE SNAPSHOT: {since}")
+    print("="*80)
+    print(f"{'Project':<26} {'Lines Then':>11} {'Lines Now':>11} {'Δ Lines':>9} {'Δ Files':>8} {'Status':<9}")
+    print("-"*80)
+
+    for row in delta:
+        change = row['lines_delta']
+        color = GREEN if change > 0 else RED if change < 0 else GRAY
+        print(f"{color}{row['name']:<26} {row['lines_before']:>11,} {row['lines_after']:>11,} "
+              f"{change:>+9,} {row['files_delta']:>+8,} {row['status']:<9}{RESET}")
+
+    lines_before = sum(r['lines_before'] for r in delta)
+    lines_after = sum(r['lines_after'] for r in delta)
+    files_delta = sum(r['files_delta'] for r in delta)
+    print("="*80)
+    print(f"{'TOTAL':<26} {lines_before:>11,} {lines_after:>11,} {lines_after - lines_before:>+9,} {files_delta:>+8,}")
+    print("="*80)
+
+def format_delta_csv(delta: list) -> str:
+    """Serialize a delta report as CSV."""
+    import csv
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    columns = [f'{key}_{part}' for key in SNAPSHOT_COUNTERS for part in ('before', 'after', 'delta')]
+    writer.writerow(['project', 'status', *columns])
+    for row in delta:
+        writer.writerow([row['name'], row['status'], *(row[col] for col in columns)])
+    return buffer.getvalue()
+
+def count_project_lines(base_path: Path, dev_root: Path = None, exclusion_config: dict = None,
+                        use_git: bool = False) -> dict:
+    """Count lines across all projects with exclusions and print the table."""
+    result = scan_project_lines(base_path, dev_root, exclusion_config, use_git=use_git)
+    print_project_table(result)
+    return result
+
 def save_config(config_path: Path, config: dict) -> bool:
     """Save configuration to config.json with pretty formatting."""
     try:
@@ -531,6 +1838,12 @@ Examples:
   count-lines.py --add-ext .zip               # Add .zip to exclusions
   count-lines.py --add-pattern backup         # Add backup paths to exclusions
   count-lines.py --manage                     # Interactive management
+  count-lines.py --format json                # Structured output for tooling
+  count-lines.py --git                        # Git-aware counting with blob cache
+  count-lines.py --snapshot                   # Count and save a snapshot
+  count-lines.py --since latest --snapshot    # Growth since last snapshot, then save
+  count-lines.py --save-tree                  # Count devRoot and cache the count tree
+  count-lines.py --subtree C:\\dev\\myapp      # Answer from the cached tree
         '''
     )
 
@@ -542,6 +1855,19 @@ Examples:
     parser.add_argument('--add-pattern', metavar='PAT', action='append', help='Add global path pattern exclusion (e.g., backup)')
     parser.add_argument('--remove-ext', metavar='EXT', action='append', help='Remove global extension exclusion')
     parser.add_argument('--remove-pattern', metavar='PAT', action='append', help='Remove global path pattern exclusion')
+    parser.add_argument('--format', choices=['table', 'json', 'csv'], default='table',
+                        help='Output format for counting results (default: table)')
+    parser.add_argument('--git', action='store_true',
+                        help='List files in git repositories from the index and honor .gitignore')
+    parser.add_argument('--snapshot', metavar='NAME', nargs='?', const='',
+                        help='Save this run as a snapshot (default name: timestamp)')
+    parser.add_argument('--since', metavar='NAME',
+                        help="Report per-project growth since a snapshot ('latest' for the most recent)")
+    parser.add_argument('--list-snapshots', action='store_true', help='List saved snapshots')
+    parser.add_argument('--save-tree', action='store_true',
+                        help='Cache the per-directory/per-file count tree of this scan for --subtree queries')
+    parser.add_argument('--subtree', metavar='PATH',
+                        help='Answer the count for PATH from the cached tree (scans PATH if not cached)')
 
     args = parser.parse_args()
 
@@ -550,19 +1876,29 @@ Examples:
         config_path = Path(args.config)
     # else: config_path already set above (line 520)
 
-    # Load config
+    # Load config (from the preprocessed snapshot unless config.json changed)
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        dev_root = Path(config['paths']['devRoot'])
+        snapshot = load_config_snapshot(config_path)
+        dev_root = snapshot['dev_root']
+        exclusion_config = snapshot['line_counter']
     except (FileNotFoundError, KeyError, json.JSONDecodeError) as e:
         print(f"Error: Could not read config.json: {e}")
         print(f"Expected config at: {config_path}")
         sys.exit(1)
 
     # Handle management commands
+    if args.list_snapshots:
+        with contextlib.closing(open_snapshot_db()) as conn:
+            snapshots = list_snapshots(conn)
+        if not snapshots:
+            print("No snapshots saved yet (use --snapshot).")
+        for name, snap_base, created, files, lines in snapshots:
+            stamp = time.strftime('%Y-%m-%d %H:%M', time.localtime(created))
+            print(f"{name:<24} {stamp:<17} {files:>8,} files {lines:>12,} lines  {snap_base}")
+        sys.exit(0)
+
     if args.show_exclusions:
-        show_exclusions(config)
+        show_exclusions({'lineCounter': exclusion_config})
         sys.exit(0)
 
     if args.manage:
@@ -597,8 +1933,33 @@ Examples:
         print("\nExclusions updated successfully!")
         sys.exit(0)
 
-    # Load exclusion configuration for counting
-    exclusion_config = load_exclusion_config(config_path)
+    # Answer subtree queries from the cached count tree when it covers the path
+    if args.subtree:
+        target = Path(os.path.abspath(args.subtree))
+        payload = load_count_tree()
+        result = None
+        found = None
+        if (payload is not None
+                and payload['dev_root'] == str(dev_root)
+                and payload['created'] >= config_path.stat().st_mtime):
+            found = find_count_tree_node(payload, target)
+            result = query_count_tree(payload, target, found)
+
+        if result is not None:
+            if args.format != 'table':
+                emit_result(result, args.format)
+            else:
+                # File or directory as it was when the tree was cached, not as it is now
+                if found[0] == 'file':
+                    print_file_table(result)
+                else:
+                    print_project_table(result)
+                stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(payload['created']))
+                print(f"(From cached scan of {payload['base_path']} at {stamp})")
+            sys.exit(0)
+
+        print(f"Note: No cached count tree covers {target}; scanning it.", file=sys.stderr)
+        args.path = str(target)
 
     # Determine path to analyze
     if args.path:
@@ -619,23 +1980,60 @@ Examples:
 
         # If it's a file, count just that file
         if base_path.is_file():
-            lines = count_lines_in_file(base_path)
-            filename = base_path.name
-
-            # Display in standard table format
-            print("\n" + "="*80)
-            print(f"ANALYZING: {base_path}")
-            print("="*80)
-            print(f"{'File':<30} {'Files':>10} {'Lines':>13} {'Excluded':>15} {'Status':<10}")
-            print("-"*80)
-            print(f"{filename:<30} {1:>10,} {lines:>13,} {'0':>15} {'included':<10}")
-            print("="*80)
-            print(f"{'TOTAL':<30} {1:>10,} {lines:>13,}")
-            print("="*80)
+            result = scan_single_file(base_path)
+            if args.format == 'table':
+                print_file_table(result)
+            else:
+                emit_result(result, args.format)
             sys.exit(0)
     else:
         # Default to devRoot from config.json
         base_path = dev_root
 
+    # Snapshot support: reuse per-file counts from the reference snapshot and
+    # optionally record this run
+    previous_files = None
+    previous_projects = None
+    file_records = [] if args.snapshot is not None else None
+
+    if args.snapshot is not None or args.since:
+        with contextlib.closing(open_snapshot_db()) as snapshot_conn:
+            reference = find_snapshot(snapshot_conn, args.since or 'latest', base_path)
+            if args.since and reference is None:
+                print(f"Error: Snapshot not found: {args.since} (see --list-snapshots)")
+                sys.exit(1)
+            if reference is not None:
+                if reference[2] == str(base_path):
+                    previous_files = load_snapshot_files(snapshot_conn, reference[0])
+                if args.since:
+                    previous_projects = load_snapshot_projects(snapshot_conn, reference[0])
+
+    count_tree = new_count_tree() if args.save_tree else None
+
     # Run line counting
-    count_project_lines(base_path, dev_root, exclusion_config)
+    result = scan_project_lines(base_path, dev_root, exclusion_config, use_git=args.git,
+                                previous_files=previous_files, file_records=file_records,
+                                count_tree=count_tree, exclusion_rules=snapshot['exclusion_rules'])
+
+    if count_tree is not None:
+        save_count_tree(finalize_count_tree(count_tree), base_path, dev_root)
+
+    delta = compute_delta(previous_projects, result) if previous_projects is not None else None
+
+    if args.format == 'table':
+        print_project_table(result)
+        if delta is not None:
+            print_delta_table(delta, args.since)
+    elif args.format == 'csv' and delta is not None:
+        sys.stdout.write(format_delta_csv(delta))
+    else:
+        if delta is not None:
+            result['since'] = args.since
+            result['delta'] = delta
+        emit_result(result, args.format)
+
+    if file_records is not None:
+        # Reopened rather than held open through the scan
+        with contextlib.closing(open_snapshot_db()) as snapshot_conn:
+            name = save_snapshot(snapshot_conn, result, file_records, args.snapshot)
+        print(f"Snapshot saved: {name}", file=sys.stderr)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Startup import check for the console's Python scripts.
+
+Each script is imported (without running main) in a fresh interpreter with
+`python -X importtime`. The check fails when a module that should only load
+on demand shows up among the startup imports, or when the total import time
+exceeds --budget-ms. Run it after touching a script's imports.
+
+Usage:
+    python scripts/check-import-time.py
+    python scripts/check-import-time.py --budget-ms 60 --runs 5
+    python scripts/check-import-time.py --verbose
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Script -> modules it must not import at startup (submodules included)
+DEFERRED_IMPORTS = {
+    'modules/excel-tools/excel-tools.py': [
+        'zipfile', 'xml.etree.ElementTree', 'tempfile', 'html', 'multiprocessing',
+        'pickle', 'csv', 'getpass', 'hashlib', 'datetime',
+    ],
+    'modules/line-counter/count-lines.py': ['sqlite3', 'csv'],
+    'modules/backup-dev/scan-excluded.py': ['subprocess'],
+    'modules/backup-dev/delete-excluded.py': ['subprocess', 'concurrent.futures'],
+    'modules/backup-dev/copy-backup.py': ['subprocess'],
+    'modules/console-worker/console-worker.py': ['zipfile', 'sqlite3', 'subprocess', 'concurrent.futures'],
+}
+
+# Imports a script the way console-worker.py does: by path, with its folder on sys.path
+_LOADER = (
+    'import importlib.util, os, sys; path = sys.argv[1]; '
+    'sys.path.insert(0, os.path.dirname(path)); '
+    'spec = importlib.util.spec_from_file_location("_checked", path); '
+    'spec.loader.exec_module(importlib.util.module_from_spec(spec))'
+)
+
+
+def measure(script_path: str) -> tuple[list[str], float]:
+    """
+    Modules imported while loading a script, and their total import time in ms.
+
+    Modules the interpreter imports before the loader runs (site, encodings)
+    are not part of the script's cost and are excluded.
+    """
+    baseline = _import_lines(['-c', 'pass'])
+    lines = _import_lines(['-c', _LOADER, script_path])
+    seen = {name for name, _ in baseline}
+    modules = []
+    total_us = 0
+    for name, self_us in lines:
+        if name in seen:
+            continue
+        modules.append(name)
+        total_us += self_us
+    return modules, total_us / 1000
+
+
+def _import_lines(args: list[str]) -> list[tuple[str, int]]:
+    proc = subprocess.run([sys.executable, '-X', 'importtime', *args],
+                          capture_output=True, text=True, cwd=REPO_ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'import failed')
+    lines = []
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|', 2)
+        lines.append((name.strip(), int(self_us)))
+    return lines
+
+
+def deferred_hits(modules: list[str], deferred: list[str]) -> list[str]:
+    return [name for name in modules
+            if any(name == mod or name.startswith(mod + '.') for mod in deferred)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check startup imports of the console Python scripts')
+    parser.add_argument('--budget-ms', type=float, help='Fail if a script takes longer than this to import')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per script; the fastest is reported (default: 3)')
+    parser.add_argument('--verbose', action='store_true', help='List every module imported at startup')
+
+    args = parser.parse_args()
+
+    failures = 0
+    for rel_path, deferred in DEFERRED_IMPORTS.items():
+        script_path = os.path.join(REPO_ROOT, *rel_path.split('/'))
+        try:
+            runs = [measure(script_path) for _ in range(max(1, args.runs))]
+        except RuntimeError as e:
+            print(f"FAIL  {rel_path}: {e}")
+            failures += 1
+            continue
+        modules = runs[0][0]
+        elapsed = min(ms for _, ms in runs)
+        hits = deferred_hits(modules, deferred)
+        over_budget = args.budget_ms is not None and elapsed > args.budget_ms
+
+        status = 'FAIL' if hits or over_budget else 'ok'
+        print(f"{status:<5} {rel_path}: {elapsed:.1f} ms, {len(modules)} modules")
+        if hits:
+            print(f"      imported at startup: {', '.join(hits)}")
+        if over_budget:
+            print(f"      over budget of {args.budget_ms:g} ms")
+        if args.verbose:
+            print(f"      {' '.join(modules)}")
+        if status == 'FAIL':
+            failures += 1
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Shared helpers for the tests of the console's Python scripts.
+
+The scripts have hyphenated file names, so they are loaded by path the way
+console-worker.py does, with their folder on sys.path for sibling helpers.
+The backup-dev helper modules (tree_remover, pending_delete, exclusion_rules)
+are importable directly.
+"""
+
+import importlib.util
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES_DIR = os.path.join(REPO_ROOT, 'modules')
+
+sys.path.insert(0, os.path.join(MODULES_DIR, 'backup-dev'))
+
+_loaded = {}
+
+
+def load_script(rel_path: str):
+    """Import a script under modules/ (e.g. 'backup-dev/copy-backup.py') once."""
+    module = _loaded.get(rel_path)
+    if module is None:
+        path = os.path.join(MODULES_DIR, *rel_path.split('/'))
+        folder = os.path.dirname(path)
+        if folder not in sys.path:
+            sys.path.insert(0, folder)
+        name = os.path.splitext(os.path.basename(path))[0].replace('-', '_')
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded[rel_path] = module
+    return module
@@ -0,0 +1,106 @@
+"""copy-backup.py --store: content-addressed dedup settles and stays consistent."""
+
+import hashlib
+import os
+
+from conftest import load_script
+
+cb = load_script('backup-dev/copy-backup.py')
+
+
+def _store_backup(src, dst):
+    """One --store run, as copy-backup.py main does it (no exclusions)."""
+    store_path = cb.default_store_path(str(dst))
+    hash_cache = cb.load_hash_cache(store_path)
+    plan = cb.plan_backup(str(src), str(dst), [], [], keep_unchanged=True, hash_cache=hash_cache)
+    os.makedirs(dst, exist_ok=True)
+    store = cb.open_store(store_path, hash_cache)
+    result = cb.run_backup(str(src), str(dst), plan, workers=4, show_progress=False, store=store)
+    cb.close_store(store, str(src))
+    return plan, result, store
+
+
+def _write(path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def _objects(store_path):
+    objects = []
+    for root, _, files in os.walk(os.path.join(store_path, 'objects')):
+        objects.extend(os.path.join(root, name) for name in files)
+    return objects
+
+
+def test_store_dedup_settles(tmp_path):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'backup'
+    _write(src / 'a.txt', b'same content')
+    _write(src / 'sub' / 'b.txt', b'same content')
+    _write(src / 'c.txt', b'other content')
+
+    plan, result, store = _store_backup(src, dst)
+    assert len(plan['files']) == 3
+    assert result['errors'] == []
+    assert store['deduplicated_files'] == 1
+
+    # Identical files share one object
+    assert os.path.samefile(dst / 'a.txt', dst / 'sub' / 'b.txt')
+    assert not os.path.samefile(dst / 'a.txt', dst / 'c.txt')
+
+    # Later runs find nothing to copy, however many times they run
+    for _ in range(2):
+        plan, result, _ = _store_backup(src, dst)
+        assert plan['files'] == []
+        assert result['errors'] == []
+
+    # No temporary links or incoming objects are left behind
+    leftovers = [name for _, _, files in os.walk(tmp_path) for name in files
+                 if name.endswith('.link') or name.endswith('.tmp')]
+    assert leftovers == []
+
+
+def test_store_objects_are_named_by_their_content(tmp_path):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'backup'
+    _write(src / 'a.bin', os.urandom(3 * 1024 * 1024 + 17))
+    _write(src / 'b.bin', b'small')
+
+    _store_backup(src, dst)
+
+    objects = _objects(cb.default_store_path(str(dst)))
+    assert len(objects) == 2
+    for obj in objects:
+        with open(obj, 'rb') as f:
+            digest = hashlib.blake2b(f.read(), digest_size=20).hexdigest()
+        assert obj == cb._object_path({'path': cb.default_store_path(str(dst))}, digest)
+
+
+def test_store_recopies_changed_file(tmp_path):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'backup'
+    _write(src / 'a.txt', b'version one')
+    _store_backup(src, dst)
+
+    _write(src / 'a.txt', b'version two, longer')
+    plan, result, _ = _store_backup(src, dst)
+    assert [item[0] for item in plan['files']] == ['a.txt']
+    assert result['errors'] == []
+    assert (dst / 'a.txt').read_bytes() == b'version two, longer'
+
+
+def test_store_replaces_backup_dir_with_source_file(tmp_path):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'backup'
+    _write(src / 'item' / 'inner.txt', b'was a directory')
+    _store_backup(src, dst)
+
+    # The source swaps the directory for a file; without mirror it still has to make way
+    (src / 'item' / 'inner.txt').unlink()
+    (src / 'item').rmdir()
+    _write(src / 'item', b'now a file')
+    plan, result, _ = _store_backup(src, dst)
+
+    assert plan['extra_dirs'] == ['item']
+    assert result['errors'] == []
+    assert (dst / 'item').read_bytes() == b'now a file'
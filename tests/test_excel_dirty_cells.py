@@ -0,0 +1,90 @@
+"""excel-tools.py _dirty_cells: every formula downstream of the seeds, through any path."""
+
+import random
+
+from conftest import load_script
+
+et = load_script('excel-tools/excel-tools.py')
+
+
+def _model(formulas: dict) -> dict:
+    """Workbook model with parsed formulas: {sheet: {(row, col): formula text}}."""
+    return {
+        'names': {sheet.lower(): sheet for sheet in formulas},
+        'formulas': {
+            sheet: {cell: et._parse_formula(text) for cell, text in cells.items()}
+            for sheet, cells in formulas.items()
+        },
+    }
+
+
+def _fixpoint_dirty_cells(model: dict, seeds: set) -> set:
+    """Reference: rescan every formula until nothing new turns dirty."""
+    deps = []
+    for sheet, formulas in model['formulas'].items():
+        for (row, col), ast in formulas.items():
+            rects = [(model['names'].get((ref[1] or sheet).lower()), *ref[2:])
+                     for ref in et._formula_refs(ast)]
+            deps.append(((sheet, row, col), rects))
+    dirty = set(seeds)
+    changed = True
+    while changed:
+        changed = False
+        for key, rects in deps:
+            if key in dirty:
+                continue
+            if any(s == d[0] and r1 <= d[1] <= r2 and c1 <= d[2] <= c2
+                   for d in dirty for s, r1, c1, r2, c2 in rects):
+                dirty.add(key)
+                changed = True
+    return dirty - seeds
+
+
+def test_propagates_through_chains_ranges_and_sheets():
+    model = _model({
+        'Input': {(2, 1): 'A1*2'},                          # A2 <- A1
+        'Calc': {
+            (1, 1): 'Input!A2+1',                           # A1 <- Input!A2
+            (1, 2): 'SUM(A1:A5)',                           # B1 <- range holding A1
+            (1, 3): 'B1&"x"',                               # C1 <- B1
+            (1, 4): 'SUM(Input!A1:Z10000)',                 # D1 <- large range (not indexed per cell)
+            (9, 9): 'Z99',                                  # unrelated
+        },
+    })
+
+    dirty = et._dirty_cells(model, {('Input', 1, 1)})
+
+    assert dirty == {('Input', 2, 1), ('Calc', 1, 1), ('Calc', 1, 2), ('Calc', 1, 3), ('Calc', 1, 4)}
+
+
+def test_seeds_are_not_reported_and_cycles_end():
+    model = _model({'S': {(1, 1): 'B1+1', (1, 2): 'A1+1'}})
+    assert et._dirty_cells(model, {('S', 1, 1)}) == {('S', 1, 2)}
+
+
+def test_references_to_unknown_sheets_are_ignored():
+    model = _model({'S': {(1, 1): 'Missing!A1+1'}})
+    assert et._dirty_cells(model, {('S', 1, 1)}) == set()
+    assert et._dirty_cells(model, {('Missing', 1, 1)}) == set()
+
+
+def test_matches_fixpoint_on_random_models():
+    rng = random.Random(37)
+    col = 'ABCDEFGH'
+    for _ in range(40):
+        formulas = {'S1': {}, 'S2': {}}
+        for _ in range(60):
+            roll = rng.random()
+            if roll < 0.4:
+                text = f"{rng.choice(col)}{rng.randint(1, 20)}+1"
+            elif roll < 0.7:
+                text = f"SUM({col[rng.randint(0, 3)]}{rng.randint(1, 5)}:{col[rng.randint(4, 7)]}{rng.randint(6, 20)})"
+            elif roll < 0.9:
+                text = f"S2!{rng.choice(col)}{rng.randint(1, 20)}*2"
+            else:
+                text = 'SUM(A1:H9000)'
+            formulas[rng.choice(['S1', 'S2'])][(rng.randint(1, 20), rng.randint(1, 8))] = text
+        model = _model(formulas)
+        seeds = {(rng.choice(['S1', 'S2']), rng.randint(1, 20), rng.randint(1, 8)) for _ in range(3)}
+
+        assert et._dirty_cells(model, seeds) == _fixpoint_dirty_cells(model, seeds)
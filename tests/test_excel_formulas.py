@@ -0,0 +1,101 @@
+"""excel-tools.py formula rewrites: planned spans are spliced in one save, or not at all."""
+
+import os
+import zipfile
+
+import pytest
+
+from conftest import load_script
+
+et = load_script('excel-tools/excel-tools.py')
+
+_WORKBOOK = (
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    ' xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+    '<sheet name="Summary" sheetId="1" r:id="rId1"/><sheet name="Broken" sheetId="2" r:id="rId2"/>'
+    '</sheets></workbook>'
+)
+_RELS = (
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="worksheet" Target="worksheets/sheet2.xml"/>'
+    '</Relationships>'
+)
+_SHEET1 = (
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+    '<row r="1"><c r="A1"><f>[Old.xlsx]Data!B1&amp;"x"</f><v>0</v></c>'
+    '<c r="B1"><f>IF(C1&lt;&gt;0,[Old.xlsx]Data!C1,0)</f><v>0</v></c>'
+    '<c r="C1"><f>SUM(D1:D9)</f><v>0</v></c></row>'
+    '</sheetData></worksheet>'
+)
+
+
+def _make_workbook(path):
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr('xl/workbook.xml', _WORKBOOK)
+        zf.writestr('xl/_rels/workbook.xml.rels', _RELS)
+        zf.writestr('xl/worksheets/sheet1.xml', _SHEET1)
+        # Not UTF-8: planning skips this sheet instead of failing the workbook
+        zf.writestr('xl/worksheets/sheet2.xml', b'<worksheet>\xff\xfe<f>[Old.xlsx]A1</f></worksheet>')
+        zf.writestr('xl/calcChain.xml', '<calcChain/>')
+    return str(path)
+
+
+def _rename_link(text):
+    return text.replace('[Old.xlsx]', '[New.xlsx]') if '[Old.xlsx]' in text else None
+
+
+def test_plan_and_apply_rewrites_only_matching_formulas(tmp_path):
+    path = _make_workbook(tmp_path / 'book.xlsx')
+
+    plan, preview = et._plan_formula_edits(path, _rename_link)
+
+    assert [(sheet, cell) for sheet, cell, _, _ in preview] == [('Summary', 'A1'), ('Summary', 'B1')]
+    assert preview[1][2] == 'IF(C1<>0,[Old.xlsx]Data!C1,0)'
+    assert list(plan) == ['xl/worksheets/sheet1.xml']
+
+    assert et._apply_formula_plan(path, plan, force_array=False) == 2
+
+    with zipfile.ZipFile(path) as zf:
+        sheet_xml = zf.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        names = zf.namelist()
+    assert '<f>[New.xlsx]Data!B1&amp;"x"</f>' in sheet_xml
+    assert '<f>IF(C1&lt;&gt;0,[New.xlsx]Data!C1,0)</f>' in sheet_xml
+    assert '<f>SUM(D1:D9)</f>' in sheet_xml
+    assert 'xl/calcChain.xml' not in names
+    # The undecodable sheet is carried over byte for byte
+    assert 'xl/worksheets/sheet2.xml' in names
+
+
+def test_plan_without_changes_leaves_workbook_untouched(tmp_path):
+    path = _make_workbook(tmp_path / 'book.xlsx')
+    plan, _ = et._plan_formula_edits(path, lambda text: text if 'SUM' in text else None)
+    assert plan
+    before = os.stat(path)
+
+    assert et._apply_formula_plan(path, plan, force_array=False) == 0
+
+    after = os.stat(path)
+    assert (after.st_mtime_ns, after.st_size) == (before.st_mtime_ns, before.st_size)
+
+
+def test_workbook_changed_since_preview_is_not_saved(tmp_path):
+    path = _make_workbook(tmp_path / 'book.xlsx')
+    plan, _ = et._plan_formula_edits(path, _rename_link)
+
+    # Someone edits the sheet between preview and apply
+    edited = tmp_path / 'edited.xlsx'
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(edited, 'w') as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename == 'xl/worksheets/sheet1.xml':
+                data = data.replace(b'SUM(D1:D9)', b'SUM(D1:D8)')
+            dst.writestr(item, data)
+    os.replace(edited, path)
+    with open(path, 'rb') as f:
+        original = f.read()
+
+    with pytest.raises(RuntimeError):
+        et._apply_formula_plan(path, plan, force_array=False)
+    with open(path, 'rb') as f:
+        assert f.read() == original
@@ -0,0 +1,81 @@
+"""exclusion_rules.ExclusionMatcher: plain rules match as the old fnmatch scan did."""
+
+import fnmatch
+import random
+
+from exclusion_rules import get_matcher, is_path_rule
+
+EXCLUDE_DIRS = ['node_modules', '.git', 'bin', 'obj', '__pycache__', '.venv']
+EXCLUDE_FILES = ['*.log', '*.tmp', 'Thumbs.db', '*.py[cod]', 'desktop.ini', '~$*', 'cache?.bin']
+
+NAMES = [
+    'node_modules', 'src', 'bin', 'binary', 'obj', 'object', '.git', '.github', '__pycache__',
+    'app.log', 'app.log.1', 'notes.tmp', 'tmp', 'Thumbs.db', 'thumbs.db.bak', 'main.py', 'main.pyc',
+    'main.pyo', 'main.pyx', 'desktop.ini', '~$report.xlsx', 'report.xlsx', 'cache1.bin', 'cache10.bin',
+    '.venv', 'venv', 'a[1].txt',
+]
+
+
+def _old_match(name: str, is_dir: bool) -> str | None:
+    """The rules scan-excluded used before path rules: exact directory names, fnmatch for files."""
+    if is_dir:
+        return name if name in EXCLUDE_DIRS else None
+    for pattern in EXCLUDE_FILES:
+        if fnmatch.fnmatch(name, pattern):
+            return pattern
+    return None
+
+
+def test_plain_rules_match_like_fnmatch_at_any_depth():
+    matcher = get_matcher(EXCLUDE_DIRS, EXCLUDE_FILES)
+    rng = random.Random(45)
+    for _ in range(200):
+        # Walk down a random chain of directories that are not excluded
+        state = matcher.root
+        for _ in range(rng.randint(0, 5)):
+            name = rng.choice(['src', 'lib', 'tmp', 'binary', 'venv', 'object'])
+            pattern, state = matcher.match(state, name, True)
+            assert pattern is None
+        for name in NAMES:
+            for is_dir in (True, False):
+                assert matcher.match(state, name, is_dir)[0] == _old_match(name, is_dir), (name, is_dir)
+
+
+def test_first_rule_in_config_order_wins():
+    matcher = get_matcher([], ['*.log', 'app.*'])
+    assert matcher.match(matcher.root, 'app.log', False)[0] == '*.log'
+    matcher = get_matcher([], ['app.*', '*.log'])
+    assert matcher.match(matcher.root, 'app.log', False)[0] == 'app.*'
+
+
+def _match_path(matcher, path: str, is_dir: bool):
+    state = matcher.root
+    *parents, name = path.split('/')
+    for parent in parents:
+        pattern, state = matcher.match(state, parent, True)
+        if pattern is not None:
+            return pattern
+    return matcher.match(state, name, is_dir)[0]
+
+
+def test_path_rules():
+    rules = ['/build', 'docs/generated', 'src/**/fixtures']
+    matcher = get_matcher(rules, ['logs/*.txt'])
+    assert all(is_path_rule(rule) for rule in rules)
+
+    assert _match_path(matcher, 'build', True) == '/build'
+    assert _match_path(matcher, 'app/build', True) is None
+    assert _match_path(matcher, 'docs/generated', True) == 'docs/generated'
+    assert _match_path(matcher, 'a/b/docs/generated', True) == 'docs/generated'
+    assert _match_path(matcher, 'src/fixtures', True) == 'src/**/fixtures'
+    assert _match_path(matcher, 'src/a/b/fixtures', True) == 'src/**/fixtures'
+    assert _match_path(matcher, 'lib/fixtures', True) is None
+    assert _match_path(matcher, 'x/logs/out.txt', False) == 'logs/*.txt'
+    assert _match_path(matcher, 'x/logs/deep/out.txt', False) is None
+
+
+def test_dead_states_prune_subtrees():
+    matcher = get_matcher(['/build'], [])
+    _, state = matcher.match(matcher.root, 'src', True)
+    assert matcher.is_dead(state)
+    assert not matcher.is_dead(get_matcher(['node_modules'], []).root)
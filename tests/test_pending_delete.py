@@ -0,0 +1,72 @@
+"""pending_delete.purge: one purger at a time, and a dead purger's lock is taken over."""
+
+import os
+import subprocess
+import sys
+
+import pending_delete
+
+# Holds the purge lock of argv[1] until stdin closes
+_HOLDER = (
+    'import sys; sys.path.insert(0, sys.argv[2]); import pending_delete, os; '
+    'fd = pending_delete._acquire_lock(os.path.join(pending_delete.pending_path(sys.argv[1]), '
+    'pending_delete._LOCK_NAME)); print("locked" if fd is not None else "busy", flush=True); '
+    'sys.stdin.read()'
+)
+
+
+def _stage_one(backup):
+    victim = backup / 'node_modules'
+    (victim / 'pkg').mkdir(parents=True)
+    (victim / 'pkg' / 'index.js').write_text('x')
+    pending_delete.stage(backup, victim)
+
+
+def _start_holder(backup):
+    holder = subprocess.Popen(
+        [sys.executable, '-c', _HOLDER, str(backup), os.path.dirname(pending_delete.__file__)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    assert holder.stdout.readline().strip() == 'locked'
+    return holder
+
+
+def test_purge_removes_staged_entries(tmp_path):
+    _stage_one(tmp_path)
+
+    result = pending_delete.purge(tmp_path)
+
+    assert result['locked'] is False
+    assert result['errors'] == []
+    assert (result['purged'], result['files'], result['dirs']) == (1, 1, 2)
+    assert not os.path.exists(pending_delete.pending_path(tmp_path))
+
+
+def test_purge_skips_while_another_purger_holds_the_lock(tmp_path):
+    _stage_one(tmp_path)
+    holder = _start_holder(tmp_path)
+    try:
+        assert pending_delete.is_purging(tmp_path)
+        result = pending_delete.purge(tmp_path)
+        assert result['locked'] is True
+        assert pending_delete.pending_entries(tmp_path) != []
+    finally:
+        holder.stdin.close()
+        holder.wait(timeout=10)
+
+
+def test_lock_of_a_killed_purger_is_taken_over(tmp_path):
+    _stage_one(tmp_path)
+    holder = _start_holder(tmp_path)
+    holder.kill()
+    holder.wait(timeout=10)
+
+    # The lock file is still there, but nobody holds it any more
+    lock_path = os.path.join(pending_delete.pending_path(tmp_path), pending_delete._LOCK_NAME)
+    assert os.path.exists(lock_path)
+    assert not pending_delete.is_purging(tmp_path)
+
+    result = pending_delete.purge(tmp_path)
+
+    assert result['locked'] is False
+    assert result['purged'] == 1
+    assert not os.path.exists(pending_delete.pending_path(tmp_path))
@@ -0,0 +1,91 @@
+"""tree_remover.remove_tree: exact counts, and links are removed, never followed."""
+
+import os
+
+import pytest
+
+import tree_remover
+
+needs_symlinks = pytest.mark.skipif(not hasattr(os, 'symlink') or os.name == 'nt',
+                                    reason='symlinks need privileges on Windows')
+
+
+def _make_tree(root, depth=3, width=2):
+    root.mkdir()
+    files = dirs = 0
+    level = [root]
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for i in range(width):
+                (parent / f"f{i}.txt").write_text('x')
+                files += 1
+                child = parent / f"d{i}"
+                child.mkdir()
+                dirs += 1
+                next_level.append(child)
+        level = next_level
+    return files, dirs + 1
+
+
+def test_counts_and_dry_run(tmp_path):
+    root = tmp_path / 'tree'
+    files, dirs = _make_tree(root)
+
+    counted = tree_remover.remove_tree(root, workers=4, dry_run=True)
+    assert counted == {'files': files, 'dirs': dirs, 'errors': []}
+    assert root.is_dir()
+
+    removed = tree_remover.remove_tree(root, workers=4)
+    assert removed == {'files': files, 'dirs': dirs, 'errors': []}
+    assert not root.exists()
+
+
+@needs_symlinks
+def test_symlink_root_is_unlinked_not_followed(tmp_path):
+    target = tmp_path / 'target'
+    target.mkdir()
+    (target / 'keep.txt').write_text('keep')
+    link = tmp_path / 'link'
+    link.symlink_to(target, target_is_directory=True)
+
+    result = tree_remover.remove_tree(link)
+
+    assert result == {'files': 1, 'dirs': 0, 'errors': []}
+    assert not os.path.lexists(link)
+    assert (target / 'keep.txt').read_text() == 'keep'
+
+
+@needs_symlinks
+def test_symlinked_middle_component_is_not_followed(tmp_path):
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    (outside / 'keep.txt').write_text('keep')
+
+    root = tmp_path / 'tree'
+    (root / 'a' / 'b').mkdir(parents=True)
+    (root / 'a' / 'b' / 'f.txt').write_text('x')
+    (root / 'a' / 'link').symlink_to(outside, target_is_directory=True)
+
+    result = tree_remover.remove_tree(root, workers=2)
+
+    assert result['errors'] == []
+    # f.txt and the link itself; the link's target is left alone
+    assert result['files'] == 2
+    assert result['dirs'] == 3
+    assert not root.exists()
+    assert (outside / 'keep.txt').read_text() == 'keep'
+
+
+@pytest.mark.skipif(os.name == 'nt' or (hasattr(os, 'geteuid') and os.geteuid() == 0),
+                    reason='root ignores directory permissions')
+def test_unwritable_directories_are_removed(tmp_path):
+    root = tmp_path / 'tree'
+    (root / 'locked').mkdir(parents=True)
+    (root / 'locked' / 'f.txt').write_text('x')
+    os.chmod(root / 'locked', 0o500)
+
+    result = tree_remover.remove_tree(root)
+
+    assert result == {'files': 1, 'dirs': 2, 'errors': []}
+    assert not root.exists()